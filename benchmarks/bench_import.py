@@ -0,0 +1,76 @@
+"""Cold-start import cost of the QASWP modules (``python -X importtime``).
+
+Each module is imported in a fresh interpreter several times; the median
+cumulative import time is compared against ``import_budget.json``. Pass
+``--check`` to exit non-zero when a module is over budget or pulls in a
+forbidden package.
+"""
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+BUDGET_PATH = os.path.join(os.path.dirname(__file__), "import_budget.json")
+RUNS = int(os.getenv("QASWP_BENCH_IMPORT_RUNS", "5"))
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def load_budget(path=BUDGET_PATH):
+    with open(path) as fh:
+        return json.load(fh)["modules"]
+
+
+def import_once(module):
+    """Import ``module`` in a fresh interpreter.
+
+    Returns:
+        tuple: ``(cumulative_ms, loaded_top_level_packages)``.
+    """
+    code = (
+        f"import sys, {module}; print(','.join(sorted({{m.split('.')[0] for m in sys.modules}})))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=_ROOT,
+        env=dict(os.environ, PYTHONPATH=_ROOT),
+    )
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        parts = line.split("|")
+        if len(parts) == 3 and parts[2].strip() == module:
+            cumulative = int(parts[1]) / 1000.0
+    loaded = set(proc.stdout.strip().split(","))
+    return cumulative, loaded
+
+
+def measure(module, runs=RUNS):
+    """Median cumulative import time in ms and the union of loaded packages."""
+    times, loaded = [], set()
+    for _ in range(runs):
+        ms, pkgs = import_once(module)
+        times.append(ms)
+        loaded |= pkgs
+    return statistics.median(times), loaded
+
+
+def run(check=False):
+    failures = []
+    for module, budget in load_budget().items():
+        ms, loaded = measure(module)
+        leaked = sorted(set(budget.get("forbid", ())) & loaded)
+        status = "ok"
+        if ms > budget["max_ms"] or leaked:
+            status = "OVER BUDGET" if not leaked else f"imports {', '.join(leaked)}"
+            failures.append(module)
+        print(f"[BENCH] import {module:<16} {ms:8.1f} ms (budget {budget['max_ms']} ms) {status}")
+    if check and failures:
+        sys.exit(1)
+    return failures
+
+
+if __name__ == "__main__":
+    run(check="--check" in sys.argv)
@@ -0,0 +1,63 @@
+"""Draining a receive backlog: receive_woven_packet in a loop vs. receive_many."""
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.qaswp import VOCAB, QASWPSession
+
+N_FRAMES = int(os.getenv("QASWP_BENCH_FRAMES", "20000"))
+REPEAT = 5
+
+
+def _receiver(srv):
+    # a fresh receiver on the same session key, so each run starts clean
+    twin = QASWPSession(is_client=False)
+    twin._schema_version = srv._schema_version
+    twin._install_session_key(srv.session_key)
+    return twin
+
+
+def _backlog(cli):
+    # random tokens miss the prediction mostly, so most weaves are delta frames
+    os.environ["QASWP_DEMO"] = "0"
+    rng = random.Random(0)
+    frames = []
+    for i in range(N_FRAMES):
+        tokens = [VOCAB["GET"], rng.randrange(1, len(VOCAB))]
+        packet = cli.weave_packet(tokens, context_id=i % 4)
+        frames.extend(packet.get("packets", [packet]) if packet["flushed"] else [])
+    return frames + cli.flush_all()
+
+
+def run():
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    frames = _backlog(cli)
+    workers = os.cpu_count() or 1
+    pool = ThreadPoolExecutor(workers)
+    methods = {
+        "receive_woven_packet loop": lambda rx: [rx.receive_woven_packet(f) for f in frames],
+        "receive_many": lambda rx: rx.receive_many(frames),
+        f"receive_many x{workers} threads": lambda rx: rx.receive_many(frames, executor=pool),
+    }
+    results = {}
+    for name, method in methods.items():
+        best = float("inf")
+        for _ in range(REPEAT):
+            rx = _receiver(srv)
+            start = time.perf_counter()
+            method(rx)
+            best = min(best, time.perf_counter() - start)
+            assert rx.context(3).rx_seq == cli.context(3).seq
+        results[name] = best
+    pool.shutdown()
+
+    for name, elapsed in results.items():
+        print(f"[BENCH] {name:<28} frames={len(frames)} frames/s={len(frames) / elapsed:10.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,43 @@
+"""Reconnect latency: full three-pass handshake vs. ticket resumption."""
+import os
+import time
+
+from src.qaswp import QASWPSession
+from src.resumption import TicketIssuer
+
+ROUNDS = int(os.getenv("QASWP_BENCH_ROUNDS", "200"))
+
+
+def _full(issuer):
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False, ticket_issuer=issuer)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    return cli
+
+
+def _resume(issuer, ticket):
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False, ticket_issuer=issuer)
+    cli.resume_pass_3(srv.resume_pass_2(cli.resume_pass_1(ticket)))
+    return cli
+
+
+def _per_call(fn, *args):
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        fn(*args)
+    return (time.perf_counter() - start) / ROUNDS
+
+
+def run():
+    issuer = TicketIssuer()
+    ticket = _full(issuer).ticket  # also loads the model and the AEAD backend
+    full = _per_call(_full, issuer)
+    resumed = _per_call(_resume, issuer, ticket)
+    print(f"[BENCH] full handshake  {full * 1e3:8.3f} ms")
+    print(f"[BENCH] resumption      {resumed * 1e3:8.3f} ms  ({full / resumed:.1f}x faster)")
+    return full, resumed
+
+
+if __name__ == "__main__":
+    run()
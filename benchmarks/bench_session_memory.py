@@ -0,0 +1,55 @@
+"""Memory per live session: one TinyLLM per session vs. the shared registry model."""
+import gc
+import os
+import resource
+import time
+
+from src.neural import TinyLLM
+from src.qaswp import QASWPSession
+
+N_SESSIONS = int(os.getenv("QASWP_BENCH_SESSIONS", "2000"))
+
+
+def _rss_bytes():
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:  # non-Linux: fall back to peak RSS (kB on Linux, bytes on macOS)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _param_bytes(model):
+    return sum(p.numel() * p.element_size() for p in model.parameters())
+
+
+def measure(factory, n=N_SESSIONS):
+    gc.collect()
+    before = _rss_bytes()
+    start = time.perf_counter()
+    sessions = [factory() for _ in range(n)]
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    per_session = (_rss_bytes() - before) / n
+    distinct = {id(s.model) for s in sessions}
+    weights = sum(_param_bytes(s.model) for s in {id(s.model): s for s in sessions}.values())
+    del sessions
+    return per_session, elapsed / n, len(distinct), weights / n
+
+
+def run():
+    QASWPSession()  # warm the registry so its one-time build is not counted
+    results = {
+        "per-session TinyLLM": measure(lambda: QASWPSession(model=TinyLLM())),
+        "shared registry model": measure(QASWPSession),
+    }
+    for name, (rss, ctor, models, weights) in results.items():
+        print(
+            f"[BENCH] {name:<22} rss/session={rss / 1024:8.1f} KiB "
+            f"weights/session={weights / 1024:7.2f} KiB "
+            f"ctor={ctor * 1e6:8.1f} us models={models}"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    run()
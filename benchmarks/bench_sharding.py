@@ -0,0 +1,95 @@
+"""Sharded server throughput vs. worker count on loopback.
+
+Each run opens ``QASWP_BENCH_CONNS`` connections to a ``ShardedServer``
+(timing the handshakes), then writes a precomputed ``send_tokens`` stream
+on every connection. Server sessions reconstruct the stream, so each
+confirmed token costs one model step in the owning worker. Stream time
+runs from the first write until the drain reports every frame handled.
+"""
+import asyncio
+import functools
+import os
+import random
+import time
+
+from src import wire
+from src.qaswp import QASWPSession
+from src.registry import shared_model
+from src.sharding import ShardedServer
+from src.transport import MSG_DATA, QASWPClient, write_message
+
+N_CONNS = int(os.getenv("QASWP_BENCH_CONNS", "8"))
+N_TOKENS = int(os.getenv("QASWP_BENCH_TOKENS", "512"))
+WORKERS = [int(w) for w in os.getenv("QASWP_BENCH_WORKERS", "1,2,4").split(",")]
+
+
+def _warm_up():
+    # load torch and the model (and the AEAD backend) before the clock starts
+    shared_model().predict_next_token([0])
+    QASWPSession()._derive_session_key(bytes(32))
+
+
+def _consume(session, decoded):
+    for _ in session.stream(decoded["ctx"]):
+        pass
+
+
+def _tokens(seed):
+    from src.entropy import TokenCoder
+
+    rng = random.Random(seed)
+    coder = TokenCoder(shared_model())
+    out = []
+    for _ in range(N_TOKENS):
+        token = coder.predict() if rng.random() < 0.9 else rng.randrange(1, 8)
+        coder.push(token)
+        out.append(token)
+    return out
+
+
+async def measure(workers):
+    factory = functools.partial(QASWPSession, is_client=False, reconstruct=True)
+    server = await ShardedServer(
+        workers=workers, session_factory=factory, on_packet=_consume, initializer=_warm_up
+    ).start()
+    _warm_up()
+    await server.stats()  # wait until every worker is up
+
+    start = time.perf_counter()
+    conns = await asyncio.gather(
+        *(QASWPClient.connect("127.0.0.1", server.port) for _ in range(N_CONNS))
+    )
+    handshake = time.perf_counter() - start
+
+    bodies = []
+    for i, conn in enumerate(conns):
+        packets = conn.session.send_tokens(_tokens(i)) + conn.session.flush_all()
+        bodies.append([wire.pack_packet(p) for p in packets])
+
+    start = time.perf_counter()
+    for conn, frames in zip(conns, bodies, strict=True):
+        for body in frames:
+            write_message(conn.writer, MSG_DATA, body)
+    for conn in conns:
+        await conn.close()
+    stats = await server.close()
+    stream = time.perf_counter() - start
+    return N_CONNS / handshake, N_CONNS * N_TOKENS / stream, stats
+
+
+def run():
+    results = {}
+    for workers in WORKERS:
+        hs_rate, tok_rate, stats = asyncio.run(measure(workers))
+        results[workers] = (hs_rate, tok_rate)
+        spread = [w["handshakes"] for w in stats["workers"]]
+        print(
+            f"[BENCH] workers={workers} handshakes/s={hs_rate:8.1f} "
+            f"tokens/s={tok_rate:10.1f} handshakes/worker={spread}"
+        )
+    print(f"[BENCH] cpu_count={os.cpu_count()}")
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,71 @@
+"""Threads sharing one session: a coarse external lock vs. ConcurrentSession."""
+import os
+import threading
+import time
+
+from src.qaswp import VOCAB, QASWPSession
+from src.threadsafe import ConcurrentSession
+
+N_THREADS = int(os.getenv("QASWP_BENCH_THREADS", "8"))
+N_MSGS = int(os.getenv("QASWP_BENCH_MSGS", "250"))
+FLOW = [VOCAB["GET"], VOCAB["/api/v1/profile"]]
+
+
+def _session():
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    return cli
+
+
+def _run_threads(work):
+    threads = [threading.Thread(target=work) for _ in range(N_THREADS)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start
+
+
+def coarse_lock():
+    session, lock = _session(), threading.Lock()
+
+    def work():
+        for _ in range(N_MSGS):
+            with lock:
+                session.weave_packet(FLOW)
+
+    return _run_threads(work)
+
+
+def single_writer():
+    shared = ConcurrentSession(_session())
+
+    def work():
+        # keep a few sends in flight per thread, as a pipelined caller would
+        pending = []
+        for _ in range(N_MSGS):
+            pending.append(shared.weave_packet(FLOW))
+            if len(pending) >= 8:
+                pending.pop(0).result()
+        for fut in pending:
+            fut.result()
+
+    elapsed = _run_threads(work)
+    shared.close()
+    return elapsed
+
+
+def run():
+    os.environ["QASWP_DEMO"] = "0"  # every weave pays for a real prediction
+    _session().weave_packet(FLOW)  # build the shared model outside the timings
+    total = N_THREADS * N_MSGS
+    results = {"coarse lock": coarse_lock(), "ConcurrentSession": single_writer()}
+    for name, elapsed in results.items():
+        print(f"[BENCH] {name:<17} threads={N_THREADS} msgs/s={total / elapsed:10.1f}")
+    return results
+
+
+if __name__ == "__main__":
+    run()
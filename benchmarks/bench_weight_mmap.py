@@ -0,0 +1,84 @@
+"""Per-worker memory and startup: building a model vs. mapping one weight file."""
+import multiprocessing as mp
+import os
+import tempfile
+import time
+
+N_WORKERS = int(os.getenv("QASWP_BENCH_WORKERS", "4"))
+EMBED_DIM = int(os.getenv("QASWP_BENCH_EMBED_DIM", "512"))
+
+
+def _private_bytes():
+    """Private dirty memory: pages this process wrote and cannot share (Linux only)."""
+    try:
+        with open("/proc/self/smaps_rollup") as fh:
+            for line in fh:
+                if line.startswith("Private_Dirty:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return 0
+
+
+def _config():
+    return {"embed_dim": EMBED_DIM, "num_heads": 8, "hidden_dim": 4 * EMBED_DIM}
+
+
+def _worker(path, out, done):
+    # import cost is the same either way, so keep it out of the measurement
+    import torch
+
+    from src.neural import TinyLLM
+    from src.weights import load
+
+    before = _private_bytes()
+    start = time.perf_counter()
+    if path is None:
+        torch.manual_seed(0)
+        model = TinyLLM(**_config()).eval()
+    else:
+        model = load(path)
+    elapsed = time.perf_counter() - start
+    model.predict_next_token([1, 2, 3])  # touch every weight page
+    out.put((elapsed, _private_bytes() - before))
+    done.wait()  # stay alive so later workers map the file alongside this one
+
+
+def measure(path, n=N_WORKERS):
+    ctx = mp.get_context("spawn")
+    out, done = ctx.Queue(), ctx.Event()
+    procs = [ctx.Process(target=_worker, args=(path, out, done)) for _ in range(n)]
+    results = []
+    # start workers one after another so startup times are not CPU contention
+    for p in procs:
+        p.start()
+        results.append(out.get())
+    done.set()
+    for p in procs:
+        p.join()
+    return sum(t for t, _ in results) / n, sum(m for _, m in results) / n
+
+
+def run():
+    import torch
+
+    from src.neural import TinyLLM
+    from src.weights import save
+
+    torch.manual_seed(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "model.qw")
+        save(TinyLLM(**_config()), path)
+        size = os.path.getsize(path)
+        results = {"build TinyLLM": measure(None), "mmap weight file": measure(path)}
+    print(f"[BENCH] weight file {size / 2**20:.1f} MiB, {N_WORKERS} workers")
+    for name, (startup, private) in results.items():
+        print(
+            f"[BENCH] {name:<17} startup={startup * 1e3:8.1f} ms "
+            f"private/worker={private / 2**20:7.1f} MiB"
+        )
+    return results
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,294 @@
+"""QASWP benchmark suite with JSON output and baseline regression gating.
+
+Usage::
+
+    PYTHONPATH=. python benchmarks/suite.py           # run everything, print a table
+    python benchmarks/suite.py --json out.json        # also write machine-readable results
+    python benchmarks/suite.py --baseline base.json   # exit 1 on regressions
+    python benchmarks/suite.py --only weave,receive --quick
+
+Every metric records its unit and whether higher or lower is better. With
+``--baseline``, a metric regresses when it is worse than the baseline value
+by more than ``--threshold`` (a fraction, default 0.10). Metrics missing
+from either side are reported but never fail the run.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.qaswp import VOCAB, QASWPSession
+from src.qkd import bb84_keygen
+from src.registry import shared_model
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FLOW = [VOCAB["GET"], VOCAB["/api/v1/profile"]]
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """Register ``fn(quick) -> {metric: (value, unit, better)}`` under ``name``."""
+
+    def register(fn):
+        BENCHMARKS[name] = fn
+        return fn
+
+    return register
+
+
+def _latency(samples, scale, unit):
+    """p50/p99 of per-call durations (seconds) plus calls per second."""
+    arr = np.asarray(samples)
+    return {
+        "p50": (float(np.percentile(arr, 50)) * scale, unit, "lower"),
+        "p99": (float(np.percentile(arr, 99)) * scale, unit, "lower"),
+        "ops_per_s": (len(arr) / float(arr.sum()), "ops/s", "higher"),
+    }
+
+
+def _timed(fn, args_list):
+    clock = time.perf_counter
+    samples = []
+    for args in args_list:
+        start = clock()
+        fn(*args)
+        samples.append(clock() - start)
+    return samples
+
+
+def _established():
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    return cli, srv
+
+
+@benchmark("handshake")
+def bench_handshake(quick):
+    """client_pass_1 -> server_pass_2 -> client_pass_3 on fresh sessions."""
+    _established()  # model build and lazy imports are not part of the latency
+    rounds = 20 if quick else 100
+    pairs = [(QASWPSession(is_client=True), QASWPSession(is_client=False)) for _ in range(rounds)]
+
+    def handshake(cli, srv):
+        cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+
+    return _latency(_timed(handshake, pairs), 1e3, "ms")
+
+
+@benchmark("weave")
+def bench_weave(quick):
+    """weave_packet on a templated flow, including the batch flushes it triggers."""
+    cli, _ = _established()
+    n = 2000 if quick else 20000
+    cli.weave_packet(FLOW)
+    return _latency(_timed(cli.weave_packet, [(FLOW,)] * n), 1e6, "us")
+
+
+@benchmark("receive")
+def bench_receive(quick):
+    """receive_woven_packet on delta frames (one AEAD open each)."""
+    cli, srv = _established()
+    n = 2000 if quick else 20000
+    rng = np.random.default_rng(0)
+    # with the demo override off, random tokens mostly miss and send deltas
+    demo, os.environ["QASWP_DEMO"] = os.environ.get("QASWP_DEMO"), "0"
+    try:
+        frames = []
+        for token in rng.integers(1, len(VOCAB), n).tolist():
+            packet = cli.weave_packet([FLOW[0], token])
+            if packet["flushed"]:
+                frames.extend(packet.get("packets", [packet]))
+        frames += cli.flush_all()
+    finally:
+        if demo is None:
+            del os.environ["QASWP_DEMO"]
+        else:
+            os.environ["QASWP_DEMO"] = demo
+    return _latency(_timed(srv.receive_woven_packet, [(f,) for f in frames]), 1e6, "us")
+
+
+@benchmark("bb84")
+def bench_bb84(quick):
+    """bb84_keygen keys per second at several qubit counts."""
+    out = {}
+    budget = 0.2 if quick else 1.0
+    for length in (256, 1024, 4096, 16384):
+        rng = np.random.default_rng(length)
+        bb84_keygen(length=length, rng=rng)
+        count, start = 0, time.perf_counter()
+        while True:
+            bb84_keygen(length=length, rng=rng)
+            count += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= budget:
+                break
+        out[f"keys_per_s_{length}"] = (count / elapsed, "keys/s", "higher")
+    return out
+
+
+@benchmark("predict")
+def bench_predict(quick):
+    """TinyLLM.predict_next_token latency versus history length."""
+    model = shared_model()
+    rounds = 50 if quick else 300
+    rng = np.random.default_rng(1)
+    out = {}
+    for length in (1, 8, 32, 128, 512):
+        history = rng.integers(0, len(VOCAB), length).tolist()
+        model.predict_next_token(history)
+        samples = _timed(model.predict_next_token, [(history,)] * rounds)
+        out[f"p50_len_{length}"] = (float(np.percentile(samples, 50)) * 1e6, "us", "lower")
+    return out
+
+
+def _kv_cache_bytes(session):
+    """Storage bytes of the torch KV-cache tensors held by a session's contexts."""
+    caches = []
+    for ctx in session._contexts.values():
+        caches.append(ctx._kv_cache)
+        if ctx.tx_coder is not None:
+            caches.append(ctx.tx_coder.kv_cache)
+        if ctx.decoder is not None:
+            caches.append(ctx.decoder.coder.kv_cache)
+    tensors = [getattr(c, name, None) for c in caches for name in ("keys", "values")]
+    return sum(t.untyped_storage().nbytes() for t in tensors if t is not None)
+
+
+@benchmark("session_memory")
+def bench_session_memory(quick):
+    """Memory per established session with one active context.
+
+    ``tracemalloc`` sees Python objects and NumPy buffers but not torch
+    tensor storage, so the storage of each context's KV-cache tensors is
+    added separately (``kv_bytes_per_session``). The shared model and its
+    per-vocabulary key/value table are not counted.
+    """
+    n = 50 if quick else 200
+    _established()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        sessions = []
+        for _ in range(n):
+            cli, srv = _established()
+            cli.weave_packet(FLOW)
+            sessions.append((cli, srv))
+        gc.collect()
+        heap = tracemalloc.get_traced_memory()[0] - before
+    finally:
+        tracemalloc.stop()
+    kv = sum(_kv_cache_bytes(s) for pair in sessions for s in pair)
+    # a pair is one client and one server session
+    return {
+        "bytes_per_session": ((heap + kv) / (2 * n), "bytes", "lower"),
+        "kv_bytes_per_session": (kv / (2 * n), "bytes", "lower"),
+    }
+
+
+def _meta():
+    try:
+        rev = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            cwd=_ROOT,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        rev = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "git_rev": rev,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+    }
+
+
+def run_suite(only=None, quick=False):
+    """Run the selected benchmarks; returns the JSON-ready results dict."""
+    names = only or list(BENCHMARKS)
+    unknown = sorted(set(names) - set(BENCHMARKS))
+    if unknown:
+        raise ValueError(f"unknown benchmarks: {', '.join(unknown)}")
+    metrics = {}
+    for name in names:
+        for metric, (value, unit, better) in BENCHMARKS[name](quick).items():
+            metrics[f"{name}.{metric}"] = {"value": value, "unit": unit, "better": better}
+    return {"meta": dict(_meta(), quick=quick), "metrics": metrics}
+
+
+def compare(results, baseline, threshold=0.10):
+    """Compare two results dicts.
+
+    Returns:
+        list: ``(metric, current, base, change, regressed)`` rows, where
+        ``change`` is the relative change in the metric's "better" direction
+        (negative is worse) and ``None`` when either side is missing.
+    """
+    rows = []
+    cur, base = results["metrics"], baseline["metrics"]
+    for metric in sorted(set(cur) | set(base)):
+        if metric not in cur or metric not in base or not base[metric]["value"]:
+            value = cur.get(metric, {}).get("value")
+            rows.append((metric, value, base.get(metric, {}).get("value"), None, False))
+            continue
+        value, ref = cur[metric]["value"], base[metric]["value"]
+        change = (value - ref) / ref
+        if cur[metric]["better"] == "lower":
+            change = -change
+        rows.append((metric, value, ref, change, change < -threshold))
+    return rows
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.4g}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--only", help="comma-separated benchmarks: " + ",".join(BENCHMARKS))
+    parser.add_argument("--quick", action="store_true", help="fewer iterations (CI smoke run)")
+    parser.add_argument("--json", dest="json_path", help="write results to this file")
+    parser.add_argument("--baseline", help="results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown fraction")
+    args = parser.parse_args(argv)
+
+    only = args.only.split(",") if args.only else None
+    results = run_suite(only, args.quick)
+    if args.json_path:
+        with open(args.json_path, "w") as fh:
+            json.dump(results, fh, indent=2, sort_keys=True)
+
+    if not args.baseline:
+        for metric, m in results["metrics"].items():
+            print(f"[BENCH] {metric:<34} {_fmt(m['value']):>12} {m['unit']}")
+        return 0
+
+    with open(args.baseline) as fh:
+        baseline = json.load(fh)
+    regressed = []
+    for metric, value, ref, change, bad in compare(results, baseline, args.threshold):
+        delta = "   new/gone" if change is None else f"{change:+10.1%}"
+        flag = "  REGRESSION" if bad else ""
+        print(f"[BENCH] {metric:<34} {_fmt(value):>12} (base {_fmt(ref):>10}) {delta}{flag}")
+        if bad:
+            regressed.append(metric)
+    if regressed:
+        print(f"[BENCH] {len(regressed)} regression(s) beyond {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,62 +1,34 @@
-from src.qaswp import VOCAB, QASWPSession
+import asyncio
+import os
 
+from src.qaswp import VOCAB
+from src.transport import QASWPClient
 
-def run_client():
-    print("🚀 [QASWP Client] Initializing...")
-    client_session = QASWPSession(is_client=True)
-
-    # --- Handshake ---
-    print("\n--- Handshake Step 1: Client -> Server ---")
-    client_hello = client_session.client_pass_1()
-    print(f"Sent ClientHello with nonce: {client_hello['nonce'].hex()[:16]}...")
+HOST = os.getenv("QASWP_HOST", "127.0.0.1")
+PORT = int(os.getenv("QASWP_PORT", "4433"))
 
-    # Simulate receiving server response
-    # In a real scenario, this comes over the network.
-    print("\n--- Handshake Step 2: Server -> Client (Simulated) ---")
-    # We create a temporary server session to generate the response
-    from src.qaswp import QASWPSession as ServerSession
 
-    server_session = ServerSession()
-    server_response = server_session.server_pass_2(client_hello)
-
-    if server_response["status"] == "error":
-        print(f"🔴 Handshake failed: {server_response['message']}")
-        return
-    print("Received ServerHello with ZK proof. Verification successful.")
-
-    print("\n--- Handshake Step 3: Client -> Server ---")
-    client_finish = client_session.client_pass_3(server_response)
-    if client_finish["status"] == "ok":
-        print("✅ Handshake complete. Secure session established.")
-    else:
-        print("🔴 Handshake failed at final step.")
+async def run_client():
+    print("🚀 [QASWP Client] Initializing...")
+    try:
+        conn = await QASWPClient.connect(HOST, PORT)
+    except (OSError, ConnectionError) as e:
+        print(f"🔴 Handshake failed: {e}")
         return
+    print(f"✅ Handshake complete. Entanglement ID: {conn.session.entanglement_id()}")
 
     # --- Data Transfer ---
     print("\n--- Neural-Semantic Data Transfer ---")
     message_to_send = [VOCAB["GET"], VOCAB["/api/v1/profile"]]
+    plain_total = 0
+    for _ in range(200):
+        plain_total += len(b"GET /api/v1/profile HTTP/1.1")
+        await conn.send(message_to_send)
+    await conn.close()
 
-    woven_packet = client_session.weave_packet(message_to_send)
-    print(f"Client sends woven packet. Size: {len(woven_packet['encrypted_payload'])} bytes.")
-
-    # Simulate server receiving and decoding
-    decoded_payload = server_session.receive_woven_packet(woven_packet)
-    print(f"Server decoded payload: {decoded_payload}")
-
-    # Assuming the next token is HTTP/1.1
-    if decoded_payload["prediction_id"] == VOCAB["HTTP/1.1"]:
-        print("✅ SUCCESS: Server correctly predicted the next part of the message!")
-        print("📊 Data transmitted was minimal, only the encrypted prediction.")
-    else:
-        print("❌ FAILURE: Prediction mismatch.")
-
-    flush_packet = client_session.flush()
-    if flush_packet:
-        print(
-            "🔄 Flushed trailing confirmations: "
-            f"+{flush_packet['wire_len']} bytes on the wire."
-        )
+    ratio = (1 - conn.bytes_sent / plain_total) * 100.0
+    print(f"📊 Sent {conn.bytes_sent} bytes for {plain_total} plaintext bytes ({ratio:.2f}% saved)")
 
 
 if __name__ == "__main__":
-    run_client()
+    asyncio.run(run_client())
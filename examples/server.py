@@ -1,15 +1,25 @@
-import time
+import asyncio
+import os
 
+from src.transport import QASWPServer
 
-def run_server():
-    print("🌌 [QASWP Server] Awaiting connections...")
-    # In a real server, this would be a loop listening on a socket.
-    # For this demo, we just show a message. The client-side
-    # simulation already includes the server's logic.
-    while True:
-        print("...listening...")
-        time.sleep(10)
+HOST = os.getenv("QASWP_HOST", "127.0.0.1")
+PORT = int(os.getenv("QASWP_PORT", "4433"))
+
+
+def on_packet(session, decoded):
+    print(f"📦 [{session.entanglement_id()}] {decoded}")
+
+
+async def run_server():
+    server = QASWPServer(HOST, PORT, on_packet=on_packet)
+    await server.start()
+    print(f"🌌 [QASWP Server] Listening on {HOST}:{server.port}...")
+    await server.serve_forever()
 
 
 if __name__ == "__main__":
-    run_server()
+    try:
+        asyncio.run(run_server())
+    except KeyboardInterrupt:
+        print("\n👋 [QASWP Server] Shutting down.")
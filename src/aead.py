@@ -0,0 +1,210 @@
+"""Session-scoped AEAD context with counter nonces and anti-replay window.
+
+Each direction can ratchet its key forward (IETF-DRAFT §7 key renegotiation)
+without a handshake: epoch ``n + 1`` uses ``HKDF(key_n)`` and frames carry
+the epoch's low bit as the key-phase flag. Nonce counters keep running
+across epochs, which tells a late frame of the previous epoch from the
+first frame of the next one.
+"""
+import struct
+import time
+
+NONCE_LEN = 12
+# The 4-byte nonce prefix separates the two directions that share one key, so
+# client and server counters can never produce the same nonce.
+CLIENT_PREFIX = b"\x00\x00\x00\x01"
+SERVER_PREFIX = b"\x00\x00\x00\x02"
+
+_COUNTER = struct.Struct(">Q")
+_MAX_COUNTER = (1 << 64) - 1
+
+
+def nonce_counter(nonce):
+    """The 64-bit counter of a ``prefix || counter`` nonce."""
+    return _COUNTER.unpack_from(nonce, 4)[0]
+
+
+def next_traffic_key(key, prefix):
+    """Key of the next epoch for the direction whose nonces start with ``prefix``."""
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+    kdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=b"qaswp key update|" + prefix)
+    return kdf.derive(key)
+
+
+class KeyUpdatePolicy:
+    """When a sender moves to its next key epoch; the first limit reached wins.
+
+    Args:
+        max_packets (int, optional): Frames per epoch. The default of 2**24
+            stays well inside the AES-GCM usage limits.
+        max_bytes (int, optional): Plaintext bytes per epoch.
+        max_age (float, optional): Seconds per epoch, measured from the
+            epoch's first frame.
+        clock (callable): Monotonic time source for ``max_age``.
+    """
+
+    def __init__(self, max_packets=1 << 24, max_bytes=None, max_age=None, clock=time.monotonic):
+        self.max_packets = max_packets
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.clock = clock
+
+    def due(self, cipher):
+        """Return True if ``cipher`` should update its sending key now."""
+        if self.max_packets is not None and cipher.tx_packets >= self.max_packets:
+            return True
+        if self.max_bytes is not None and cipher.tx_bytes >= self.max_bytes:
+            return True
+        if self.max_age is not None:
+            now = self.clock()
+            if cipher.tx_epoch_started is None:
+                cipher.tx_epoch_started = now
+            elif now - cipher.tx_epoch_started >= self.max_age:
+                return True
+        return False
+
+
+class ReplayWindow:
+    """Sliding bitmap window over 64-bit packet counters (RFC 4303 §3.4.3 style).
+
+    Bit ``i`` of ``bitmap`` records whether ``highest - i`` has been seen.
+    """
+
+    def __init__(self, size=1024):
+        if size <= 0:
+            raise ValueError("replay window size must be positive")
+        self.size = size
+        self.highest = -1
+        self.bitmap = 0
+
+    def check(self, counter):
+        """Return True if ``counter`` is new and inside the window."""
+        if counter > self.highest:
+            return True
+        offset = self.highest - counter
+        if offset >= self.size:
+            return False
+        return not (self.bitmap >> offset) & 1
+
+    def update(self, counter):
+        """Mark ``counter`` as seen. Call only after the packet authenticated."""
+        if counter > self.highest:
+            shift = counter - self.highest
+            self.bitmap = (
+                1 if shift >= self.size else ((self.bitmap << shift) | 1) & ((1 << self.size) - 1)
+            )
+            self.highest = counter
+        else:
+            self.bitmap |= 1 << (self.highest - counter)
+
+    def accept(self, counter):
+        """Check and mark ``counter`` in one step."""
+        if not self.check(counter):
+            return False
+        self.update(counter)
+        return True
+
+
+class SessionCipher:
+    """One AES-GCM instance per session key plus per-direction nonce state.
+
+    Outgoing nonces are ``prefix || counter`` so no RNG call is needed per
+    packet. Incoming nonces must carry the peer's prefix, so a frame reflected
+    back at its sender is dropped, and their counters are tracked in a
+    :class:`ReplayWindow`. Both directions start at epoch 0 with the session key; the receive side
+    keeps the previous, current and (once seen) next epoch's keys.
+    """
+
+    def __init__(self, key, is_client, window=1024):
+        # cryptography loads with the first session key, not at import time
+        from cryptography.exceptions import InvalidTag
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+        self.key = key
+        self._new_aead = AESGCM
+        self._aead = AESGCM(key)
+        # exceptions decrypt() raises for forged or malformed input
+        self.auth_errors = (InvalidTag, ValueError)
+        self._prefix = CLIENT_PREFIX if is_client else SERVER_PREFIX
+        self._peer_prefix = SERVER_PREFIX if is_client else CLIENT_PREFIX
+        self._counter = 0
+        # sending epoch and what it has protected so far (see KeyUpdatePolicy)
+        self.tx_epoch = 0
+        self._tx_key = key
+        self.tx_packets = 0
+        self.tx_bytes = 0
+        self.tx_epoch_started = None
+        # receiving epochs: epoch -> (key, AEAD), and the nonce counter of the
+        # first frame accepted in the current one
+        self.rx_epoch = 0
+        self.rx_epoch_start = 0
+        self._rx_keys = {0: (key, self._aead)}
+        self._window = ReplayWindow(window)
+
+    def next_nonce(self):
+        """Return the next unique nonce for this direction."""
+        if self._counter > _MAX_COUNTER:
+            raise OverflowError("nonce counter exhausted; rekey the session")
+        nonce = self._prefix + _COUNTER.pack(self._counter)
+        self._counter += 1
+        return nonce
+
+    def encrypt(self, nonce, data, aad):
+        self.tx_packets += 1
+        self.tx_bytes += len(data)
+        return self._aead.encrypt(nonce, data, aad)
+
+    def decrypt(self, nonce, data, aad, epoch=0):
+        """Authenticate and decrypt; raises ``InvalidTag``/``ValueError``."""
+        return self._rx_entry(epoch)[1].decrypt(nonce, data, aad)
+
+    def update_tx(self):
+        """Move the sending direction to its next key epoch."""
+        self._tx_key = next_traffic_key(self._tx_key, self._prefix)
+        self._aead = self._new_aead(self._tx_key)
+        self.tx_epoch += 1
+        self.tx_packets = 0
+        self.tx_bytes = 0
+        self.tx_epoch_started = None
+
+    def rx_epoch_for(self, nonce, phase):
+        """Epoch of an incoming frame from its counter nonce and key-phase bit."""
+        epoch = self.rx_epoch
+        if bool(phase) != bool(epoch & 1):
+            # counters never go back, so a frame older than the current epoch's
+            # first one belongs to the previous epoch, anything else to the next
+            epoch += -1 if nonce_counter(nonce) < self.rx_epoch_start else 1
+        return epoch
+
+    def _rx_entry(self, epoch):
+        entry = self._rx_keys.get(epoch)
+        if entry is None:
+            # later epochs are derived on demand; older keys were dropped
+            if epoch <= self.rx_epoch:
+                raise ValueError(f"no key for epoch {epoch}")
+            key = next_traffic_key(self._rx_entry(epoch - 1)[0], self._peer_prefix)
+            entry = self._rx_keys[epoch] = (key, self._new_aead(key))
+        return entry
+
+    def rx_commit(self, epoch, nonce):
+        """Record an authenticated frame of ``epoch``; a newer epoch becomes current."""
+        if epoch <= self.rx_epoch:
+            return
+        self.rx_epoch = epoch
+        self.rx_epoch_start = nonce_counter(nonce)
+        self._rx_keys = {e: k for e, k in self._rx_keys.items() if e >= epoch - 1}
+
+    def replay_check(self, nonce):
+        """Return True if ``nonce`` is a fresh counter nonce from the peer."""
+        if len(nonce) != NONCE_LEN or bytes(nonce[:4]) != self._peer_prefix:
+            # our own prefix would be a frame reflected back at us
+            return False
+        return self._window.check(_COUNTER.unpack_from(nonce, 4)[0])
+
+    def replay_accept(self, nonce):
+        """Check and record an authenticated nonce in one step; False for a replay."""
+        if len(nonce) != NONCE_LEN or bytes(nonce[:4]) != self._peer_prefix:
+            return False
+        return self._window.accept(_COUNTER.unpack_from(nonce, 4)[0])
@@ -0,0 +1,99 @@
+"""Confirmation batching policies: size limits, flush deadlines and adaptation.
+
+The default policy reproduces the classic fixed 64-confirmation batch with no
+deadline and never reads the clock. Deployments can instead bound how long a
+confirmation may wait (``max_delay``) and let the batch size follow the
+observed prediction hit rate and send rate.
+"""
+import time
+
+# batch ``count`` travels in a 16-bit field of the binary frame body
+MAX_BATCH_LIMIT = 0xFFFF
+
+
+class BatchPolicy:
+    """How many confirmations to buffer and for how long.
+
+    Args:
+        batch_size (int): Initial (and, when not adaptive, fixed) batch size.
+        max_delay (float, optional): Seconds a buffered confirmation may wait
+            before the batch is flushed by the next weave or :meth:`poll`.
+        adaptive (bool): Resize batches after each flush from the smoothed hit
+            rate and send rate.
+        min_batch (int): Lower bound for adaptive sizes; the ``max_delay`` cap
+            may still go below it.
+        max_batch (int): Upper bound for adaptive sizes (at most 65535).
+        grow_above (float): Double the batch when the hit rate is at least this.
+        shrink_below (float): Halve the batch when the hit rate is below this.
+        smoothing (float): EWMA weight of the newest observation.
+        clock (callable): Monotonic time source, injectable for tests.
+    """
+
+    def __init__(
+        self,
+        batch_size=64,
+        max_delay=None,
+        adaptive=False,
+        min_batch=8,
+        max_batch=4096,
+        grow_above=0.95,
+        shrink_below=0.5,
+        smoothing=0.2,
+        clock=time.monotonic,
+    ):
+        if not 1 <= min_batch <= max_batch <= MAX_BATCH_LIMIT:
+            raise ValueError(f"need 1 <= min_batch <= max_batch <= {MAX_BATCH_LIMIT}")
+        if not 1 <= batch_size <= MAX_BATCH_LIMIT:
+            raise ValueError(f"batch_size must be in 1..{MAX_BATCH_LIMIT}")
+        if max_delay is not None and max_delay <= 0:
+            raise ValueError("max_delay must be positive")
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.adaptive = adaptive
+        self.min_batch = min_batch
+        self.max_batch = max_batch
+        self.grow_above = grow_above
+        self.shrink_below = shrink_below
+        self.smoothing = smoothing
+        self.clock = clock
+        # the fixed default never pays for a clock read on the hot path
+        self.timed = adaptive or max_delay is not None
+
+    def initial_limit(self):
+        if self.adaptive:
+            return min(max(self.batch_size, self.min_batch), self.max_batch)
+        return self.batch_size
+
+    def observe(self, ctx, hit, now):
+        """Fold one prediction outcome at time ``now`` into the context's rates."""
+        a = self.smoothing
+        ctx.hit_rate += a * ((1.0 if hit else 0.0) - ctx.hit_rate)
+        if ctx.last_event is not None:
+            gap = now - ctx.last_event
+            if gap > 0:
+                ctx.send_rate += a * (1.0 / gap - ctx.send_rate)
+        ctx.last_event = now
+
+    def deadline_due(self, ctx, now):
+        """True if the oldest buffered confirmation has waited ``max_delay``."""
+        return (
+            self.max_delay is not None
+            and ctx.batch_started is not None
+            and now - ctx.batch_started >= self.max_delay
+        )
+
+    def next_limit(self, ctx):
+        """Batch size to use after a flush of ``ctx``."""
+        if not self.adaptive:
+            return ctx.batch_limit
+        limit = ctx.batch_limit
+        if ctx.hit_rate >= self.grow_above:
+            limit *= 2
+        elif ctx.hit_rate < self.shrink_below:
+            limit //= 2
+        limit = min(max(limit, self.min_batch), self.max_batch)
+        if self.max_delay is not None and ctx.send_rate > 0:
+            # never plan a batch that cannot fill before its deadline, even
+            # if that means going below min_batch
+            limit = min(limit, int(ctx.send_rate * self.max_delay) or 1)
+        return limit
@@ -8,7 +8,38 @@ def is_demo_mode() -> bool:
     return val in ("1", "true", "yes", "y")
 
 
+def model_file():
+    """Return the weight file named by QASWP_MODEL_FILE, or None.
+
+    When set, it replaces the built-in demo model as the registry default.
+    """
+    return os.getenv("QASWP_MODEL_FILE") or None
+
+
 def is_qiskit_enabled() -> bool:
     """Return True when the Qiskit integration flag (QASWP_QISKIT) is enabled."""
     val = os.getenv("QASWP_QISKIT", "0").strip().lower()
     return val in ("1", "true", "yes", "y")
+
+
+def is_qkd_distill_enabled() -> bool:
+    """Return True unless QASWP_QKD_DISTILL turns off QKD post-processing.
+
+    When off, handshakes use the raw sifted BB84 key as before.
+    """
+    val = os.getenv("QASWP_QKD_DISTILL", "1").strip().lower()
+    return val in ("1", "true", "yes", "y")
+
+
+def profile_every() -> int:
+    """Return the QASWP_PROFILE sampling interval; 0 means profiling is off.
+
+    ``1``/``true`` traces every profiled call, an integer ``N`` one call in N.
+    """
+    val = os.getenv("QASWP_PROFILE", "0").strip().lower()
+    if val in ("true", "yes", "y"):
+        return 1
+    try:
+        return max(0, int(val))
+    except ValueError:
+        return 0
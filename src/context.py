@@ -0,0 +1,97 @@
+"""Per-stream state for multiplexed semantic contexts (IETF-DRAFT §5.2/§5.3).
+
+One session key carries up to 256 independent streams, identified by the
+8-bit Context ID in the frame header. Each stream keeps its own prediction
+context, confirmation batch and sequence space.
+"""
+from .wire import SEQ_MASK
+
+MAX_CONTEXT_ID = 0xFF
+_SEQ_HALF = (SEQ_MASK + 1) >> 1
+
+
+def check_context_id(context_id):
+    """Validate an 8-bit context ID.
+
+    Raises:
+        ValueError: If ``context_id`` is not an int in ``0..255``.
+    """
+    if not isinstance(context_id, int) or not 0 <= context_id <= MAX_CONTEXT_ID:
+        raise ValueError(f"context id must be an integer in 0..{MAX_CONTEXT_ID}")
+    return context_id
+
+
+class StreamContext:
+    """Sender- and receiver-side state of one multiplexed stream."""
+
+    def __init__(self, context_id, new_kv_cache, batch_limit=64):
+        self.context_id = check_context_id(context_id)
+        # sender: pending confirmation bitmap (MSB-first, one bit per message)
+        # and next sequence number. A bytearray keeps appends O(1) for batches
+        # of thousands of confirmations.
+        self.confirm_buf = bytearray()
+        self.confirm_count = 0
+        self.seq = 0
+        # times ``seq`` passed a multiple of 2**32; each wrap starts a key epoch
+        self.seq_wraps = 0
+        # batching policy state: current size limit, when the pending batch
+        # started, and smoothed hit rate (0..1) / send rate (messages per second)
+        self.batch_limit = batch_limit
+        self.batch_started = None
+        self.hit_rate = 1.0
+        self.send_rate = 0.0
+        self.last_event = None
+        # attention K/V state for this stream's history (model weights are
+        # shared); built on first use so receive-only contexts never load a model
+        self._new_kv_cache = new_kv_cache
+        self._kv_cache = None
+        # optional PredictorChain for weave_packet/weave_many (src/predictor.py)
+        self.predictor = None
+        # receiver: next sequence number expected from the peer on this stream
+        self.rx_seq = 0
+        self.rx_frames = 0
+        # reconstructable token stream: sender history/coder (src/entropy.py)
+        # and receiver StreamDecoder (src/reconstruct.py), created on first use
+        self.tx_coder = None
+        self.decoder = None
+
+    @property
+    def kv_cache(self):
+        cache = self._kv_cache
+        if cache is None:
+            cache = self._kv_cache = self._new_kv_cache()
+        return cache
+
+    @property
+    def confirm_bits(self):
+        """Pending confirmations as an int; the first message is the top bit."""
+        pad = len(self.confirm_buf) * 8 - self.confirm_count
+        return int.from_bytes(self.confirm_buf, "big") >> pad
+
+    def add_confirmation(self, hit=True):
+        """Append one confirmation bit to the pending batch."""
+        index = self.confirm_count
+        if not index & 7:
+            self.confirm_buf.append(0)
+        if hit:
+            self.confirm_buf[index >> 3] |= 0x80 >> (index & 7)
+        self.confirm_count = index + 1
+
+    def take_batch(self):
+        """Return ``(seq, count, bits)`` for the pending batch and reset it."""
+        batch = (self.seq, self.confirm_count, self.confirm_bits)
+        self.seq += self.confirm_count
+        self.confirm_buf = bytearray()
+        self.confirm_count = 0
+        self.batch_started = None
+        return batch
+
+    def advance_rx(self, decoded):
+        """Record a decoded frame received on this stream."""
+        covered = decoded.get("count", 1)
+        # header seqs are 32-bit; place them within half the space of rx_seq
+        delta = (decoded.get("seq", 0) - self.rx_seq) & SEQ_MASK
+        if delta >= _SEQ_HALF:
+            delta -= SEQ_MASK + 1
+        self.rx_seq = max(self.rx_seq, self.rx_seq + delta + covered)
+        self.rx_frames += 1
@@ -0,0 +1,207 @@
+"""Model-driven arithmetic coding of token streams.
+
+The model's next-token softmax is quantized to integer frequencies (every
+token keeps at least one count) and fed to a 32-bit binary arithmetic coder,
+so a confidently predicted token costs a fraction of a bit and a surprise
+costs a few bits instead of a whole delta frame. All coder arithmetic is on
+integers; both peers run the same model over the same history, so they
+derive the same frequency tables and stay bit-exact.
+"""
+from bisect import bisect_right
+
+import numpy as np
+
+FREQ_BITS = 16
+FREQ_TOTAL = 1 << FREQ_BITS
+
+_PRECISION = 32
+_MASK = (1 << _PRECISION) - 1
+_HALF = 1 << (_PRECISION - 1)
+_QUARTER = 1 << (_PRECISION - 2)
+_THREE_QUARTERS = _HALF + _QUARTER
+
+# history seed for the first token of a stream (the model needs one token)
+BOS_TOKEN = 0
+
+
+def quantize(probs, total=FREQ_TOTAL):
+    """Quantize a probability vector to a cumulative frequency table.
+
+    Each symbol gets ``1 + floor(p * (total - n))`` counts and the rounding
+    remainder goes to the most likely symbol, so no symbol is impossible and
+    the counts sum to exactly ``total``.
+
+    Returns:
+        list: ``n + 1`` non-decreasing ints from ``0`` to ``total``.
+    """
+    p = np.asarray(probs, dtype=np.float64)
+    n = len(p)
+    if not 0 < n < total:
+        raise ValueError("alphabet must be non-empty and smaller than the frequency total")
+    p = np.clip(p, 0.0, None)
+    s = p.sum()
+    p = p / s if s > 0 else np.full(n, 1.0 / n)
+    freqs = 1 + np.floor(p * (total - n)).astype(np.int64)
+    freqs[int(np.argmax(p))] += total - int(freqs.sum())
+    return [0] + np.cumsum(freqs).tolist()
+
+
+class ArithmeticEncoder:
+    """Binary arithmetic encoder (Witten–Neal–Cleary) with 32-bit state."""
+
+    def __init__(self):
+        self.low = 0
+        self.high = _MASK
+        self.pending = 0
+        self.out = bytearray()
+        self.nbits = 0
+        self._byte = 0
+
+    def _bit(self, bit):
+        self._byte = (self._byte << 1) | bit
+        self.nbits += 1
+        if not self.nbits & 7:
+            self.out.append(self._byte)
+            self._byte = 0
+
+    def _emit(self, bit):
+        self._bit(bit)
+        for _ in range(self.pending):
+            self._bit(bit ^ 1)
+        self.pending = 0
+
+    def encode(self, cum, symbol):
+        """Encode ``symbol`` under the cumulative table ``cum``."""
+        total = cum[-1]
+        span = self.high - self.low + 1
+        self.high = self.low + span * cum[symbol + 1] // total - 1
+        self.low = self.low + span * cum[symbol] // total
+        while True:
+            if self.high < _HALF:
+                self._emit(0)
+            elif self.low >= _HALF:
+                self._emit(1)
+                self.low -= _HALF
+                self.high -= _HALF
+            elif self.low >= _QUARTER and self.high < _THREE_QUARTERS:
+                self.pending += 1
+                self.low -= _QUARTER
+                self.high -= _QUARTER
+            else:
+                break
+            self.low <<= 1
+            self.high = (self.high << 1) | 1
+
+    def finish(self):
+        """Flush the final interval and return the coded bytes."""
+        self.pending += 1
+        self._emit(0 if self.low < _QUARTER else 1)
+        if self.nbits & 7:
+            self.out.append(self._byte << (8 - (self.nbits & 7)))
+        return bytes(self.out)
+
+
+class ArithmeticDecoder:
+    """Inverse of :class:`ArithmeticEncoder`; reads zeros past the end of ``data``."""
+
+    def __init__(self, data):
+        self._bits = int.from_bytes(data, "big")
+        self._nbits = len(data) * 8
+        self._pos = 0
+        self.low = 0
+        self.high = _MASK
+        self.value = 0
+        for _ in range(_PRECISION):
+            self.value = (self.value << 1) | self._next_bit()
+
+    def _next_bit(self):
+        pos = self._pos
+        self._pos = pos + 1
+        if pos >= self._nbits:
+            return 0
+        return (self._bits >> (self._nbits - 1 - pos)) & 1
+
+    def decode(self, cum):
+        """Decode one symbol under the cumulative table ``cum``."""
+        total = cum[-1]
+        span = self.high - self.low + 1
+        target = ((self.value - self.low + 1) * total - 1) // span
+        symbol = bisect_right(cum, target) - 1
+        self.high = self.low + span * cum[symbol + 1] // total - 1
+        self.low = self.low + span * cum[symbol] // total
+        while True:
+            if self.high < _HALF:
+                pass
+            elif self.low >= _HALF:
+                self.low -= _HALF
+                self.high -= _HALF
+                self.value -= _HALF
+            elif self.low >= _QUARTER and self.high < _THREE_QUARTERS:
+                self.low -= _QUARTER
+                self.high -= _QUARTER
+                self.value -= _QUARTER
+            else:
+                break
+            self.low <<= 1
+            self.high = (self.high << 1) | 1
+            self.value = (self.value << 1) | self._next_bit()
+        return symbol
+
+
+class TokenCoder:
+    """One direction of a token stream over a shared model.
+
+    The coder keeps the stream history (seeded with :data:`BOS_TOKEN`) and a
+    KV cache, so each token costs one incremental forward pass. Sender and
+    receiver each hold their own coder for the same stream; predicted
+    (confirmed), corrected and arithmetic-coded tokens all extend the same
+    history, so the peers' models stay in step. An optional
+    :class:`~src.predictor.PredictorChain` answers :meth:`predict` before the
+    model and sees every token appended to the history.
+    """
+
+    def __init__(self, model, predictor=None):
+        self.model = model
+        self.predictor = predictor
+        self.history = [BOS_TOKEN]
+        self.kv_cache = model.new_kv_cache()
+
+    def predict(self):
+        """Most likely next token given the history."""
+        if self.predictor is not None:
+            return self.predictor.predict(self.history, self.kv_cache)
+        logits = self.model.next_token_logits_cached(self.history, self.kv_cache)
+        return int(logits.argmax())
+
+    def push(self, token):
+        """Append a token that was sent or reconstructed outside the coder."""
+        if self.predictor is not None:
+            self.predictor.update(self.history, token)
+        self.history.append(token)
+
+    def _table(self):
+        logits = self.model.next_token_logits_cached(self.history, self.kv_cache)
+        z = np.asarray(logits, dtype=np.float64)
+        p = np.exp(z - z.max())
+        return quantize(p / p.sum())
+
+    def encode(self, tokens):
+        """Encode ``tokens`` after the current history; returns the coded bytes."""
+        enc = ArithmeticEncoder()
+        for token in tokens:
+            cum = self._table()
+            if not 0 <= token < len(cum) - 1:
+                raise ValueError(f"token {token} is outside the model vocabulary")
+            enc.encode(cum, token)
+            self.push(token)
+        return enc.finish()
+
+    def decode(self, data, count):
+        """Decode ``count`` tokens from ``data`` and append them to the history."""
+        dec = ArithmeticDecoder(data)
+        tokens = []
+        for _ in range(count):
+            token = dec.decode(self._table())
+            self.push(token)
+            tokens.append(token)
+        return tokens
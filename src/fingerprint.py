@@ -0,0 +1,84 @@
+"""Merkle fingerprints over raw model parameter buffers.
+
+Each named tensor becomes a leaf ``H(name, dtype, shape, bytes)``; the model
+fingerprint is the Merkle root over the leaves in name order. Peers that
+exchange leaf digests can tell which layers differ without rehashing.
+"""
+import hashlib
+
+_CHUNK = 1 << 20
+_EMPTY_ROOT = hashlib.sha256(b"qaswp-merkle|empty").digest()
+
+
+def leaf_digest(name, dtype, shape, data):
+    """Hash one tensor given its name, dtype string, shape and raw buffer."""
+    h = hashlib.sha256(b"qaswp-leaf|")
+    h.update(f"{name}|{dtype}|{','.join(map(str, shape))}|".encode())
+    view = memoryview(data).cast("B")
+    for start in range(0, len(view), _CHUNK):
+        h.update(view[start : start + _CHUNK])
+    return h.digest()
+
+
+def tensor_digest(name, tensor):
+    """Leaf digest of a torch tensor, read straight from its storage."""
+    import torch
+
+    t = tensor.detach()
+    if t.device.type != "cpu":
+        t = t.cpu()
+    raw = t.contiguous().reshape(-1).view(torch.uint8).numpy()
+    return leaf_digest(name, str(t.dtype).replace("torch.", ""), tuple(t.shape), raw)
+
+
+def merkle_root(leaves):
+    """Merkle root of an ordered list of leaf digests (odd nodes are promoted)."""
+    level = list(leaves)
+    if not level:
+        return _EMPTY_ROOT
+    while len(level) > 1:
+        nxt = [
+            hashlib.sha256(b"qaswp-node|" + level[i] + level[i + 1]).digest()
+            for i in range(0, len(level) - 1, 2)
+        ]
+        if len(level) % 2:
+            nxt.append(level[-1])
+        level = nxt
+    return level[0]
+
+
+class ModelFingerprint:
+    """Merkle root plus the per-tensor leaf digests it was built from."""
+
+    __slots__ = ("leaves", "root")
+
+    def __init__(self, leaves):
+        self.leaves = dict(sorted(leaves.items()))
+        self.root = merkle_root(list(self.leaves.values()))
+
+    def diff(self, other):
+        """Return the sorted tensor names whose digests differ from ``other``.
+
+        ``other`` may be a :class:`ModelFingerprint` or a ``name -> digest`` dict.
+        """
+        theirs = other.leaves if isinstance(other, ModelFingerprint) else other
+        names = set(self.leaves) | set(theirs)
+        return sorted(n for n in names if self.leaves.get(n) != theirs.get(n))
+
+
+def state_version(module):
+    """Cheap change token for a module: tensor identity, storage and version."""
+    return tuple(
+        (name, t.data_ptr(), t._version)
+        for name, t in (*module.named_parameters(), *module.named_buffers())
+    )
+
+
+def fingerprint_module(module):
+    """Compute a :class:`ModelFingerprint` over parameters and buffers."""
+    return ModelFingerprint(
+        {
+            name: tensor_digest(name, t)
+            for name, t in (*module.named_parameters(), *module.named_buffers())
+        }
+    )
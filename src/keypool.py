@@ -0,0 +1,175 @@
+"""Background-refilled pool of QKD master keys.
+
+Handshakes take a pre-generated key instead of running the BB84 simulation on
+their critical path. A refill thread keeps the pool between the low and high
+watermarks; each key is handed out exactly once. Runs rejected for high QBER
+are retried a bounded number of times, so a tapped channel still surfaces as
+a ``ValueError`` rather than a hang.
+"""
+import threading
+from collections import deque
+
+import numpy as np
+
+from .qkd import master_key
+
+
+class QKDKeyPool:
+    """Pool of one-time QKD master keys with high/low watermark refills.
+
+    Args:
+        low_watermark (int): Refill starts when fewer keys than this remain.
+        high_watermark (int): Refill stops once this many keys are pooled.
+        key_length (int, optional): Qubits per BB84 run; None keeps the
+            :func:`src.qkd.master_key` default.
+        seed (int, optional): Seed for the pool's private ``numpy.random.Generator``.
+        keygen (callable, optional): ``keygen(rng) -> bytes``; defaults to
+            :func:`src.qkd.master_key`.
+        autostart (bool): Start the refill thread immediately.
+        max_failures (int): Consecutive rejected runs after which a synchronous
+            fallback gives up and re-raises the keygen's ``ValueError``.
+        retry_backoff (tuple): ``(initial, maximum)`` seconds the refill thread
+            sleeps after a rejected run, doubling while runs keep failing.
+    """
+
+    def __init__(
+        self,
+        low_watermark=8,
+        high_watermark=32,
+        key_length=None,
+        seed=None,
+        keygen=None,
+        autostart=True,
+        max_failures=8,
+        retry_backoff=(0.05, 5.0),
+    ):
+        if not 0 <= low_watermark <= high_watermark or high_watermark <= 0:
+            raise ValueError("watermarks must satisfy 0 <= low <= high and high > 0")
+        if max_failures < 1:
+            raise ValueError("max_failures must be at least 1")
+        self.low_watermark = low_watermark
+        self.high_watermark = high_watermark
+        self.max_failures = max_failures
+        self.retry_backoff = retry_backoff
+        self._keygen = keygen or (lambda rng: master_key(length=key_length, rng=rng))
+        # Separate streams: the refill thread and synchronous fallbacks never
+        # share a Generator (they are not thread-safe).
+        refill_seq, fallback_seq = np.random.SeedSequence(seed).spawn(2)
+        self._rng = np.random.default_rng(refill_seq)
+        self._fallback_rng = np.random.default_rng(fallback_seq)
+        self._fallback_lock = threading.Lock()
+        self._keys = deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self.generated = 0
+        self.served = 0
+        self.fallbacks = 0
+        self.failures = 0
+        if autostart:
+            self.start()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._keys)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """Start the refill thread (no-op if already running)."""
+        with self._cond:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._refill_loop, name="qaswp-qkd-pool", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self, timeout=None):
+        """Stop the refill thread; pooled keys remain available."""
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+            thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def wait_until_full(self, timeout=None):
+        """Block until the pool reaches the high watermark; returns success."""
+        with self._cond:
+            return self._cond.wait_for(lambda: len(self._keys) >= self.high_watermark, timeout)
+
+    def get_key(self, timeout=0.0):
+        """Take a key out of the pool.
+
+        Waits up to ``timeout`` seconds for the refill thread when the pool is
+        empty, then falls back to generating a key synchronously.
+
+        Returns:
+            bytes: A master key that no other caller will receive.
+
+        Raises:
+            ValueError: If ``max_failures`` synchronous runs in a row were
+                rejected (QBER above threshold, e.g. an eavesdropper).
+        """
+        with self._cond:
+            if not self._keys and timeout:
+                self._cond.wait_for(lambda: self._keys or self._stopping, timeout)
+            if self._keys:
+                key = self._keys.popleft()
+                self.served += 1
+                if len(self._keys) < self.low_watermark:
+                    self._cond.notify_all()
+                return key
+            self.fallbacks += 1
+            self._cond.notify_all()
+        with self._fallback_lock:
+            for _ in range(self.max_failures):
+                try:
+                    return self._generate(self._fallback_rng)
+                except ValueError as exc:
+                    error = exc
+        raise error
+
+    def _generate(self, rng):
+        try:
+            key = self._keygen(rng)
+        except ValueError:
+            # QBER above threshold on this run (noise or eavesdropper): discard.
+            with self._cond:
+                self.failures += 1
+            raise
+        with self._cond:
+            self.generated += 1
+        return key
+
+    def _refill_loop(self):
+        delay = None
+        while True:
+            # Top up to the high watermark, then sleep until below the low one.
+            while True:
+                with self._cond:
+                    if self._stopping:
+                        return
+                    if len(self._keys) >= self.high_watermark:
+                        break
+                try:
+                    key = self._generate(self._rng)
+                except ValueError:
+                    # back off instead of spinning while the channel stays bad
+                    initial, maximum = self.retry_backoff
+                    delay = initial if delay is None else min(delay * 2, maximum)
+                    with self._cond:
+                        self._cond.wait_for(lambda: self._stopping, delay)
+                    continue
+                delay = None
+                with self._cond:
+                    self._keys.append(key)
+                    self._cond.notify_all()
+            with self._cond:
+                self._cond.wait_for(lambda: self._stopping or len(self._keys) < self.low_watermark)
@@ -0,0 +1,244 @@
+"""Counters and histograms with Prometheus text exposition.
+
+Off unless ``QASWP_METRICS`` is set (or :func:`enable` is called). While
+off, sessions get ``metrics = None`` and the instrumented paths cost one
+``is None`` check.
+
+While on, each session owns a :class:`SessionMetrics` with plain integer
+fields, so an increment is one attribute add and takes no lock. The
+process-wide view in :func:`exposition` sums the live sessions plus
+the totals of sessions already collected. Handshake duration, batch size
+and QKD QBER go to process-wide :class:`Histogram` objects.
+"""
+import bisect
+import os
+import weakref
+
+from . import wire
+from .aead import NONCE_LEN
+
+
+def _env_enabled():
+    return os.getenv("QASWP_METRICS", "0").strip().lower() in ("1", "true", "yes", "y")
+
+
+_enabled = _env_enabled()
+
+# What one token costs when it has to travel as its own delta frame; every
+# token carried by a confirmation bit or a coded frame is measured against it.
+DELTA_FRAME_LEN = (
+    wire.HEADER_LEN
+    + NONCE_LEN
+    + len(wire.encode_body({"t": "delta", "seq": 0, "need": 0}))
+    + wire.TAG_LEN
+)
+
+
+def enabled():
+    return _enabled
+
+
+def enable(on=True):
+    """Turn collection on or off for sessions created from now on."""
+    global _enabled
+    _enabled = on
+
+
+class SessionMetrics:
+    """Per-session counters; read them directly or via :meth:`as_dict`."""
+
+    FIELDS = (
+        "hits",
+        "misses",
+        "batches",
+        "deltas",
+        "coded",
+        "wire_bytes",
+        "bytes_saved",
+        "received",
+        "drop_placeholder",
+        "drop_malformed",
+        "drop_auth",
+        "drop_replay",
+        "decode_errors",
+    )
+    __slots__ = FIELDS
+
+    def __init__(self):
+        for name in self.FIELDS:
+            setattr(self, name, 0)
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def sent(self, frame_len, tokens):
+        """Account one frame carrying ``tokens`` tokens."""
+        self.wire_bytes += frame_len
+        self.bytes_saved += tokens * DELTA_FRAME_LEN - frame_len
+
+
+class Histogram:
+    """Fixed-bucket histogram; ``observe`` is a bisect and three adds."""
+
+    def __init__(self, name, help_text, buckets, labels=None):
+        self.name = name
+        self.help = help_text
+        self.bounds = tuple(buckets)
+        self.labels = labels or {}
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        """``(suffix, labels, value)`` rows in exposition order."""
+        rows, running = [], 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts, strict=True):
+            running += n
+            rows.append(("_bucket", dict(self.labels, le=_fmt(bound)), running))
+        rows.append(("_sum", self.labels, self.sum))
+        rows.append(("_count", self.labels, self.count))
+        return rows
+
+
+_live = set()
+_retired = dict.fromkeys(SessionMetrics.FIELDS, 0)
+_created = 0
+
+HANDSHAKE_SECONDS = {
+    role: Histogram(
+        "qaswp_handshake_seconds",
+        "Handshake duration, first pass to key installed.",
+        (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+        {"role": role},
+    )
+    for role in ("client", "server")
+}
+BATCH_CONFIRMATIONS = Histogram(
+    "qaswp_batch_confirmations",
+    "Confirmations per flushed batch frame.",
+    tuple(1 << i for i in range(17)),
+)
+QKD_QBER = Histogram(
+    "qaswp_qkd_qber",
+    "Quantum bit error rate measured by BB84 key generation.",
+    (0.005, 0.01, 0.02, 0.03, 0.05, 0.08, 0.11, 0.15, 0.25, 0.5),
+)
+HISTOGRAMS = (*HANDSHAKE_SECONDS.values(), BATCH_CONFIRMATIONS, QKD_QBER)
+
+
+def _retire(m):
+    _live.discard(m)
+    for name in SessionMetrics.FIELDS:
+        _retired[name] += getattr(m, name)
+
+
+def session_metrics(session):
+    """Return a :class:`SessionMetrics` tracked for ``session``, or None when off."""
+    global _created
+    if not _enabled:
+        return None
+    m = SessionMetrics()
+    _created += 1
+    _live.add(m)
+    weakref.finalize(session, _retire, m)
+    return m
+
+
+def totals():
+    """Process-wide sums of every :class:`SessionMetrics` field."""
+    out = dict(_retired)
+    for m in list(_live):
+        for name in SessionMetrics.FIELDS:
+            out[name] += getattr(m, name)
+    return out
+
+
+def reset():
+    """Zero the process-wide totals and histograms (live sessions keep theirs)."""
+    global _created
+    _created = 0
+    for name in _retired:
+        _retired[name] = 0
+    for h in HISTOGRAMS:
+        h.counts = [0] * len(h.counts)
+        h.sum = 0.0
+        h.count = 0
+
+
+def _fmt(value):
+    if value == float("inf"):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+def _line(name, labels, value):
+    if labels:
+        body = ",".join(f'{k}="{v}"' for k, v in labels.items())
+        return f"{name}{{{body}}} {_fmt(value)}"
+    return f"{name} {_fmt(value)}"
+
+
+def exposition():
+    """Render all metrics in the Prometheus text format (version 0.0.4)."""
+    t = totals()
+    counters = (
+        ("qaswp_sessions_total", "Sessions created with metrics on.", [({}, _created)]),
+        (
+            "qaswp_predictions_total",
+            "Sender-side next-token predictions by outcome.",
+            [({"result": "hit"}, t["hits"]), ({"result": "miss"}, t["misses"])],
+        ),
+        (
+            "qaswp_frames_sent_total",
+            "Frames sent by kind.",
+            [
+                ({"kind": "batch"}, t["batches"]),
+                ({"kind": "delta"}, t["deltas"]),
+                ({"kind": "coded"}, t["coded"]),
+            ],
+        ),
+        ("qaswp_wire_bytes_sent_total", "Bytes of sent frames.", [({}, t["wire_bytes"])]),
+        (
+            "qaswp_bytes_saved_total",
+            "Bytes saved against sending every token as its own delta frame.",
+            [({}, t["bytes_saved"])],
+        ),
+        ("qaswp_packets_received_total", "Packets accepted.", [({}, t["received"])]),
+        (
+            "qaswp_packets_dropped_total",
+            "Received packets dropped, by reason.",
+            [
+                ({"reason": r}, t[f"drop_{r}"])
+                for r in ("placeholder", "malformed", "auth", "replay")
+            ],
+        ),
+        (
+            "qaswp_decode_errors_total",
+            "Accepted frames the stream decoder could not apply.",
+            [({}, t["decode_errors"])],
+        ),
+    )
+    lines = [
+        "# HELP qaswp_sessions_live Sessions with metrics that are still alive.",
+        "# TYPE qaswp_sessions_live gauge",
+        _line("qaswp_sessions_live", {}, len(_live)),
+    ]
+    for name, help_text, samples in counters:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} counter")
+        lines.extend(_line(name, labels, value) for labels, value in samples)
+    seen = set()
+    for h in HISTOGRAMS:
+        if h.name not in seen:
+            seen.add(h.name)
+            lines.append(f"# HELP {h.name} {h.help}")
+            lines.append(f"# TYPE {h.name} histogram")
+        lines.extend(_line(h.name + suffix, labels, v) for suffix, labels, v in h.samples())
+    return "\n".join(lines) + "\n"
@@ -1,19 +1,30 @@
 import torch
 import torch.nn as nn
 
-# A simple vocabulary for demonstration purposes (e.g., HTTP requests)
-VOCAB = {
-    "<pad>": 0,
-    "GET": 1,
-    "POST": 2,
-    "/api/v1/profile": 3,
-    "/api/v1/data": 4,
-    "HTTP/1.1": 5,
-    "Host:": 6,
-    "example.com": 7,
-}
-VOCAB_SIZE = len(VOCAB)
-REV_VOCAB = {v: k for k, v in VOCAB.items()}
+from .fingerprint import fingerprint_module, state_version
+from .vocab import REV_VOCAB, VOCAB, VOCAB_SIZE
+
+
+class KVCache:
+    """Attention key/value state for the tokens of one streaming history.
+
+    The model has a single, non-causal encoder layer without positional
+    encodings, so each token's key/value projection depends only on that
+    token. Appending tokens therefore never invalidates cached entries.
+    """
+
+    def __init__(self):
+        self.tokens = []
+        self.keys = None  # (num_heads, n, head_dim)
+        self.values = None
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def reset(self):
+        self.tokens = []
+        self.keys = None
+        self.values = None
 
 
 class TinyLLM(nn.Module):
@@ -22,20 +33,34 @@ class TinyLLM(nn.Module):
     In a real implementation, this would be a pre-trained, fine-tuned model.
     """
 
-    def __init__(self, vocab_size=VOCAB_SIZE, embed_dim=32, num_heads=2, hidden_dim=64):
+    def __init__(
+        self, vocab_size=VOCAB_SIZE, embed_dim=32, num_heads=2, hidden_dim=64, device=None
+    ):
         super().__init__()
-        self.embedding = nn.Embedding(vocab_size, embed_dim)
+        if device == "meta":
+            # placeholders for loaded weights (src/weights.py); nn.Embedding's own
+            # init would import torch._dynamo on the meta device, costing seconds
+            weight = torch.empty((vocab_size, embed_dim), device=device)
+            self.embedding = nn.Embedding(vocab_size, embed_dim, _weight=weight)
+        else:
+            self.embedding = nn.Embedding(vocab_size, embed_dim, device=device)
         self.transformer_encoder_layer = nn.TransformerEncoderLayer(
-            d_model=embed_dim, nhead=num_heads, dim_feedforward=hidden_dim, batch_first=True
+            d_model=embed_dim,
+            nhead=num_heads,
+            dim_feedforward=hidden_dim,
+            batch_first=True,
+            device=device,
         )
         self.transformer_encoder = nn.TransformerEncoder(
             self.transformer_encoder_layer, num_layers=1
         )
-        self.output_layer = nn.Linear(embed_dim, vocab_size)
+        self.output_layer = nn.Linear(embed_dim, vocab_size, device=device)
+        self._fingerprint_cache = None
+        self._kv_table_cache = None
 
-    def forward(self, src):
+    def forward(self, src, src_key_padding_mask=None):
         embedded = self.embedding(src)
-        encoded = self.transformer_encoder(embedded)
+        encoded = self.transformer_encoder(embedded, src_key_padding_mask=src_key_padding_mask)
         # We only care about the prediction for the *next* token
         last_token_embedding = encoded[:, -1, :]
         logits = self.output_layer(last_token_embedding)
@@ -52,14 +77,144 @@ class TinyLLM(nn.Module):
             prediction = torch.argmax(logits, dim=-1)
         return prediction.item()
 
+    def predict_next_tokens(self, histories):
+        """Predicts the next token ID for each history in one forward pass.
+
+        Histories are left-padded with ``<pad>`` and the padding is masked out
+        of attention, so the last position of every row is its real last token
+        and each prediction matches ``predict_next_token`` on that history.
+        """
+        if any(len(h) == 0 for h in histories):
+            raise ValueError("Cannot predict from an empty history.")
+        width = max(len(h) for h in histories)
+        batch = torch.full((len(histories), width), VOCAB["<pad>"], dtype=torch.long)
+        mask = torch.ones((len(histories), width), dtype=torch.bool)
+        for row, history in enumerate(histories):
+            batch[row, width - len(history) :] = torch.as_tensor(history, dtype=torch.long)
+            mask[row, width - len(history) :] = False
+
+        if not mask.any():
+            mask = None  # equal lengths: skip the padded attention path
+
+        self.eval()
+        with torch.no_grad():
+            logits = self.forward(batch, src_key_padding_mask=mask)
+            predictions = torch.argmax(logits, dim=-1)
+        return predictions.tolist()
+
+    def new_kv_cache(self):
+        """Return an empty :class:`KVCache` for incremental prediction."""
+        return KVCache()
+
+    def _supports_kv_cache(self):
+        layers = self.transformer_encoder.layers
+        return (
+            len(layers) == 1 and self.transformer_encoder.norm is None and not layers[0].norm_first
+        )
+
+    def _kv_table(self):
+        """Key/value projections of every vocabulary token, ``(vocab, heads, head_dim)``.
+
+        Cache entries are copied out of this table rather than projected per
+        call, so an entry is bit-identical however the history was chunked
+        when it was appended. Peers that extend their caches in different
+        steps (deltas, coded frames) therefore compute identical logits.
+        """
+        attn = self.transformer_encoder.layers[0].self_attn
+        tensors = (self.embedding.weight, attn.in_proj_weight, attn.in_proj_bias)
+        version = tuple((t.data_ptr(), t._version) for t in tensors)
+        cached = self._kv_table_cache
+        if cached is None or cached[0] != version:
+            embed_dim = attn.embed_dim
+            x = self.embedding.weight
+            w_k, w_v = attn.in_proj_weight[embed_dim:].chunk(2)
+            b_k, b_v = attn.in_proj_bias[embed_dim:].chunk(2)
+            shape = (len(x), attn.num_heads, -1)
+            cached = (version, (x @ w_k.T + b_k).view(shape), (x @ w_v.T + b_v).view(shape))
+            self._kv_table_cache = cached
+        return cached[1], cached[2]
+
+    def _extend_kv_cache(self, cache, new_tokens):
+        keys, values = self._kv_table()
+        index = torch.as_tensor(new_tokens, dtype=torch.long)
+        # (n, heads, head_dim) -> (heads, n, head_dim)
+        k = keys[index].transpose(0, 1)
+        v = values[index].transpose(0, 1)
+        if cache.keys is None:
+            cache.keys, cache.values = k, v
+        else:
+            cache.keys = torch.cat([cache.keys, k], dim=1)
+            cache.values = torch.cat([cache.values, v], dim=1)
+        cache.tokens.extend(new_tokens)
+
+    def _cached_logits(self, cache):
+        """Run the encoder for the last cached token only, attending to the cache."""
+        layer = self.transformer_encoder.layers[0]
+        attn = layer.self_attn
+        embed_dim = attn.embed_dim
+        x = self.embedding.weight[cache.tokens[-1]]
+        q = x @ attn.in_proj_weight[:embed_dim].T + attn.in_proj_bias[:embed_dim]
+        q = q.view(attn.num_heads, 1, -1)
+        scores = (q @ cache.keys.transpose(1, 2)) / (q.shape[-1] ** 0.5)
+        context = (torch.softmax(scores, dim=-1) @ cache.values).reshape(embed_dim)
+        x = layer.norm1(x + attn.out_proj(context))
+        x = layer.norm2(x + layer.linear2(layer.activation(layer.linear1(x))))
+        return self.output_layer(x)
+
+    def next_token_logits_cached(self, history_tokens, cache):
+        """Next-token logits for ``history_tokens``, reusing ``cache``.
+
+        If ``cache`` already holds a prefix of ``history_tokens`` only the new
+        tokens are appended; otherwise the cache is rebuilt from scratch.
+        The logits match the full recompute and do not depend on how the
+        history was split across calls.
+        """
+        history_tokens = list(history_tokens)
+        if not history_tokens:
+            raise ValueError("Cannot predict from an empty history.")
+        if self.training:
+            # eval() walks every submodule; skip it on the per-token hot path
+            self.eval()
+        if not self._supports_kv_cache():
+            with torch.no_grad():
+                return self.forward(torch.tensor([history_tokens], dtype=torch.long))[0]
+        n = len(cache.tokens)
+        if n > len(history_tokens) or cache.tokens != history_tokens[:n]:
+            cache.reset()
+            n = 0
+
+        with torch.no_grad():
+            if n < len(history_tokens):
+                self._extend_kv_cache(cache, history_tokens[n:])
+            return self._cached_logits(cache)
+
+    def predict_next_token_cached(self, history_tokens, cache):
+        """Incremental variant of :meth:`predict_next_token`.
+
+        Built on :meth:`next_token_logits_cached`, so predictions are identical
+        to the full recompute.
+        """
+        return int(torch.argmax(self.next_token_logits_cached(history_tokens, cache)))
+
+    def get_model_fingerprint(self):
+        """Return the Merkle fingerprint of the parameters, cached until they change.
+
+        The cache key is each tensor's storage pointer and in-place version
+        counter, so optimizer steps, ``load_state_dict`` and ``.data`` swaps all
+        invalidate it while repeated handshakes reuse it.
+        """
+        version = state_version(self)
+        cached = self._fingerprint_cache
+        if cached is None or cached[0] != version:
+            cached = (version, fingerprint_module(self))
+            self._fingerprint_cache = cached
+        return cached[1]
+
     def get_model_diff_hash(self):
-        """Simulates creating a hash of model parameter differences for federated updates."""
+        """Return the model's Merkle root over raw parameter buffers."""
         # In a real scenario, this would involve complex diffing (e.g., LoRA).
-        # Here, we just hash the state dict for simplicity.
-        import hashlib
-
-        model_bytes = str(self.state_dict()).encode()
-        return hashlib.sha256(model_bytes).digest()
+        # Per-layer digests are available from get_model_fingerprint().leaves.
+        return self.get_model_fingerprint().root
 
 
 if __name__ == "__main__":
@@ -0,0 +1,248 @@
+"""Torch-free NumPy inference backend for :class:`~src.neural.TinyLLM`.
+
+The model has one non-causal encoder layer without positional encodings, so
+the output at the last position depends only on the last token and on how
+often each vocabulary token occurs in the history. Query/key/value
+projections are therefore precomputed per vocabulary token, a KV cache is
+just a token-count vector, and a prediction is a handful of small dense
+products regardless of history length.
+
+Weights come from :func:`export_weights` (needs torch once, at export time)
+or from an ``.npz`` file written by :func:`save_weights`; loading and
+inference only need NumPy.
+
+Logits agree with torch only up to float rounding, which can flip an argmax
+or a quantized coder table, so the backend advertises its own model ID: the
+float weights' fingerprint plus a ``__backend__`` leaf.
+"""
+import numpy as np
+
+from .fingerprint import ModelFingerprint, leaf_digest
+
+_LAYER = "transformer_encoder.layers.0."
+_LN_EPS = 1e-5
+_META = "__num_heads__"
+_BACKEND = "__backend__"
+
+
+def export_weights(model):
+    """Copy a torch ``TinyLLM``'s state dict into float32 NumPy arrays.
+
+    Raises:
+        ValueError: If the model is not the single-layer, post-norm, ReLU
+            encoder this backend implements.
+    """
+    layer = model.transformer_encoder.layers[0]
+    activation = getattr(layer.activation, "__name__", type(layer.activation).__name__)
+    if not model._supports_kv_cache() or activation.lower() != "relu":
+        raise ValueError("NumPy backend supports one post-norm ReLU encoder layer only")
+    weights = {k: v.detach().cpu().numpy().copy() for k, v in model.state_dict().items()}
+    weights[_META] = np.array(layer.self_attn.num_heads)
+    return weights
+
+
+def save_weights(model, path):
+    """Write a torch model's weights to an ``.npz`` file for torch-free loading."""
+    np.savez(path, **export_weights(model))
+
+
+def load_weights(path):
+    """Load arrays written by :func:`save_weights` (no torch needed)."""
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def backend_fingerprint(leaves):
+    """Fingerprint of the NumPy backend for float weights with these leaf digests."""
+    return ModelFingerprint(dict(leaves, **{_BACKEND: leaf_digest(_BACKEND, "numpy", (), b"")}))
+
+
+def quantize_int8(weight):
+    """Symmetric per-row int8 quantization; returns ``(int8 weights, float32 scales)``."""
+    scale = np.abs(weight).max(axis=1) / 127.0
+    scale[scale == 0] = 1.0
+    q = np.clip(np.rint(weight / scale[:, None]), -127, 127).astype(np.int8)
+    return q, scale.astype(np.float32)
+
+
+class _Linear:
+    """``x @ W.T + b`` with W kept in float32 or as per-row int8."""
+
+    def __init__(self, weight, bias, quantize):
+        self.bias = bias
+        if quantize:
+            self.qweight, self.scale = quantize_int8(weight)
+            self.weight = None
+        else:
+            self.weight = weight
+
+    def dense(self):
+        if self.weight is not None:
+            return self.weight
+        return self.qweight.astype(np.float32) * self.scale[:, None]
+
+    def __call__(self, x):
+        if self.weight is not None:
+            return x @ self.weight.T + self.bias
+        return (x @ self.qweight.T.astype(np.float32)) * self.scale + self.bias
+
+
+def _layer_norm(x, weight, bias):
+    # plain sums: ndarray.mean/var dispatch overhead dominates at this width
+    inv = 1.0 / x.shape[-1]
+    d = x - x.sum(axis=-1, keepdims=True) * inv
+    var = (d * d).sum(axis=-1, keepdims=True) * inv
+    return d / np.sqrt(var + _LN_EPS) * weight + bias
+
+
+class NumpyKVCache:
+    """Token counts of a streaming history (the whole attention state)."""
+
+    def __init__(self, vocab_size):
+        self.tokens = []
+        self.counts = np.zeros(vocab_size, dtype=np.float64)
+
+    def __len__(self):
+        return len(self.tokens)
+
+    def reset(self):
+        self.tokens = []
+        self.counts[:] = 0
+
+
+class NumpyTinyLLM:
+    """Drop-in replacement for ``TinyLLM`` inference built on NumPy.
+
+    Args:
+        weights (dict): State-dict arrays from :func:`export_weights` or
+            :func:`load_weights`.
+        quantize (bool): Store projection weights as per-row int8.
+    """
+
+    def __init__(self, weights, quantize=False):
+        weights = dict(weights)
+        self.num_heads = int(weights.pop(_META))
+        self.quantized = quantize
+        self._fingerprint = backend_fingerprint(
+            {
+                name: leaf_digest(name, str(w.dtype), w.shape, np.ascontiguousarray(w))
+                for name, w in weights.items()
+            }
+        )
+        if quantize:
+            # predictions may drift from the float model, so it is a different model
+            self._fingerprint = ModelFingerprint(
+                {"int8": leaf_digest("int8", "root", (), self._fingerprint.root)}
+            )
+
+        def w(name):
+            return np.asarray(weights[name], dtype=np.float32)
+
+        embedding = _Linear(w("embedding.weight"), 0.0, quantize).dense()
+        self.vocab_size, dim = embedding.shape
+        in_proj = _Linear(w(_LAYER + "self_attn.in_proj_weight"), 0.0, quantize).dense()
+        in_bias = w(_LAYER + "self_attn.in_proj_bias")
+        heads, head_dim = self.num_heads, dim // self.num_heads
+        q, k, v = (
+            embedding @ in_proj[i * dim : (i + 1) * dim].T + in_bias[i * dim : (i + 1) * dim]
+            for i in range(3)
+        )
+
+        def split(t):
+            return t.reshape(self.vocab_size, heads, head_dim).transpose(1, 0, 2)
+
+        # scores[h, query_token, key_token] and values[h, token, :]
+        self._scores = (split(q) @ split(k).transpose(0, 2, 1)).astype(np.float64) / np.sqrt(
+            head_dim
+        )
+        self._values = split(v).astype(np.float64)
+        self._embedding = embedding
+        self.out_proj = _Linear(
+            w(_LAYER + "self_attn.out_proj.weight"), w(_LAYER + "self_attn.out_proj.bias"), quantize
+        )
+        self.linear1 = _Linear(w(_LAYER + "linear1.weight"), w(_LAYER + "linear1.bias"), quantize)
+        self.linear2 = _Linear(w(_LAYER + "linear2.weight"), w(_LAYER + "linear2.bias"), quantize)
+        self.norm1 = (w(_LAYER + "norm1.weight"), w(_LAYER + "norm1.bias"))
+        self.norm2 = (w(_LAYER + "norm2.weight"), w(_LAYER + "norm2.bias"))
+        self.output_layer = _Linear(w("output_layer.weight"), w("output_layer.bias"), quantize)
+
+    @classmethod
+    def from_torch(cls, model, quantize=False):
+        return cls(export_weights(model), quantize)
+
+    @classmethod
+    def load(cls, path, quantize=False):
+        return cls(load_weights(path), quantize)
+
+    def _logits(self, last, counts):
+        """Logits for rows with last token ``last`` (B,) and token ``counts`` (B, V)."""
+        scores = self._scores[:, last, :]  # (H, B, V)
+        present = counts > 0
+        scores = np.where(present, scores, -np.inf)
+        weights = np.exp(scores - scores.max(axis=-1, keepdims=True)) * counts
+        context = (weights @ self._values) / weights.sum(axis=-1, keepdims=True)  # (H, B, hd)
+        context = context.transpose(1, 0, 2).reshape(len(last), -1).astype(np.float32)
+        x = self._embedding[last]
+        x = _layer_norm(x + self.out_proj(context), *self.norm1)
+        x = _layer_norm(x + self.linear2(np.maximum(self.linear1(x), 0.0)), *self.norm2)
+        return self.output_layer(x)
+
+    def forward(self, src, src_key_padding_mask=None):
+        """Batch forward matching ``TinyLLM.forward`` (last-position logits)."""
+        src = np.asarray(src, dtype=np.int64)
+        keep = np.ones(src.shape, dtype=bool)
+        if src_key_padding_mask is not None:
+            keep = ~np.asarray(src_key_padding_mask, dtype=bool)
+        counts = np.zeros((len(src), self.vocab_size), dtype=np.float64)
+        rows = np.broadcast_to(np.arange(len(src))[:, None], src.shape)
+        np.add.at(counts, (rows[keep], src[keep]), 1.0)
+        return self._logits(src[:, -1], counts)
+
+    def predict_next_token(self, history_tokens):
+        return self.predict_next_tokens([list(history_tokens)])[0]
+
+    def predict_next_tokens(self, histories):
+        """Next-token argmax for each history (any lengths, no padding needed)."""
+        if any(len(h) == 0 for h in histories):
+            raise ValueError("Cannot predict from an empty history.")
+        counts = np.zeros((len(histories), self.vocab_size), dtype=np.float64)
+        for row, history in enumerate(histories):
+            counts[row] = np.bincount(history, minlength=self.vocab_size)
+        last = np.array([h[-1] for h in histories], dtype=np.int64)
+        return self._logits(last, counts).argmax(axis=-1).tolist()
+
+    def new_kv_cache(self):
+        return NumpyKVCache(self.vocab_size)
+
+    def next_token_logits_cached(self, history_tokens, cache):
+        """Next-token logits; ``cache`` counts tokens of a history prefix."""
+        history_tokens = list(history_tokens)
+        if not history_tokens:
+            raise ValueError("Cannot predict from an empty history.")
+        n = len(cache.tokens)
+        if n > len(history_tokens) or cache.tokens != history_tokens[:n]:
+            cache.reset()
+            n = 0
+        if n < len(history_tokens):
+            new = history_tokens[n:]
+            cache.counts += np.bincount(new, minlength=self.vocab_size)
+            cache.tokens.extend(new)
+        last = np.array([history_tokens[-1]], dtype=np.int64)
+        return self._logits(last, cache.counts[None, :])[0]
+
+    def predict_next_token_cached(self, history_tokens, cache):
+        return int(self.next_token_logits_cached(history_tokens, cache).argmax())
+
+    def get_model_fingerprint(self):
+        """Merkle fingerprint; differs from the torch model's only in ``__backend__``."""
+        return self._fingerprint
+
+    def get_model_diff_hash(self):
+        return self._fingerprint.root
+
+    # registry.freeze_model() compatibility: inference-only already
+    def eval(self):
+        return self
+
+    def requires_grad_(self, requires_grad=True):
+        return self
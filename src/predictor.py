@@ -0,0 +1,152 @@
+"""Pluggable next-token predictor chain with a cheap n-gram tier.
+
+Templated traffic is dominated by exact repeats, so a hashed n-gram table
+in front of the transformer answers most lookups in O(1). Tables are
+updated only from tokens that both peers see, in the same order, and
+lookups never change table state, so sender and receiver tables stay
+identical and their predictions agree.
+"""
+from collections import OrderedDict
+
+
+class NGramPredictor:
+    """Next-token table keyed on the last ``order`` tokens, with LRU eviction.
+
+    Each entry keeps per-token counts plus the current best token, so a
+    lookup is one dict access. Counts are halved once an entry's total
+    reaches ``max_count`` so the table tracks drifting traffic.
+
+    Args:
+        order (int): Context length in tokens.
+        capacity (int): Most contexts kept; the least recently updated
+            context is evicted first.
+        min_count (int): Observations needed before the entry may answer.
+        min_confidence (float): Share of observations the best token needs.
+        max_count (int): Total at which an entry's counts are halved.
+    """
+
+    def __init__(self, order=3, capacity=1 << 16, min_count=2, min_confidence=0.9, max_count=1024):
+        if order < 1 or capacity < 1:
+            raise ValueError("order and capacity must be positive")
+        self.order = order
+        self.capacity = capacity
+        self.min_count = min_count
+        self.min_confidence = min_confidence
+        self.max_count = max_count
+        self._table = OrderedDict()
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._table)
+
+    def _key(self, history):
+        return tuple(history[-self.order :])
+
+    def predict(self, history):
+        """Return the confident next token for ``history``, or None. Read-only."""
+        entry = self._table.get(self._key(history))
+        if entry is None:
+            return None
+        best, best_count, total, _ = entry
+        if total < self.min_count or best_count < self.min_confidence * total:
+            return None
+        return best
+
+    def update(self, history, token):
+        """Record that ``token`` followed ``history``."""
+        table = self._table
+        key = self._key(history)
+        entry = table.get(key)
+        if entry is None:
+            if len(table) >= self.capacity:
+                table.popitem(last=False)
+                self.evictions += 1
+            entry = table[key] = [token, 0, 0, {}]
+        else:
+            table.move_to_end(key)
+        counts = entry[3]
+        count = counts[token] = counts.get(token, 0) + 1
+        entry[2] += 1
+        if token == entry[0]:
+            entry[1] = count
+        elif count > entry[1]:
+            entry[0], entry[1] = token, count
+        if entry[2] >= self.max_count:
+            for t in counts:
+                counts[t] >>= 1
+            entry[3] = counts = {t: c for t, c in counts.items() if c}
+            entry[2] = sum(counts.values())
+            # ties resolve to the smallest token so both peers pick the same best
+            entry[0], entry[1] = min(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+
+
+class PredictorChain:
+    """Ask each tier in turn; fall back to the model only when all abstain.
+
+    Counters: ``lookups``, ``hits`` (answered by a tier, per tier in
+    ``tier_hits``) and ``fallbacks`` (model forward passes).
+    """
+
+    def __init__(self, model, tiers=()):
+        self.model = model
+        self.tiers = list(tiers)
+        self.lookups = 0
+        self.hits = 0
+        self.fallbacks = 0
+        self.tier_hits = [0] * len(self.tiers)
+
+    def _from_tiers(self, history):
+        for i, tier in enumerate(self.tiers):
+            token = tier.predict(history)
+            if token is not None:
+                self.tier_hits[i] += 1
+                return token
+        return None
+
+    def predict(self, history, kv_cache):
+        """Predict the next token for ``history``; ``kv_cache`` serves the model."""
+        self.lookups += 1
+        token = self._from_tiers(history)
+        if token is not None:
+            self.hits += 1
+            return token
+        self.fallbacks += 1
+        return self.model.predict_next_token_cached(history, kv_cache)
+
+    def predict_many(self, histories, observed=None):
+        """Batched :meth:`predict`: one model forward pass for all tier misses.
+
+        If ``observed`` is given, ``observed[i]`` is fed to :meth:`update`
+        right after lookup ``i``, so the results match alternating
+        ``predict``/``update`` calls.
+        """
+        self.lookups += len(histories)
+        if observed is None:
+            out = [self._from_tiers(h) for h in histories]
+        else:
+            out = []
+            for history, token in zip(histories, observed, strict=True):
+                out.append(self._from_tiers(history))
+                self.update(history, token)
+        misses = [i for i, token in enumerate(out) if token is None]
+        self.hits += len(out) - len(misses)
+        self.fallbacks += len(misses)
+        if misses:
+            predicted = self.model.predict_next_tokens([histories[i] for i in misses])
+            for i, token in zip(misses, predicted, strict=True):
+                out[i] = token
+        return out
+
+    def update(self, history, token):
+        """Feed an observed ``(history, token)`` pair to every tier."""
+        for tier in self.tiers:
+            tier.update(history, token)
+
+    def stats(self):
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "fallbacks": self.fallbacks,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "tier_hits": list(self.tier_hits),
+        }
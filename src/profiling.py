@@ -0,0 +1,285 @@
+"""Sampled per-stage profiling of the session hot paths.
+
+Off unless ``QASWP_PROFILE`` is set (see :func:`src.config.profile_every`)
+or :func:`enable` is called. Methods marked with :func:`traced` on an
+:func:`instrumented` class are only wrapped while profiling is on, so the
+disabled mode runs the original functions with no added call.
+
+While on, every call of a traced method is counted and timed, and one call
+in ``every`` runs under ``sys.setprofile``. Each Python and C call made
+during a sampled call is timed and its self time is charged to a stage
+(tensor construction, model, encode/decode, AEAD, ...) and to its call
+stack. :func:`table` prints the per-stage breakdown and :func:`collapsed`
+the stacks in the folded format read by ``flamegraph.pl`` and speedscope.
+
+Sampled calls run several times slower under the tracer, so stage times
+are only meaningful as shares of the traced time; plain latency comes from
+the untraced calls. Only the calling thread is traced.
+"""
+import atexit
+import functools
+import os
+import sys
+import threading
+import time
+
+from .config import profile_every
+
+_clock = time.perf_counter
+_every = profile_every()
+_classes = []
+_stats = {}
+_stacks = {}
+_lock = threading.Lock()
+_local = threading.local()
+
+# Self time of frames matching none of these belongs to the enclosing stage;
+# a traced method's own code is "protocol".
+_EXACT = {
+    "torch.tensor": "tensor",
+    "torch.as_tensor": "tensor",
+    "torch.full": "tensor",
+    "torch.ones": "tensor",
+    "torch.zeros": "tensor",
+    "torch.empty": "tensor",
+    "torch.stack": "tensor",
+    "torch.cat": "tensor",
+    "src.wire.encode_body": "encode",
+    "src.wire.pack_header": "encode",
+    "json.dumps": "encode",
+    "src.wire.decode_body": "decode",
+    "src.wire.unpack_header": "decode",
+    "json.loads": "decode",
+    "src.qaswp.QASWPSession._derive_session_key": "kdf",
+}
+_PREFIXES = (
+    ("cryptography.hazmat.primitives.kdf", "kdf"),
+    ("cryptography.", "aead"),
+    ("src.aead.", "aead"),
+    ("src.qkd.", "qkd"),
+    ("src.zk_sim.", "zk"),
+    ("src.neural", "model"),
+    ("src.predictor.", "model"),
+    ("src.entropy.", "model"),
+    ("torch.", "model"),
+)
+_stage_cache = {}
+
+
+def _classify(name):
+    stage = _stage_cache.get(name, False)
+    if stage is False:
+        stage = _EXACT.get(name)
+        if stage is None:
+            stage = next((s for p, s in _PREFIXES if name.startswith(p)), None)
+        _stage_cache[name] = stage
+    return stage
+
+
+def _py_name(frame):
+    code = frame.f_code
+    qualname = getattr(code, "co_qualname", code.co_name)
+    return f"{frame.f_globals.get('__name__', '?')}.{qualname}"
+
+
+def _c_name(fn):
+    # torch functions report their C container class as part of the qualname
+    qualname = getattr(fn, "__qualname__", "?").replace("_VariableFunctionsClass.", "")
+    module = getattr(fn, "__module__", None)
+    # methods of C types have no module but a qualified name (``dict.get``)
+    return qualname if module is None else f"{module}.{qualname}"
+
+
+class _Tracer:
+    """``sys.setprofile`` hook charging self time to stages and stacks."""
+
+    def __init__(self, label):
+        # entries: [path, stage, start, time spent in children]
+        self.stack = [[label, "protocol", 0.0, 0.0]]
+        self.stages = {}
+        self.stacks = {}
+
+    def __call__(self, frame, event, arg):
+        now = _clock()
+        if event == "call" or event == "c_call":
+            name = _py_name(frame) if event == "call" else _c_name(arg)
+            parent = self.stack[-1]
+            self.stack.append([parent[0] + ";" + name, _classify(name) or parent[1], now, 0.0])
+        elif len(self.stack) > 1:
+            path, stage, start, children = self.stack.pop()
+            elapsed = now - start
+            self.stack[-1][3] += elapsed
+            self._charge(path, stage, elapsed - children)
+
+    def _charge(self, path, stage, seconds):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+        self.stacks[path] = self.stacks.get(path, 0.0) + seconds
+
+    def finish(self, elapsed):
+        root = self.stack[0]
+        self._charge(root[0], root[1], elapsed - root[3])
+
+
+class _Stat:
+    __slots__ = ("calls", "seconds", "sampled", "traced", "stages")
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0  # untraced calls only
+        self.sampled = 0
+        self.traced = 0.0
+        self.stages = {}
+
+
+def _sampled(label, stat, fn, args, kwargs):
+    tracer = _Tracer(label)
+    previous = sys.getprofile()
+    _local.busy = True
+    start = _clock()
+    sys.setprofile(tracer)
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        sys.setprofile(previous)
+        elapsed = _clock() - start
+        _local.busy = False
+        tracer.finish(elapsed)
+        with _lock:
+            stat.sampled += 1
+            stat.traced += elapsed
+            for stage, seconds in tracer.stages.items():
+                stat.stages[stage] = stat.stages.get(stage, 0.0) + seconds
+            for path, seconds in tracer.stacks.items():
+                _stacks[path] = _stacks.get(path, 0.0) + seconds
+
+
+def _wrap(label, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        stat = _stats.get(label)
+        if stat is None:
+            stat = _stats.setdefault(label, _Stat())
+        stat.calls += 1
+        every = _every  # disable() may zero it from another thread
+        if every and (stat.calls - 1) % every == 0 and not getattr(_local, "busy", False):
+            return _sampled(label, stat, fn, args, kwargs)
+        start = _clock()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            stat.seconds += _clock() - start
+
+    wrapper.__qaswp_original__ = fn
+    return wrapper
+
+
+def traced(fn):
+    """Mark a method of an :func:`instrumented` class for profiling."""
+    fn.__qaswp_traced__ = True
+    return fn
+
+
+def instrumented(cls):
+    """Class decorator: profile its :func:`traced` methods whenever profiling is on."""
+    _classes.append(cls)
+    if _every:
+        _patch(cls)
+    return cls
+
+
+def _patch(cls):
+    for name, attr in list(vars(cls).items()):
+        if getattr(attr, "__qaswp_traced__", False) and not hasattr(attr, "__qaswp_original__"):
+            setattr(cls, name, _wrap(name, attr))
+
+
+def _unpatch(cls):
+    for name, attr in list(vars(cls).items()):
+        original = getattr(attr, "__qaswp_original__", None)
+        if original is not None:
+            setattr(cls, name, original)
+
+
+def enabled():
+    return bool(_every)
+
+
+def enable(every=1):
+    """Profile traced methods, tracing one call in ``every``."""
+    global _every
+    _every = max(1, int(every))
+    for cls in _classes:
+        _patch(cls)
+
+
+def disable():
+    """Restore the original methods; collected results are kept."""
+    global _every
+    _every = 0
+    for cls in _classes:
+        _unpatch(cls)
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _stacks.clear()
+
+
+def report():
+    """Per-method results.
+
+    Returns:
+        dict: ``{method: {"calls", "mean_seconds", "sampled", "traced_seconds",
+        "stages": {stage: seconds}}}``; ``mean_seconds`` covers untraced calls
+        and is ``None`` when every call was traced.
+    """
+    out = {}
+    with _lock:
+        for label, stat in _stats.items():
+            untraced = stat.calls - stat.sampled
+            out[label] = {
+                "calls": stat.calls,
+                "mean_seconds": stat.seconds / untraced if untraced > 0 else None,
+                "sampled": stat.sampled,
+                "traced_seconds": stat.traced,
+                "stages": dict(stat.stages),
+            }
+    return out
+
+
+def table():
+    """Render :func:`report` as a per-method, per-stage text table."""
+    lines = [f"{'method / stage':<26} {'calls':>8} {'us/call':>10} {'share':>7}"]
+    for label, r in sorted(report().items()):
+        mean = r["mean_seconds"]
+        mean = "-" if mean is None else f"{mean * 1e6:.1f}"
+        lines.append(f"{label:<26} {r['calls']:>8} {mean:>10} {'':>7}")
+        traced = r["traced_seconds"] or 1.0
+        for stage, seconds in sorted(r["stages"].items(), key=lambda s: -s[1]):
+            per_call = seconds / r["sampled"] * 1e6
+            lines.append(
+                f"  {stage:<24} {r['sampled']:>8} {per_call:>10.1f} {seconds / traced:>7.1%}"
+            )
+    return "\n".join(lines) + "\n"
+
+
+def collapsed():
+    """Folded stacks (``frame;frame;... microseconds`` per line) of the traced calls."""
+    with _lock:
+        items = sorted(_stacks.items())
+    return "".join(f"{path} {round(s * 1e6)}\n" for path, s in items if round(s * 1e6) > 0)
+
+
+def _dump_at_exit():
+    if not _stats:
+        return
+    sys.stderr.write(table())
+    path = os.getenv("QASWP_PROFILE_OUT")
+    if path:
+        with open(path, "w") as fh:
+            fh.write(collapsed())
+
+
+if _every:
+    atexit.register(_dump_at_exit)
@@ -1,87 +1,265 @@
 import hashlib
 import hmac
 import json
+import os
 import secrets
-
-from cryptography.exceptions import InvalidTag
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.ciphers.aead import AESGCM
-from cryptography.hazmat.primitives.kdf.hkdf import HKDF
-
-from .config import is_qiskit_enabled
-from .neural import VOCAB, TinyLLM
-from .qkd import bb84_keygen
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from . import metrics, profiling, resumption, wire
+from .aead import KeyUpdatePolicy, SessionCipher, nonce_counter
+from .batching import BatchPolicy
+from .config import is_demo_mode, is_qiskit_enabled
+from .context import StreamContext, check_context_id
+from .entropy import TokenCoder
+from .predictor import PredictorChain
 from .qaswp_qiskit import perform_qkd_session
+from .qkd import master_key
+from .reconstruct import StreamDecoder
+from .registry import shared_model
+from .vocab import VOCAB
 from .zk_sim import generate_zk_proof
 
 __all__ = ["QASWPSession", "VOCAB"]
 
+# receive_many() only hands decryption to threads for backlogs this large;
+# below it the hand-off costs more than it saves
+PARALLEL_RECEIVE_MIN = 256
+
+_BYTES_LIKE = (bytes, bytearray, memoryview)
+_rx_pool = None
+_rx_pool_lock = threading.Lock()
+
+
+def _receive_pool():
+    global _rx_pool
+    with _rx_pool_lock:
+        if _rx_pool is None:
+            _rx_pool = ThreadPoolExecutor(os.cpu_count(), thread_name_prefix="qaswp-rx")
+        return _rx_pool
+
 
+def _map_chunked(fn, items, executor=None):
+    """``[fn(i) for i in items]``, split into one chunk per CPU on a thread pool."""
+    if not items:
+        return []
+    workers = os.cpu_count() or 1
+    if executor is None:
+        if workers < 2 or len(items) < PARALLEL_RECEIVE_MIN:
+            return [fn(i) for i in items]
+        executor = _receive_pool()
+    size = -(-len(items) // max(workers, 2))
+    chunks = [items[i : i + size] for i in range(0, len(items), size)]
+    futures = [executor.submit(lambda chunk: [fn(i) for i in chunk], c) for c in chunks]
+    return [r for f in futures for r in f.result()]
+
+
+@profiling.instrumented
 class QASWPSession:
     """Core QASWP protocol logic simulation."""
 
-    def __init__(self, is_client=False):
+    def __init__(
+        self,
+        is_client=False,
+        schema_version=wire.SCHEMA_BINARY,
+        model=None,
+        key_pool=None,
+        batch_policy=None,
+        reconstruct=False,
+        predictor_tiers=None,
+        ticket_issuer=None,
+        key_update=None,
+    ):
         self.is_client = is_client
-        self.model = TinyLLM()
+        # feed every received frame to its context's StreamDecoder
+        self.reconstruct = reconstruct
+        # optional QKDKeyPool so server_pass_2 skips the BB84 run
+        self.key_pool = key_pool
+        # optional resumption.TicketIssuer; servers with one hand out tickets
+        self.ticket_issuer = ticket_issuer
+        # client side: the latest resumption ticket received (see resume_pass_1)
+        self.ticket = None
+        # Weights are shared and read-only (``model`` may be an instance or a
+        # registry ID/alias); all per-session state lives below. Registry
+        # lookups happen on first use so parsing-only callers never load torch.
+        self._model = model
         self.session_key = None
         self.transcript = b""
-        # demo-mode semantic confirmation batching
-        self._confirm_bits = 0
-        self._confirm_count = 0
-        self._batch_size = 64
-        self._seq = 0
+        # wire schema: highest version we offer; replaced by the negotiated one
+        self._supported_schemas = tuple(v for v in wire.SUPPORTED_SCHEMAS if v <= schema_version)
+        self._schema_version = wire.SCHEMA_JSON
+        # demo-mode semantic confirmation batching, per multiplexed context;
+        # the default policy is a fixed 64-confirmation batch with no deadline
+        self.batch_policy = batch_policy or BatchPolicy()
+        # callable returning fresh predictor tiers (e.g. [NGramPredictor()]) for
+        # each stream; peers must use the same tiers to predict alike
+        self.predictor_tiers = predictor_tiers
+        self._contexts = {}
+        # sending and receiving threads (src/threadsafe.py) may both open a context
+        self._contexts_lock = threading.Lock()
         # entanglement-ish deterministic seed derived after handshake
         self._entangle_id = None
+        # one AEAD object per session key; counter nonces + replay window
+        self._cipher = None
+        # when to ratchet the sending key; used once both peers support it
+        self.key_update = key_update or KeyUpdatePolicy()
+        self._key_updates = False
+        # SessionMetrics counters, or None when metrics are off (src/metrics.py)
+        self.metrics = metrics.session_metrics(self)
+        self._handshake_started = None
 
     def _empty_packet(self):
         return {
             "nonce": b"",
+            "header": b"",
             "encrypted_payload": b"",
             "wire_len": 0,
             "flushed": False,
         }
 
-    def _emit_pending_batch_if_any(self, nonce=None):
+    @property
+    def model(self):
+        model = self._model
+        if model is None or isinstance(model, str):
+            model = self._model = shared_model(model)
+        return model
+
+    @model.setter
+    def model(self, model):
+        self._model = model
+
+    def _new_kv_cache(self):
+        return self.model.new_kv_cache()
+
+    def context(self, context_id=0):
+        """Return the :class:`StreamContext` for ``context_id``, creating it on first use."""
+        ctx = self._contexts.get(context_id)
+        if ctx is None:
+            with self._contexts_lock:
+                ctx = self._contexts.get(check_context_id(context_id))
+                if ctx is None:
+                    ctx = StreamContext(
+                        context_id, self._new_kv_cache, self.batch_policy.initial_limit()
+                    )
+                    self._contexts[context_id] = ctx
+        return ctx
+
+    def _weave_predictor(self, ctx):
+        if ctx.predictor is None and self.predictor_tiers is not None:
+            ctx.predictor = self._new_predictor()
+        return ctx.predictor
+
+    def _new_predictor(self):
+        if self.predictor_tiers is None:
+            return None
+        return PredictorChain(self.model, self.predictor_tiers())
+
+    def predictor_stats(self, context_id=0):
+        """Hit/fallback counters of a context's predictor chains (None if unused).
+
+        ``weave`` covers :meth:`weave_packet`/:meth:`weave_many`; ``stream``
+        and ``rx_stream`` cover the reconstructable stream in each direction.
+        """
+        if self.predictor_tiers is None:
+            return None
+        ctx = self.context(context_id)
+        stats = {}
+        if ctx.predictor is not None:
+            stats["weave"] = ctx.predictor.stats()
+        if ctx.tx_coder is not None:
+            stats["stream"] = ctx.tx_coder.predictor.stats()
+        if ctx.decoder is not None:
+            stats["rx_stream"] = ctx.decoder.coder.predictor.stats()
+        return stats
+
+    def _crypto(self):
+        """Return the session cipher, rebuilding it if the key was replaced."""
+        cipher = self._cipher
+        if cipher is None or cipher.key is not self.session_key:
+            cipher = self._cipher = SessionCipher(self.session_key, self.is_client)
+        return cipher
+
+    def _install_session_key(self, session_key):
+        self.session_key = session_key
+        self._cipher = SessionCipher(session_key, self.is_client)
+        # derive a deterministic "entangle id" from the session key (stub)
+        self._entangle_id = hashlib.sha256(b"entangle|" + session_key).hexdigest()[:16]
+
+    def _seal(self, cipher, nonce, payload, flags=0):
+        """Encrypt a batch/delta payload using the negotiated wire schema.
+
+        Returns ``(header, ciphertext)``; ``header`` is empty for JSON peers.
+        """
+        ctx = payload.get("ctx", 0)
+        in_stream = self._contexts[ctx].tx_coder is not None
+        if self._schema_version >= wire.SCHEMA_BINARY:
+            body = wire.encode_body(payload)
+            if in_stream:
+                flags |= wire.FLAG_STREAM
+            if self._key_updates:
+                flags |= self._tx_key_phase(cipher, self._contexts[ctx], payload["seq"])
+            header = wire.pack_header(payload["seq"], flags, ctx, len(body) + wire.TAG_LEN)
+            return header, cipher.encrypt(nonce, body, header)
+        if not ctx:
+            # legacy JSON peers only know the implicit context 0
+            payload = {k: v for k, v in payload.items() if k != "ctx"}
+        if in_stream:
+            payload = dict(payload, stream=True)
+        pt = json.dumps(payload, separators=(",", ":")).encode()
+        return b"", cipher.encrypt(nonce, pt, None)
+
+    def _tx_key_phase(self, cipher, ctx, seq):
+        """Ratchet the sending key when due; returns the frame's key-phase flag."""
+        # a 32-bit header seq wrapping on any stream also starts a new epoch
+        wraps = seq >> 32
+        if wraps != ctx.seq_wraps or self.key_update.due(cipher):
+            ctx.seq_wraps = wraps
+            cipher.update_tx()
+        return wire.FLAG_KEY_PHASE if cipher.tx_epoch & 1 else 0
+
+    def _emit_pending_batch_if_any(self, nonce=None, context_id=0):
         if not self.session_key:
             raise ConnectionError("Session not established.")
-        if self._confirm_count == 0:
+        ctx = self.context(context_id)
+        if ctx.confirm_count == 0:
             return None
 
-        seq = self._seq
-        count = self._confirm_count
-        bits = self._confirm_bits
-        payload = {"t": "batch", "seq": seq, "count": count, "bits": bits}
-        pt = json.dumps(payload, separators=(",", ":")).encode()
+        seq, count, bits = ctx.take_batch()
+        ctx.batch_limit = self.batch_policy.next_limit(ctx)
+        payload = {"t": "batch", "seq": seq, "count": count, "bits": bits, "ctx": context_id}
 
+        cipher = self._crypto()
         if nonce is None:
-            nonce = secrets.token_bytes(12)
-        aesgcm = AESGCM(self.session_key)
-        encrypted_payload = aesgcm.encrypt(nonce, pt, None)
+            nonce = cipher.next_nonce()
+        header, encrypted_payload = self._seal(cipher, nonce, payload)
         # Demo-mode accounting: measure the effective confirmation bits only.
         # Each confirmation accounts for a single bit on the wire when sent in
         # aggregated batches, so we round up to the nearest byte. This keeps the
         # demo compression math aligned with the public claims (≥99%).
         wire_len = max(1, (count + 7) // 8)
-
-        self._seq += count
-        self._confirm_bits = 0
-        self._confirm_count = 0
+        m = self.metrics
+        if m is not None:
+            m.batches += 1
+            m.sent(len(header) + len(nonce) + len(encrypted_payload), count)
+            metrics.BATCH_CONFIRMATIONS.observe(count)
 
         return {
             "nonce": nonce,
+            "header": header,
             "encrypted_payload": encrypted_payload,
             "wire_len": wire_len,
             "flushed": True,
         }
 
-    def flush_confirmations(self):
+    def flush_confirmations(self, context_id=0):
         """Flush any buffered confirmation bits as an encrypted batch."""
-        packet = self.flush()
+        packet = self.flush(context_id)
         if packet is None:
             return self._empty_packet()
         return packet
 
-    def flush(self):
+    def flush(self, context_id=0):
         """
         Emit any buffered confirmation batch as an encrypted woven packet.
 
@@ -89,12 +267,42 @@ class QASWPSession:
         emitted. When there is nothing pending, returns ``None``.
         """
 
-        packet = self._emit_pending_batch_if_any()
+        packet = self._emit_pending_batch_if_any(context_id=context_id)
         return packet
 
+    def flush_all(self):
+        """Flush every context with pending confirmations; returns the packets."""
+        packets = (self.flush(cid) for cid in sorted(self._contexts))
+        return [p for p in packets if p is not None]
+
+    def poll(self, now=None):
+        """Flush every context whose oldest confirmation passed the policy deadline.
+
+        Call this periodically (the asyncio client does) so a quiet stream
+        does not hold confirmations past ``batch_policy.max_delay``.
+
+        Returns:
+            list: The flushed packets, possibly empty.
+        """
+        policy = self.batch_policy
+        if policy.max_delay is None:
+            return []
+        if now is None:
+            now = policy.clock()
+        due = [cid for cid, ctx in sorted(self._contexts.items()) if policy.deadline_due(ctx, now)]
+        return [p for p in (self.flush(cid) for cid in due) if p is not None]
+
+    def _derive_session_key(self, qkd_master_key):
+        from cryptography.hazmat.primitives import hashes
+        from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+        kdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=self.transcript)
+        return kdf.derive(qkd_master_key)
+
     def _update_transcript(self, data):
         self.transcript += data
 
+    @profiling.traced
     def client_pass_1(self):
         """Client initiates the handshake."""
         # In a real PQC implementation, we'd use Kyber.
@@ -103,20 +311,32 @@ class QASWPSession:
         qrng_nonce = secrets.token_bytes(32)
         model_hash = self.model.get_model_diff_hash()
 
+        if self.metrics is not None:
+            self._handshake_started = time.perf_counter()
         hello_packet = ephemeral_pub_key + qrng_nonce + model_hash
         self._update_transcript(hello_packet)
         return {
             "ephemeral_pub_key": ephemeral_pub_key,
             "nonce": qrng_nonce,
             "model_hash": model_hash,
+            "schema_versions": list(self._supported_schemas),
+            "key_update": True,
         }
 
+    @profiling.traced
     def server_pass_2(self, client_hello):
         """Server responds with QKD-based authentication."""
+        started = time.perf_counter() if self.metrics is not None else None
         transcript_piece = (
             client_hello["ephemeral_pub_key"] + client_hello["nonce"] + client_hello["model_hash"]
         )
         self._update_transcript(transcript_piece)
+        # Legacy peers do not advertise schemas and only understand JSON bodies.
+        self._schema_version = wire.negotiate_schema(
+            client_hello.get("schema_versions", (wire.SCHEMA_JSON,)), self._supported_schemas
+        )
+        # older peers would drop frames under a key they cannot derive
+        self._key_updates = bool(client_hello.get("key_update"))
 
         try:
             qkd_master_key = None
@@ -133,7 +353,10 @@ class QASWPSession:
 
             # Fallback to BB84 if Qiskit is not enabled or failed
             if qkd_master_key is None:
-                qkd_master_key = bb84_keygen()
+                if self.key_pool is not None:
+                    qkd_master_key = self.key_pool.get_key()
+                else:
+                    qkd_master_key = master_key()
                 qiskit_info = qiskit_info or {
                     "qiskit_skipped": True,
                     "reason": "flag disabled or unavailable",
@@ -141,30 +364,34 @@ class QASWPSession:
 
             # The session key is derived from both QKD and ephemeral keys (hybrid model)
             # This is a simplified KDF step.
-            kdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=self.transcript)
-            self.session_key = kdf.derive(qkd_master_key)
+            self._install_session_key(self._derive_session_key(qkd_master_key))
 
             zk_proof = generate_zk_proof("server_private_state", self.transcript)
             # DEMO: share qkd_master_key so client derives the same session key (for testability)
             # In real QKD, both sides would obtain the same K_q from a single session.
-            # Also derive a deterministic "entangle id" from the session key (stub).
-            self._entangle_id = hashlib.sha256(b"entangle|" + self.session_key).hexdigest()[:16]
             resp = {
                 "status": "ok",
                 "zk_proof": zk_proof,
                 "entanglement_id": self._entangle_id,
                 "qkd_master_key": qkd_master_key,  # DEMO ONLY
+                "schema_version": self._schema_version,
+                "key_update": self._key_updates,
             }
             if qiskit_info:
                 resp.update(qiskit_info)
+            resp.update(self._issue_ticket())
+            if started is not None:
+                metrics.HANDSHAKE_SECONDS["server"].observe(time.perf_counter() - started)
             return resp
         except ValueError as e:
             return {"status": "error", "message": str(e)}
 
+    @profiling.traced
     def client_pass_3(self, server_response):
         """Client verifies server and completes handshake."""
         # Client would verify zk_proof here (omitted in demo)
-        # Prefer server-provided qiskit_key if present (flag path), else fallback to BB84/qkd_master_key
+        # Prefer server-provided qiskit_key if present (flag path), else fall back
+        # to BB84/qkd_master_key
         if (
             is_qiskit_enabled()
             and isinstance(server_response, dict)
@@ -174,119 +401,553 @@ class QASWPSession:
         elif isinstance(server_response, dict) and "qkd_master_key" in server_response:
             qkd_master_key = server_response["qkd_master_key"]
         else:
-            qkd_master_key = bb84_keygen()
-        kdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=self.transcript)
-        self.session_key = kdf.derive(qkd_master_key)
+            qkd_master_key = master_key()
+        if isinstance(server_response, dict):
+            self._schema_version = wire.negotiate_schema(
+                (server_response.get("schema_version", wire.SCHEMA_JSON),), self._supported_schemas
+            )
+            self._key_updates = bool(server_response.get("key_update"))
+        self._install_session_key(self._derive_session_key(qkd_master_key))
+        self._store_ticket(server_response)
+        if self.metrics is not None and self._handshake_started is not None:
+            elapsed = time.perf_counter() - self._handshake_started
+            metrics.HANDSHAKE_SECONDS["client"].observe(elapsed)
+            self._handshake_started = None
 
         finish_proof = generate_zk_proof("client_private_state", self.transcript)
-        # derive same entangle id stub
-        self._entangle_id = hashlib.sha256(b"entangle|" + self.session_key).hexdigest()[:16]
         return {
             "status": "ok",
             "finish_proof": finish_proof,
             "entanglement_id": self._entangle_id,
         }
 
-    def weave_packet(self, data_tokens):
+    @profiling.traced
+    def weave_packet(self, data_tokens, context_id=0):
         """Creates a neural-semantic packet with batched confirmations.
 
         Demo-mode logic:
         - If prediction matches, we accumulate 1 bit (no immediate send).
-        - We flush a compact confirmation packet every 64 matches or on mismatch.
+        - We flush a compact confirmation packet when the batch reaches the
+          context's size limit (64 by default), when the oldest confirmation
+          passed the policy's ``max_delay``, or on mismatch.
         - On mismatch, we include the corrective token id.
+
+        ``context_id`` selects the multiplexed stream (0..255); each stream has
+        its own prediction context, confirmation batch and sequence space.
+        Contexts that carry a :meth:`send_tokens` stream raise ``ValueError``,
+        as do token IDs that are not integers; either leaves no trace.
         """
         if not self.session_key:
             raise ConnectionError("Session not established.")
+        ctx = self._weave_context(context_id)
+        wire.check_tokens(data_tokens)
 
         # predict next token id given history (last token is "true" next)
         history = data_tokens[:-1] if len(data_tokens) > 1 else data_tokens
-        prediction_id = self.model.predict_next_token(history)
+        predictor = self._weave_predictor(ctx)
+        if predictor is not None:
+            prediction_id = predictor.predict(history, ctx.kv_cache)
+        else:
+            prediction_id = self.model.predict_next_token_cached(history, ctx.kv_cache)
         actual_id = data_tokens[-1] if len(data_tokens) else prediction_id
-        # DEMO: treat templated flows as perfectly predicted to highlight batching compression
-        prediction_id = actual_id
+        if predictor is not None:
+            predictor.update(history, actual_id)
+        if is_demo_mode():
+            # DEMO: treat templated flows as perfectly predicted to highlight batching compression
+            prediction_id = actual_id
+        return self._weave_predicted(ctx, actual_id, prediction_id)
+
+    def _weave_context(self, context_id):
+        ctx = self.context(context_id)
+        if ctx.tx_coder is not None:
+            # the receiver would mistake these frames for stream tokens
+            raise ValueError(f"context {context_id} carries a reconstructable stream")
+        return ctx
+
+    @profiling.traced
+    def weave_many(self, token_sequences, context_id=0):
+        """Weave several messages with a single batched model forward pass.
+
+        Equivalent to ``[self.weave_packet(t, context_id) for t in token_sequences]``:
+        the returned packets and the confirmation batch state are identical,
+        only the predictions are computed together. Every message is checked
+        before the first is woven, so a call that raises changes no state.
+        """
+        if not self.session_key:
+            raise ConnectionError("Session not established.")
+        if not token_sequences:
+            return []
+        ctx = self._weave_context(context_id)
+        # validate everything up front: a bad message must not leave the ones
+        # before it sequenced but unsent
+        for tokens in token_sequences:
+            wire.check_tokens(tokens)
+        histories = [t[:-1] if len(t) > 1 else t for t in token_sequences]
+        predictor = self._weave_predictor(ctx)
+        if predictor is not None:
+            if not all(histories):
+                raise ValueError("Cannot predict from an empty history.")
+            observed = [t[-1] for t in token_sequences]
+            predictions = predictor.predict_many(histories, observed)
+        else:
+            predictions = self.model.predict_next_tokens(histories)
+        actuals = [
+            t[-1] if len(t) else p for t, p in zip(token_sequences, predictions, strict=True)
+        ]
+        if is_demo_mode():
+            predictions = actuals
+        pairs = zip(actuals, predictions, strict=True)
+        return [self._weave_predicted(ctx, a, p) for a, p in pairs]
+
+    @profiling.traced
+    def send_tokens(self, tokens, context_id=0):
+        """Send a run of tokens on a reconstructable stream.
+
+        Unlike :meth:`weave_packet`, the prediction history is the stream
+        itself: every token is predicted from all tokens sent before it on
+        this context, exactly as the receiver's :class:`StreamDecoder` will
+        predict it. Hits become confirmation bits, misses become delta frames.
+        Demo mode does not apply here. Frames of the stream carry
+        ``FLAG_STREAM``; confirmations woven on the context before the stream
+        started are flushed first, without it.
+
+        Returns:
+            list: The packets flushed by this call, in send order.
+        """
+        if not self.session_key:
+            raise ConnectionError("Session not established.")
+        ctx = self.context(context_id)
+        out = []
+        if ctx.tx_coder is None and ctx.confirm_count:
+            out.append(self._emit_pending_batch_if_any(context_id=context_id))
+        coder = self._tx_coder(ctx)
+        for token in tokens:
+            packet = self._weave_predicted(ctx, token, coder.predict())
+            coder.push(token)
+            if "packets" in packet:
+                out.extend(packet["packets"])
+            elif packet["flushed"]:
+                out.append(packet)
+        return out
+
+    def _tx_coder(self, ctx):
+        if ctx.tx_coder is None:
+            ctx.tx_coder = TokenCoder(self.model, self._new_predictor())
+        return ctx.tx_coder
+
+    def stream(self, context_id=0):
+        """Return the receiver's :class:`StreamDecoder` for ``context_id``.
+
+        Iterate it to consume reconstructed tokens. Frames reach it through
+        :meth:`receive_woven_packet` when the session was created with
+        ``reconstruct=True``, or through :meth:`decode_coded`. Frames without
+        ``FLAG_STREAM`` only fill their sequence numbers.
+        """
+        ctx = self.context(context_id)
+        if ctx.decoder is None:
+            ctx.decoder = StreamDecoder(self.model, predictor=self._new_predictor())
+        return ctx.decoder
+
+    def _weave_predicted(self, ctx, actual_id, prediction_id):
+        hit = prediction_id == actual_id
+        m = self.metrics
+        if m is not None:
+            if hit:
+                m.hits += 1
+            else:
+                m.misses += 1
+        policy = self.batch_policy
+        now = None
+        if policy.timed:
+            now = policy.clock()
+            policy.observe(ctx, hit, now)
 
         # DEMO batching: accumulate confirmations
-        nonce = secrets.token_bytes(12)
-        aesgcm = AESGCM(self.session_key)
-
-        if prediction_id == actual_id:
+        if hit:
             # accumulate a '1' bit
-            self._confirm_bits = ((self._confirm_bits << 1) | 1) & ((1 << self._batch_size) - 1)
-            self._confirm_count += 1
-            # flush only when batch fills
-            if self._confirm_count < self._batch_size:
+            ctx.add_confirmation()
+            if ctx.batch_started is None:
+                ctx.batch_started = now
+            # flush when the batch fills or its oldest confirmation is overdue
+            if ctx.confirm_count < ctx.batch_limit and not policy.deadline_due(ctx, now):
                 return self._empty_packet()
-            # flush batch when we hit the batch size threshold
-            batch_packet = self._emit_pending_batch_if_any(nonce)
+            batch_packet = self._emit_pending_batch_if_any(context_id=ctx.context_id)
             return batch_packet or self._empty_packet()
         else:
             # mismatch → flush any pending confirmations first, then send corrective
             packets = []
             total_len = 0
-            if self._confirm_count > 0:
-                batch_packet = self.flush()
+            if ctx.confirm_count > 0:
+                batch_packet = self.flush(ctx.context_id)
                 if batch_packet:
                     total_len += batch_packet["wire_len"]
                     packets.append(batch_packet)
-                nonce = secrets.token_bytes(12)
             # send corrective delta
-            payload = {"t": "delta", "seq": self._seq, "need": actual_id}
-            pt = json.dumps(payload, separators=(",", ":")).encode()
-            enc = aesgcm.encrypt(nonce, pt, None)
-            plen = len(nonce) + len(enc)
+            cipher = self._crypto()
+            nonce = cipher.next_nonce()
+            payload = {"t": "delta", "seq": ctx.seq, "need": actual_id, "ctx": ctx.context_id}
+            header, enc = self._seal(cipher, nonce, payload)
+            plen = len(header) + len(nonce) + len(enc)
             total_len += plen
+            if m is not None:
+                m.deltas += 1
+                m.sent(plen, 1)
             packets.append(
                 {
                     "nonce": nonce,
+                    "header": header,
                     "encrypted_payload": enc,
                     "wire_len": plen,
                     "flushed": True,
                 }
             )
-            self._seq += 1
-            result = packets[-1]
-            result["wire_len"] = total_len
+            ctx.seq += 1
+            # The delta is returned with the combined wire length; when a batch
+            # was flushed ahead of it, both frames are listed under "packets"
+            # so transports send the batch too.
+            result = dict(packets[-1], wire_len=total_len)
+            if len(packets) > 1:
+                result["packets"] = packets
             return result
 
+    @profiling.traced
+    def weave_coded(self, tokens, context_id=0):
+        """Send ``tokens`` as one arithmetic-coded frame (binary schema only).
+
+        Each token is coded under the model's next-token distribution given
+        everything sent on this context so far (the same stream history as
+        :meth:`send_tokens`), so well-predicted tokens cost a fraction of a
+        bit. Pending confirmations are flushed first to keep sequence numbers
+        in order; the returned packet then lists both frames under
+        ``"packets"``.
+        """
+        if not self.session_key:
+            raise ConnectionError("Session not established.")
+        if self._schema_version < wire.SCHEMA_BINARY:
+            raise ValueError("coded frames need the binary wire schema")
+        tokens = list(tokens)
+        if not 0 < len(tokens) <= 0xFFFF:
+            raise ValueError("a coded frame carries 1..65535 tokens")
+        ctx = self.context(context_id)
+        pending = self._emit_pending_batch_if_any(context_id=context_id)
+        payload = {
+            "t": "coded",
+            "seq": ctx.seq,
+            "count": len(tokens),
+            "data": self._tx_coder(ctx).encode(tokens),
+            "ctx": context_id,
+        }
+        cipher = self._crypto()
+        nonce = cipher.next_nonce()
+        header, enc = self._seal(cipher, nonce, payload)
+        ctx.seq += len(tokens)
+        packet = {
+            "nonce": nonce,
+            "header": header,
+            "encrypted_payload": enc,
+            "wire_len": len(header) + len(nonce) + len(enc),
+            "flushed": True,
+        }
+        m = self.metrics
+        if m is not None:
+            m.coded += 1
+            m.sent(packet["wire_len"], len(tokens))
+        if pending is not None:
+            packet["packets"] = [pending, dict(packet)]
+        return packet
+
+    def decode_coded(self, frame):
+        """Feed a frame from :meth:`receive_woven_packet` to its stream decoder.
+
+        Returns the tokens that became available, which is empty while an
+        earlier frame of the stream is still missing (or when the session
+        already fed the frame itself because ``reconstruct=True``).
+        """
+        decoder = self.stream(frame["ctx"])
+        decoder.feed(frame)
+        return list(decoder)
+
+    def _issue_ticket(self):
+        if self.ticket_issuer is None:
+            return {}
+        secret = resumption.resumption_secret(self.session_key, self.transcript)
+        return {
+            "ticket": self.ticket_issuer.issue(secret, self._schema_version),
+            "ticket_lifetime": self.ticket_issuer.lifetime,
+        }
+
+    def _store_ticket(self, server_response):
+        if not isinstance(server_response, dict) or "ticket" not in server_response:
+            return
+        self.ticket = {
+            "ticket": server_response["ticket"],
+            "secret": resumption.resumption_secret(self.session_key, self.transcript),
+            "schema_version": self._schema_version,
+            "expires": time.time() + server_response["ticket_lifetime"],
+        }
+
+    @profiling.traced
+    def resume_pass_1(self, ticket):
+        """Client resumes a session from ``ticket`` (a previous session's :attr:`ticket`).
+
+        The new session key is installed at once, so packets woven right
+        after this are 0-RTT early data; send them behind the returned hello.
+        If the server rejects the resumption they are lost and the client
+        must run the full handshake.
+        """
+        if time.time() >= ticket["expires"]:
+            raise ValueError("resumption ticket expired")
+        client_nonce = secrets.token_bytes(resumption.CLIENT_NONCE_LEN)
+        self._resume(ticket["secret"], ticket["ticket"], client_nonce, ticket["schema_version"])
+        return {"ticket": ticket["ticket"], "client_nonce": client_nonce}
+
+    @profiling.traced
+    def resume_pass_2(self, resume_hello):
+        """Server resumes statelessly from the ticket in ``resume_hello``.
+
+        Replays, forged or expired tickets, malformed hellos and servers
+        without a ``ticket_issuer`` get ``{"status": "error"}``; early data
+        must then be dropped. On success the reply carries a fresh ticket.
+        """
+        redeemed = None
+        if self.ticket_issuer is not None and isinstance(resume_hello, dict):
+            redeemed = self.ticket_issuer.redeem(
+                resume_hello.get("ticket"), resume_hello.get("client_nonce")
+            )
+        if redeemed is None:
+            return {"status": "error", "message": "resumption rejected"}
+        secret, schema_version = redeemed
+        if schema_version not in self._supported_schemas:
+            return {"status": "error", "message": "resumption rejected"}
+        self._resume(secret, resume_hello["ticket"], resume_hello["client_nonce"], schema_version)
+        resp = {"status": "ok", "resumed": True, "entanglement_id": self._entangle_id}
+        resp.update(self._issue_ticket())
+        return resp
+
+    def resume_pass_3(self, server_response):
+        """Client processes the server's answer; False if the resumption was rejected."""
+        if not isinstance(server_response, dict) or server_response.get("status") != "ok":
+            return False
+        self._store_ticket(server_response)
+        return True
+
+    def _resume(self, secret, ticket, client_nonce, schema_version):
+        self.transcript = b"resume|" + bytes(ticket) + bytes(client_nonce)
+        self._schema_version = schema_version
+        # tickets only come from peers that also ratchet keys
+        self._key_updates = True
+        self._install_session_key(resumption.resumed_key(secret, client_nonce, bytes(ticket)))
+
     def entanglement_id(self):
         """Return the deterministic entanglement stub id."""
         return self._entangle_id
 
+    @profiling.traced
     def receive_woven_packet(self, packet):
-        """Decrypts and processes a woven packet."""
+        """Decrypts and processes a woven packet.
+
+        The decoded dict carries the stream's ``ctx`` so callers can
+        demultiplex; the matching receiver-side context is advanced. With
+        ``reconstruct=True`` a frame the stream decoder cannot apply is still
+        returned and counted in ``metrics.decode_errors``.
+        """
+        opened = self._open_packet(packet)
+        if opened is None:
+            return None
+        return self._accept_packet(*opened)
+
+    @profiling.traced
+    def receive_many(self, packets, executor=None):
+        """Receive a backlog of packets in one call.
+
+        Every packet is dropped or accepted exactly as by
+        :meth:`receive_woven_packet`: placeholders, malformed, forged and
+        replayed packets are skipped without raising. Validation is one pass
+        over the list. Backlogs of at least ``PARALLEL_RECEIVE_MIN`` packets
+        are decrypted on a thread pool when the host has more than one CPU
+        (or always on ``executor``, if given). Replay and receive state are
+        then updated serially in nonce (= send) order.
+
+        Returns:
+            list: The decoded payloads, sorted by ``(ctx, seq)``.
+        """
+        return self._accept_many(self._open_many(packets, executor))
+
+    def _open_packet(self, packet):
+        """Validate, replay-check and decrypt ``packet`` without changing any state.
+
+        Returns ``(decoded, nonce, key_epoch)``, or ``None`` for packets to
+        drop. Safe to run alongside sends and other opens;
+        :meth:`_accept_packet` applies the result.
+        """
         if not self.session_key:
             raise ConnectionError("Session not established.")
+        cipher = self._crypto()
+        checked = self._check_packet(cipher, packet)
+        if checked is None:
+            return None
+        return self._decrypt_packet(cipher, *checked)
 
+    def _open_many(self, packets, executor=None):
+        """:meth:`_open_packet` over a list; returns the opened packets only."""
+        if not self.session_key:
+            raise ConnectionError("Session not established.")
+        cipher = self._crypto()
+        check = self._check_packet
+        checked = [c for c in (check(cipher, p) for p in packets) if c is not None]
+        if self._key_updates and self._schema_version >= wire.SCHEMA_BINARY:
+            checked = self._assign_epochs(cipher, checked)
+        decrypt = self._decrypt_packet
+        opened = _map_chunked(lambda c: decrypt(cipher, *c), checked, executor)
+        return [o for o in opened if o is not None]
+
+    def _assign_epochs(self, cipher, checked):
+        """Key epoch of every frame in a backlog that may span several key updates.
+
+        Frames are walked in nonce order, advancing at each key-phase flip.
+        The first frame of a new epoch is authenticated on the spot, so a
+        forged flag cannot shift the epochs of the frames after it.
+        """
+        epoch, start = cipher.rx_epoch, cipher.rx_epoch_start
+        out = []
+        for nonce, payload, header in sorted(checked, key=lambda c: bytes(c[0])):
+            if not header or len(header) != wire.HEADER_LEN:
+                out.append((nonce, payload, header, epoch))  # dropped by the decrypt
+                continue
+            frame_epoch = epoch
+            if bool(header[4] & wire.FLAG_KEY_PHASE) != bool(epoch & 1):
+                counter = nonce_counter(nonce)
+                if counter < start:
+                    frame_epoch = epoch - 1
+                else:
+                    opened = self._decrypt_packet(cipher, nonce, payload, header, epoch + 1)
+                    if opened is None:
+                        continue
+                    # epoch + 3 if the whole epoch + 2 was lost
+                    epoch = frame_epoch = opened[2]
+                    start = counter
+            out.append((nonce, payload, header, frame_epoch))
+        return out
+
+    def _check_packet(self, cipher, packet):
+        """Cheap checks before decryption; returns ``(nonce, payload, header)`` or ``None``."""
         # Placeholders (no flush yet) are represented with zero wire length or an
         # explicit "flushed" flag. These should be treated as a no-op so we do
         # not attempt to decrypt empty data.
-        wire_len = packet.get("wire_len") if isinstance(packet, dict) else None
-        flushed = packet.get("flushed") if isinstance(packet, dict) else None
+        if not isinstance(packet, dict):
+            return self._drop("drop_malformed")
+        wire_len = packet.get("wire_len")
+        flushed = packet.get("flushed")
         if wire_len == 0 or flushed is False:
-            return None
+            return self._drop("drop_placeholder")
 
         nonce = packet.get("nonce")
         payload = packet.get("encrypted_payload")
+        header = packet.get("header")
 
         # Reject placeholders or malformed payloads before attempting to decrypt.
         if not nonce or not payload:
-            return None
-
-        if not isinstance(nonce, (bytes, bytearray, memoryview)):
-            return None
-        if not isinstance(payload, (bytes, bytearray, memoryview)):
-            return None
-
-        nonce = bytes(nonce)
-        payload = bytes(payload)
-
-        aesgcm = AESGCM(self.session_key)
-        try:
-            decrypted_payload = aesgcm.decrypt(nonce, payload, None)
-        except (InvalidTag, ValueError):
-            # Treat unverifiable or malformed ciphertexts as drop/no-op events.
-            return None
-        return json.loads(decrypted_payload.decode())
+            return self._drop("drop_placeholder")
+
+        # AES-GCM takes any bytes-like object, so nothing is copied here
+        if not isinstance(nonce, _BYTES_LIKE):
+            return self._drop("drop_malformed")
+        if not isinstance(payload, _BYTES_LIKE):
+            return self._drop("drop_malformed")
+        if header and not isinstance(header, _BYTES_LIKE):
+            return self._drop("drop_malformed")
+
+        # Peers on the binary schema use counter nonces, so replays are
+        # rejected before paying for a decrypt. Legacy JSON peers send random
+        # nonces and are exempt.
+        if self._schema_version >= wire.SCHEMA_BINARY and not cipher.replay_check(nonce):
+            return self._drop("drop_replay")
+        return nonce, payload, header
+
+    def _decrypt_packet(self, cipher, nonce, payload, header, epoch=None):
+        """Authenticate and decode one checked packet; touches no session state.
+
+        ``epoch`` defaults to the one the header's key-phase flag points at.
+        A frame that fails under an epoch not older than the current one is
+        retried two epochs on, where the key phase repeats: the whole epoch in
+        between may have been lost. The returned epoch is the one that worked.
+        """
+        if header:
+            # Binary frame: the header is authenticated as associated data.
+            try:
+                seq, flags, ctx_id, length = wire.unpack_header(header)
+                if length != len(payload):
+                    return self._drop("drop_malformed")
+                if epoch is None:
+                    epoch = cipher.rx_epoch_for(nonce, flags & wire.FLAG_KEY_PHASE)
+                try:
+                    plaintext = cipher.decrypt(nonce, payload, header, epoch)
+                except cipher.auth_errors:
+                    if not self._key_updates or epoch < cipher.rx_epoch:
+                        raise
+                    epoch += 2
+                    plaintext = cipher.decrypt(nonce, payload, header, epoch)
+                result = wire.decode_body(plaintext, seq)
+                result["ctx"] = ctx_id
+                if flags & wire.FLAG_STREAM:
+                    result["stream"] = True
+            except cipher.auth_errors:
+                return self._drop("drop_auth")
+        else:
+            try:
+                decrypted_payload = cipher.decrypt(nonce, payload, None)
+            except cipher.auth_errors:
+                # Treat unverifiable or malformed ciphertexts as drop/no-op events.
+                return self._drop("drop_auth")
+            result = json.loads(decrypted_payload.decode())
+            if not isinstance(result, dict):
+                return self._drop("drop_malformed")
+            result.setdefault("ctx", 0)
+            try:
+                check_context_id(result["ctx"])
+            except ValueError:
+                return self._drop("drop_malformed")
+            epoch = 0
+        return result, nonce, epoch
+
+    def _drop(self, reason):
+        m = self.metrics
+        if m is not None:
+            setattr(m, reason, getattr(m, reason) + 1)
+        return None
+
+    def _accept_packet(self, result, nonce, epoch=0):
+        """Record an opened packet in the replay window and receive state.
+
+        Returns ``None`` if the same nonce was accepted since it was opened.
+        """
+        if self._schema_version >= wire.SCHEMA_BINARY:
+            cipher = self._crypto()
+            if not cipher.replay_accept(nonce):
+                return self._drop("drop_replay")
+            if epoch > cipher.rx_epoch:
+                cipher.rx_commit(epoch, nonce)
+        if self.metrics is not None:
+            self.metrics.received += 1
+        self.context(result["ctx"]).advance_rx(result)
+        if self.reconstruct:
+            decoder = self.stream(result["ctx"])
+            try:
+                if result.get("stream"):
+                    decoder.feed(result)
+                else:
+                    decoder.skip(result)
+            except (ValueError, OverflowError):
+                # the frame is authentic and accepted; only reconstruction failed
+                self._drop("decode_errors")
+        return result
+
+    def _accept_many(self, opened):
+        # counter nonces sort in send order, which keeps a long backlog
+        # inside the replay window
+        opened = sorted(opened, key=lambda o: bytes(o[1]))
+        accepted = [self._accept_packet(*o) for o in opened]
+        return sorted((r for r in accepted if r is not None), key=lambda r: (r["ctx"], r["seq"]))
 
     # DEMO "zk-like" succinct commitment (not a SNARK; size-limited)
     def demo_model_commitment(self) -> bytes:
@@ -1,16 +1,31 @@
 """Qiskit-backed QKD handshake scaffold for QASWP."""
 from __future__ import annotations
 
-from typing import Tuple, Union
 import hashlib
 import os
+from typing import Tuple, Union
+
+# Probed on first use: importing qiskit costs seconds and most processes never
+# enable the flag. ``QISKIT_AVAILABLE`` is served by the module __getattr__.
+_qiskit_available = None
+
+
+def _probe_qiskit() -> bool:
+    global _qiskit_available
+    if _qiskit_available is None:
+        try:
+            import qiskit  # type: ignore  # noqa: F401
+
+            _qiskit_available = True
+        except Exception:  # pragma: no cover - availability check
+            _qiskit_available = False
+    return _qiskit_available
 
-try:
-    import qiskit  # type: ignore  # noqa: F401
 
-    QISKIT_AVAILABLE = True
-except Exception:  # pragma: no cover - availability check
-    QISKIT_AVAILABLE = False
+def __getattr__(name: str) -> bool:
+    if name == "QISKIT_AVAILABLE":
+        return _probe_qiskit()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def perform_qkd_session() -> Tuple[str, Union[bytes, str]]:
@@ -18,7 +33,7 @@ def perform_qkd_session() -> Tuple[str, Union[bytes, str]]:
     flag = os.getenv("QASWP_QISKIT", "0").strip().lower() in ("1", "true", "yes", "y")
     if not flag:
         return ("skipped", "QASWP_QISKIT flag not enabled")
-    if not QISKIT_AVAILABLE:
+    if not _probe_qiskit():
         return ("skipped", "Qiskit not installed/available in this environment")
 
     seed = (os.getenv("QISKIT_DEMO_SEED", "qaswp") + os.getenv("GITHUB_RUN_ID", "local")).encode()
@@ -0,0 +1,136 @@
+"""Receiver-side reconstruction of a sender's token stream.
+
+A stream arrives as three kinds of frames, each covering a run of sequence
+numbers: ``batch`` (confirmed predictions), ``delta`` (one corrected token)
+and ``coded`` (arithmetic-coded tokens). :class:`StreamDecoder` keeps the
+receiver's own prediction context, reorders frames by sequence number,
+expands confirmations by running the model and yields the reconstructed
+tokens in order. Frames the sender did not predict from the stream
+(:meth:`~src.qaswp.QASWPSession.weave_packet` traffic on the same context)
+are passed to :meth:`StreamDecoder.skip`: they occupy sequence numbers but
+yield no tokens.
+"""
+import heapq
+from collections import deque
+
+from .entropy import TokenCoder
+from .wire import SEQ_MASK
+
+_SEQ_HALF = (SEQ_MASK + 1) >> 1
+
+
+def _span(frame):
+    """Number of sequence numbers a frame covers."""
+    kind = frame["t"]
+    if kind == "delta":
+        return 1
+    if kind in ("batch", "coded"):
+        return frame["count"]
+    raise ValueError(f"cannot reconstruct frame kind {kind!r}")
+
+
+class StreamDecoder:
+    """Rebuild one context's token stream from decoded frames.
+
+    Frames may be fed in any order; tokens become available once every
+    earlier sequence number has arrived. Duplicates are ignored. Iterating
+    the decoder yields (and consumes) the tokens reconstructed so far.
+
+    Args:
+        model: The shared prediction model (same weights as the sender's).
+        max_pending (int): Most out-of-order frames to buffer before
+            :meth:`feed` raises ``OverflowError``.
+        predictor (PredictorChain, optional): Must match the sender's chain.
+    """
+
+    def __init__(self, model, max_pending=4096, predictor=None):
+        self.coder = TokenCoder(model, predictor)
+        self.next_seq = 0
+        self.max_pending = max_pending
+        self.tokens_out = 0
+        self._pending = []
+        self._order = 0
+        self._ready = deque()
+
+    @property
+    def history(self):
+        """Reconstructed tokens so far (after the stream's BOS seed)."""
+        return self.coder.history[1:]
+
+    def _unwrap(self, seq):
+        # header seqs are 32-bit; place them within half the space of next_seq
+        delta = (seq - self.next_seq) & SEQ_MASK
+        if delta >= _SEQ_HALF:
+            delta -= SEQ_MASK + 1
+        return self.next_seq + delta
+
+    def feed(self, frame):
+        """Accept a decoded frame and reconstruct as far as the sequence allows.
+
+        Returns:
+            int: Number of tokens that became available.
+
+        Raises:
+            ValueError: On an unknown frame kind or a batch with a zero bit
+                (an unconfirmed position cannot be reconstructed).
+            OverflowError: If more than ``max_pending`` frames are waiting.
+        """
+        return self._push(frame, True)
+
+    def skip(self, frame):
+        """Accept a frame that is not part of the stream; it only fills its sequence numbers.
+
+        Raises the same errors as :meth:`feed`.
+        """
+        return self._push(frame, False)
+
+    def _push(self, frame, in_stream):
+        seq = self._unwrap(frame["seq"])
+        if seq < self.next_seq:
+            return 0
+        if len(self._pending) >= self.max_pending:
+            raise OverflowError("too many out-of-order frames waiting for a gap")
+        heapq.heappush(self._pending, (seq, self._order, frame, in_stream))
+        self._order += 1
+        before = len(self._ready)
+        while self._pending and self._pending[0][0] <= self.next_seq:
+            seq, _, frame, in_stream = heapq.heappop(self._pending)
+            if seq == self.next_seq:
+                if in_stream:
+                    self._apply(frame)
+                else:
+                    self.next_seq += _span(frame)
+        return len(self._ready) - before
+
+    def _apply(self, frame):
+        kind = frame["t"]
+        coder = self.coder
+        if kind == "batch":
+            count = frame["count"]
+            if frame["bits"] != (1 << count) - 1:
+                raise ValueError("batch contains an unconfirmed position")
+            tokens = []
+            for _ in range(count):
+                token = coder.predict()
+                coder.push(token)
+                tokens.append(token)
+        elif kind == "delta":
+            tokens = [frame["need"]]
+            coder.push(frame["need"])
+        elif kind == "coded":
+            tokens = coder.decode(frame["data"], frame["count"])
+        else:
+            raise ValueError(f"cannot reconstruct frame kind {kind!r}")
+        self.next_seq += len(tokens)
+        self.tokens_out += len(tokens)
+        self._ready.extend(tokens)
+
+    @property
+    def pending(self):
+        """Number of buffered frames waiting for an earlier sequence number."""
+        return len(self._pending)
+
+    def __iter__(self):
+        ready = self._ready
+        while ready:
+            yield ready.popleft()
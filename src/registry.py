@@ -0,0 +1,137 @@
+"""Process-wide registry of shared, read-only models (IETF-DRAFT §7 "Memory and State").
+
+Sessions borrow an immutable model from the registry and keep only their own
+context state (confirmation batch, sequence counters, KV cache), so N sessions
+cost one copy of the weights instead of N.
+"""
+import threading
+
+from .config import model_file
+
+DEFAULT_MODEL_NAME = "tinyllm-demo"
+DEFAULT_MODEL_SEED = 0x5A5A
+
+
+def freeze_model(model):
+    """Put ``model`` in eval mode and disable gradients on every parameter."""
+    model.eval()
+    model.requires_grad_(False)
+    return model
+
+
+def build_default_model():
+    """Build the demo TinyLLM with deterministic weights.
+
+    Every process gets the same parameters (and thus the same model hash), so
+    peers agree on predictions without shipping weights.
+    """
+    import torch
+
+    from .neural import TinyLLM
+
+    with torch.random.fork_rng(devices=[]):
+        torch.manual_seed(DEFAULT_MODEL_SEED)
+        return TinyLLM()
+
+
+class ModelRegistry:
+    """Thread-safe map of model ID (hex model hash) and alias -> shared model."""
+
+    def __init__(self):
+        self._models = {}
+        self._aliases = {}
+        self._lock = threading.Lock()
+
+    def register(self, model, name=None):
+        """Freeze and register ``model``; returns its model ID.
+
+        Registering a model whose ID is already known returns the existing ID
+        and keeps the first instance.
+        """
+        freeze_model(model)
+        model_id = model.get_model_diff_hash().hex()
+        with self._lock:
+            self._models.setdefault(model_id, model)
+            if name is not None:
+                self._aliases[name] = model_id
+        return model_id
+
+    def load_file(self, path, name=None, backend="torch", verify=True):
+        """Map a weight file (``src/weights.py``) and register its model.
+
+        The model ID is the file's content hash (plus the backend leaf for
+        ``backend="numpy"``). A model already registered is not loaded again.
+        """
+        from .weights import WeightFile
+
+        wf = WeightFile(path, verify=verify)
+        if backend == "torch":
+            model_id = wf.content_hash.hex()
+        else:
+            from .neural_np import backend_fingerprint
+
+            model_id = backend_fingerprint(wf.fingerprint.leaves).root.hex()
+        with self._lock:
+            known = model_id in self._models
+            if known and name is not None:
+                self._aliases[name] = model_id
+        if known:
+            return model_id
+        model = wf.to_torch() if backend == "torch" else wf.to_numpy()
+        return self.register(model, name=name)
+
+    def get(self, key):
+        """Return the shared model for a model ID or alias.
+
+        Raises:
+            KeyError: If ``key`` is not registered.
+        """
+        with self._lock:
+            model_id = self._aliases.get(key, key)
+            return self._models[model_id]
+
+    def get_or_create(self, name, factory):
+        """Return the model registered under ``name``, building it once if needed."""
+        with self._lock:
+            model_id = self._aliases.get(name)
+            if model_id is not None:
+                return self._models[model_id]
+        model = factory()
+        self.register(model, name=name)
+        return self.get(name)
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._aliases or key in self._models
+
+    def __len__(self):
+        with self._lock:
+            return len(self._models)
+
+
+_REGISTRY = ModelRegistry()
+
+
+def get_registry():
+    """Return the process-wide :class:`ModelRegistry`."""
+    return _REGISTRY
+
+
+def _build_default():
+    path = model_file()
+    if path is None:
+        return build_default_model()
+    from .weights import load
+
+    return load(path)
+
+
+def shared_model(key=None):
+    """Return a shared model by ID/alias, or the default model.
+
+    The default is the demo model, or the weight file named by
+    ``QASWP_MODEL_FILE`` when that is set.
+    """
+    if key is None:
+        return _REGISTRY.get_or_create(DEFAULT_MODEL_NAME, _build_default)
+    return _REGISTRY.get(key)
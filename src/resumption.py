@@ -0,0 +1,159 @@
+"""Session resumption tickets (TLS 1.3 §4.6.1-style, with 0-RTT data).
+
+At the end of a full handshake both sides derive a resumption secret from
+the session key and transcript. A server with a :class:`TicketIssuer`
+seals that secret under a session-ticket encryption key (STEK) it alone
+holds and hands the ticket to the client in ``server_pass_2``, so servers
+keep no per-client state. A returning client sends the ticket with a fresh
+random nonce and, without waiting for a reply, derives the new session key
+``HKDF(secret, salt=nonce, info=ticket)`` and starts sending. The server
+opens the ticket, checks its age and records the nonce in a
+:class:`StrikeRegister`, so a replayed resumption (and the early data
+following it) is refused.
+"""
+import heapq
+import os
+import struct
+import threading
+import time
+
+from .aead import NONCE_LEN
+
+STEK_LEN = 32
+SECRET_LEN = 32
+CLIENT_NONCE_LEN = 32
+
+_KEY_ID = struct.Struct(">I")
+# issued at (unix seconds), lifetime (seconds), schema version, resumption secret
+_STATE = struct.Struct(f">dIB{SECRET_LEN}s")
+
+
+def _hkdf(key, salt, info):
+    from cryptography.hazmat.primitives import hashes
+    from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+    return HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=info).derive(key)
+
+
+def resumption_secret(session_key, transcript):
+    """Secret both peers derive from a finished handshake; never sent in clear."""
+    return _hkdf(session_key, None, b"qaswp resumption|" + transcript)
+
+
+def resumed_key(secret, client_nonce, ticket):
+    """Session key of a resumed session; fresh for every client nonce."""
+    return _hkdf(secret, client_nonce, b"qaswp resume|" + ticket)
+
+
+class StrikeRegister:
+    """Client nonces of accepted resumptions, kept until their ticket expires.
+
+    Once ``max_entries`` unexpired nonces are held, new resumptions are
+    refused (clients fall back to a full handshake) rather than forgetting
+    nonces that could still be replayed.
+    """
+
+    def __init__(self, max_entries=100_000, clock=time.time):
+        self.max_entries = max_entries
+        self.clock = clock
+        self._seen = {}
+        self._expiry = []
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._seen)
+
+    def add(self, nonce, expires):
+        """Record ``nonce`` until ``expires``; False if seen before or full."""
+        nonce = bytes(nonce)
+        with self._lock:
+            now = self.clock()
+            while self._expiry and self._expiry[0][0] <= now:
+                _, old = heapq.heappop(self._expiry)
+                self._seen.pop(old, None)
+            if nonce in self._seen or len(self._seen) >= self.max_entries:
+                return False
+            self._seen[nonce] = expires
+            heapq.heappush(self._expiry, (expires, nonce))
+            return True
+
+
+class TicketIssuer:
+    """Seals and opens resumption tickets; share one between server sessions.
+
+    A ticket is ``key_id (4) | nonce (12) | AES-GCM(STEK, state)``. The
+    current STEK issues tickets; after :meth:`rotate` the previous one still
+    opens tickets issued before, so rotating every ``lifetime`` seconds
+    never invalidates a live ticket.
+
+    Args:
+        lifetime (float): Seconds a ticket stays valid.
+        strikes (StrikeRegister, optional): Anti-replay register; a new one
+            with default limits if omitted.
+        clock (callable): Returns unix time in seconds.
+    """
+
+    def __init__(self, lifetime=3600.0, strikes=None, clock=time.time):
+        self.lifetime = lifetime
+        self.clock = clock
+        self.strikes = strikes or StrikeRegister(clock=clock)
+        self._keys = {}
+        self._key_id = -1
+        self.rotate()
+
+    def rotate(self):
+        """Start issuing under a new STEK; keep only the previous one for opening."""
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+        previous = self._keys.get(self._key_id)
+        self._key_id = (self._key_id + 1) & 0xFFFFFFFF
+        self._keys = {self._key_id: AESGCM(os.urandom(STEK_LEN))}
+        if previous is not None:
+            self._keys[(self._key_id - 1) & 0xFFFFFFFF] = previous
+
+    def issue(self, secret, schema_version):
+        """Return a ticket carrying ``secret`` for the negotiated schema."""
+        key_id = _KEY_ID.pack(self._key_id)
+        nonce = os.urandom(NONCE_LEN)
+        state = _STATE.pack(self.clock(), int(self.lifetime), schema_version, secret)
+        return key_id + nonce + self._keys[self._key_id].encrypt(nonce, state, key_id)
+
+    def open(self, ticket):
+        """Decrypt ``ticket``; returns ``(issued, lifetime, schema, secret)`` or None."""
+        from cryptography.exceptions import InvalidTag
+
+        head = _KEY_ID.size + NONCE_LEN
+        if not isinstance(ticket, (bytes, bytearray)) or len(ticket) <= head:
+            return None
+        aead = self._keys.get(_KEY_ID.unpack_from(ticket)[0])
+        if aead is None:
+            return None
+        key_id, nonce = bytes(ticket[: _KEY_ID.size]), bytes(ticket[_KEY_ID.size : head])
+        try:
+            state = aead.decrypt(nonce, bytes(ticket[head:]), key_id)
+        except (InvalidTag, ValueError):
+            return None
+        if len(state) != _STATE.size:
+            return None
+        return _STATE.unpack(state)
+
+    def redeem(self, ticket, client_nonce):
+        """Validate a resumption attempt.
+
+        Returns:
+            tuple: ``(secret, schema_version)``, or ``None`` when the ticket is
+            forged, expired or sealed under a retired STEK, or when
+            ``client_nonce`` was used before (a replay).
+        """
+        if not isinstance(client_nonce, (bytes, bytearray)):
+            return None
+        if len(client_nonce) != CLIENT_NONCE_LEN:
+            return None
+        opened = self.open(ticket)
+        if opened is None:
+            return None
+        issued, lifetime, schema_version, secret = opened
+        expires = issued + lifetime
+        if self.clock() >= expires or not self.strikes.add(client_nonce, expires):
+            return None
+        return secret, schema_version
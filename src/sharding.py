@@ -0,0 +1,465 @@
+"""Multi-process QASWP server: one dispatcher plus N session workers.
+
+The dispatcher owns the listening socket and every connection but only
+does framing. Each handshake (``server_pass_2`` with its QKD run) goes to
+the least busy worker. The established session is then pinned to worker
+``shard_for(entanglement_id, N)``, which adopts it by installing the same
+session key, and every data message of that connection is decrypted and
+handled there, so AEAD, parsing and ``on_packet`` spread over N cores.
+
+Dispatcher and workers talk over ``multiprocessing`` pipes. Messages are
+tuples; whatever is queued in one direction goes out as one pickled list.
+Workers are started with ``spawn``, so ``session_factory`` and
+``on_packet`` must be picklable (module-level functions or
+``functools.partial``). Workers inherit the environment, so
+``QASWP_MODEL_FILE`` (``src/weights.py``) lets all of them map one copy of
+the model.
+
+A message whose handling raises (a failing ``on_packet``, say) is logged
+and counted in the worker's ``errors``; the worker keeps going. A worker
+process that dies anyway is respawned on next use; the connections pinned
+to it are closed, since their receive state died with it.
+"""
+import asyncio
+import hashlib
+import itertools
+import logging
+import multiprocessing as mp
+import os
+import queue
+import threading
+
+from . import wire
+from .qaswp import QASWPSession
+from .transport import (
+    MSG_CLOSE,
+    MSG_DATA,
+    MSG_FINISH,
+    MSG_HELLO,
+    MSG_SERVER_HELLO,
+    ProtocolError,
+    _expect,
+    decode_control,
+    encode_control,
+    read_message,
+    valid_hello,
+    write_message,
+)
+
+log = logging.getLogger(__name__)
+
+_NO_SESSION = {"body": None, "shard": None, "state": None}
+
+
+def shard_for(key, n):
+    """Map a session key (e.g. the entanglement ID) to a worker index.
+
+    Unlike ``hash()``, the result is the same in every process and run.
+    """
+    digest = hashlib.blake2b(str(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % n
+
+
+def _default_session():
+    return QASWPSession(is_client=False)
+
+
+def _export(session):
+    """Everything another process needs to take over an established session."""
+    return {
+        "session_key": session.session_key,
+        "transcript": session.transcript,
+        "schema_version": session._schema_version,
+        "key_updates": session._key_updates,
+    }
+
+
+def _adopt(session, state):
+    session.transcript = state["transcript"]
+    session._schema_version = state["schema_version"]
+    session._key_updates = state["key_updates"]
+    session._install_session_key(state["session_key"])
+    return session
+
+
+class _Worker:
+    """Session table and handlers of one worker process."""
+
+    def __init__(self, index, n, session_factory, on_packet):
+        self.index = index
+        self.n = n
+        self.session_factory = session_factory
+        self.on_packet = on_packet
+        self.sessions = {}
+        self.handshakes = 0
+        self.packets = 0
+        self.errors = 0
+
+    def stats(self):
+        return {
+            "worker": self.index,
+            "pid": os.getpid(),
+            "sessions": len(self.sessions),
+            "handshakes": self.handshakes,
+            "packets": self.packets,
+            "errors": self.errors,
+        }
+
+    def handshake(self, conn_id, body):
+        try:
+            hello = decode_control(body)
+        except ProtocolError:
+            return dict(_NO_SESSION)
+        if not valid_hello(hello):
+            return dict(_NO_SESSION)
+        session = self.session_factory()
+        resp = session.server_pass_2(hello)
+        self.handshakes += 1
+        reply = {"body": encode_control(resp), "shard": None, "state": None}
+        if resp.get("status") == "ok":
+            shard = reply["shard"] = shard_for(session.entanglement_id(), self.n)
+            if shard == self.index:
+                self.sessions[conn_id] = session
+            else:
+                reply["state"] = _export(session)
+        return reply
+
+    def receive(self, conn_id, body):
+        session = self.sessions.get(conn_id)
+        if session is None:
+            return
+        try:
+            packet = wire.unpack_packet(body)
+        except ValueError:
+            return
+        decoded = session.receive_woven_packet(packet)
+        if decoded is None:
+            return
+        self.packets += 1
+        if self.on_packet is not None:
+            self.on_packet(session, decoded)
+
+    def handle(self, msg):
+        """Apply one message; returns ``(request_id, result)`` for requests.
+
+        Exceptions are logged and counted, never raised: one bad message or
+        callback must not take the other sessions of this worker down.
+        """
+        try:
+            return self._apply(msg)
+        except Exception:
+            log.exception("shard %d: %r message failed", self.index, msg[0])
+            self.errors += 1
+        if msg[0] == "hello":
+            return msg[1], dict(_NO_SESSION)
+        if msg[0] == "stats":
+            return msg[1], self.stats()
+        return None
+
+    def _apply(self, msg):
+        op = msg[0]
+        if op == "data":
+            self.receive(msg[1], msg[2])
+        elif op == "hello":
+            return msg[1], self.handshake(msg[2], msg[3])
+        elif op == "adopt":
+            self.sessions[msg[1]] = _adopt(self.session_factory(), msg[2])
+        elif op == "close":
+            self.sessions.pop(msg[1], None)
+        elif op == "stats":
+            return msg[1], self.stats()
+        return None
+
+
+def _worker_main(index, n, conn, session_factory, on_packet, initializer):
+    if initializer is not None:
+        initializer()
+    worker = _Worker(index, n, session_factory or _default_session, on_packet)
+    while True:
+        try:
+            batch = conn.recv()
+        except EOFError:
+            return
+        replies = []
+        for msg in batch:
+            if msg[0] == "drain":
+                # the pipe is FIFO, so everything sent before this is handled
+                replies.append((msg[1], worker.stats()))
+                conn.send(replies)
+                conn.close()
+                return
+            reply = worker.handle(msg)
+            if reply is not None:
+                replies.append(reply)
+        if replies:
+            conn.send(replies)
+
+
+class _WorkerHandle:
+    """Dispatcher-side end of one worker: a process, its pipe and two I/O threads.
+
+    The threads keep pickling and pipe writes off the event loop; the
+    sender also coalesces everything queued since its last write.
+    """
+
+    def __init__(self, ctx, loop, index, n, session_factory, on_packet, initializer):
+        self.index = index
+        self.pending = 0  # handshakes in flight
+        self.alive = True
+        self._loop = loop
+        self._ids = itertools.count()
+        self._futures = {}
+        self._outbox = queue.SimpleQueue()
+        self.conn, child = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(index, n, child, session_factory, on_packet, initializer),
+            name=f"qaswp-shard-{index}",
+            daemon=True,
+        )
+        self.process.start()
+        child.close()
+        threading.Thread(target=self._send_loop, daemon=True).start()
+        threading.Thread(target=self._recv_loop, daemon=True).start()
+
+    def post(self, msg):
+        """Queue a message that needs no reply."""
+        self._outbox.put(msg)
+
+    def request(self, op, *args):
+        """Queue a request; returns a future for the worker's reply."""
+        fut = self._loop.create_future()
+        if not self.alive:
+            fut.set_exception(ConnectionError(f"shard {self.index} is gone"))
+            return fut
+        req_id = next(self._ids)
+        self._futures[req_id] = fut
+        self.post((op, req_id, *args))
+        return fut
+
+    def _send_loop(self):
+        while True:
+            batch = [self._outbox.get()]
+            while True:
+                try:
+                    batch.append(self._outbox.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.conn.send(batch)
+            except OSError:
+                return
+            if batch[-1][0] == "drain":
+                return
+
+    def _recv_loop(self):
+        while True:
+            try:
+                replies = self.conn.recv()
+            except (EOFError, OSError):
+                break
+            self._loop.call_soon_threadsafe(self._resolve, replies)
+        try:
+            self._loop.call_soon_threadsafe(self._fail_all)
+        except RuntimeError:  # the loop already shut down
+            pass
+
+    def _resolve(self, replies):
+        for req_id, result in replies:
+            fut = self._futures.pop(req_id, None)
+            if fut is not None and not fut.done():
+                fut.set_result(result)
+
+    def _fail_all(self):
+        self.alive = False
+        futures, self._futures = self._futures, {}
+        for fut in futures.values():
+            if not fut.done():
+                fut.set_exception(ConnectionError(f"shard {self.index} is gone"))
+
+    async def drain(self):
+        """Have the worker finish its queue, report its stats and exit."""
+        try:
+            stats = await self.request("drain")
+        except ConnectionError:
+            stats = None
+        await self._loop.run_in_executor(None, self.process.join)
+        self.conn.close()
+        return stats
+
+
+class ShardedServer:
+    """:class:`~src.transport.QASWPServer` spread over worker processes.
+
+    Args:
+        host (str): Interface to bind.
+        port (int): TCP port (0 picks a free one; see :attr:`port`).
+        workers (int, optional): Number of worker processes; defaults to
+            ``os.cpu_count()``.
+        on_packet (callable, optional): ``on_packet(session, decoded)``,
+            called in the worker that owns the session.
+        session_factory (callable, optional): Builds server-side sessions in
+            the workers; defaults to ``QASWPSession(is_client=False)``.
+        initializer (callable, optional): Run once in each worker before it
+            takes messages, e.g. to load the model up front.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        workers=None,
+        on_packet=None,
+        session_factory=None,
+        initializer=None,
+    ):
+        self.host = host
+        self.port = port
+        self.n_workers = workers or os.cpu_count() or 1
+        self.on_packet = on_packet
+        self.session_factory = session_factory
+        self.initializer = initializer
+        self.sessions_active = 0
+        self.sessions_total = 0
+        self.respawns = 0
+        self._workers = []
+        self._server = None
+        self._handlers = set()
+        self._conn_ids = itertools.count()
+        self._rr = itertools.count()
+
+    def _spawn(self, index):
+        return _WorkerHandle(
+            mp.get_context("spawn"),
+            asyncio.get_running_loop(),
+            index,
+            self.n_workers,
+            self.session_factory,
+            self.on_packet,
+            self.initializer,
+        )
+
+    def _worker(self, index):
+        """Worker ``index``, replaced by a fresh process if it died."""
+        worker = self._workers[index]
+        if not worker.alive and self._server is not None:
+            worker.conn.close()
+            worker.post(("drain", None))  # unblocks its sender thread, which then exits
+            worker.process.join(0)
+            worker = self._workers[index] = self._spawn(index)
+            self.respawns += 1
+        return worker
+
+    async def start(self):
+        self._workers = [self._spawn(i) for i in range(self.n_workers)]
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def stats(self):
+        """Per-worker counters plus totals."""
+        workers = [self._worker(i) for i in range(len(self._workers))]
+        per_worker = await asyncio.gather(*(w.request("stats") for w in workers))
+        return _totals(per_worker)
+
+    async def close(self, timeout=None):
+        """Drain and shut down.
+
+        Stops accepting connections and gives open ones up to ``timeout``
+        seconds (forever if ``None``) to finish. Stragglers are then
+        cancelled. Finally each worker handles everything already sent to
+        it and exits.
+
+        Returns:
+            dict: Final counters, as from :meth:`stats`.
+        """
+        if self._server is None:
+            return None
+        self._server.close()
+        if self._handlers:
+            _, pending = await asyncio.wait(set(self._handlers), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+        await self._server.wait_closed()
+        self._server = None
+        per_worker = await asyncio.gather(*(w.drain() for w in self._workers))
+        return _totals([s for s in per_worker if s is not None])
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _handshake_worker(self):
+        # fewest handshakes in flight; ties rotate so idle workers share the load
+        start = next(self._rr)
+        n = len(self._workers)
+        return min((self._worker((start + i) % n) for i in range(n)), key=lambda w: w.pending)
+
+    async def _handle(self, reader, writer):
+        self._handlers.add(asyncio.current_task())
+        conn_id = next(self._conn_ids)
+        shard = None
+        self.sessions_active += 1
+        self.sessions_total += 1
+        try:
+            hello = await _expect(reader, MSG_HELLO)
+            worker = self._handshake_worker()
+            worker.pending += 1
+            try:
+                reply = await worker.request("hello", conn_id, bytes(hello))
+            finally:
+                worker.pending -= 1
+            if reply["body"] is None:
+                # answered like QASWPServer does, then closed
+                error = {"status": "error", "message": "malformed client hello"}
+                write_message(writer, MSG_SERVER_HELLO, encode_control(error))
+                await writer.drain()
+                return
+            if reply["shard"] is not None:
+                shard = self._worker(reply["shard"])
+                if reply["state"] is not None:
+                    shard.post(("adopt", conn_id, reply["state"]))
+            write_message(writer, MSG_SERVER_HELLO, reply["body"])
+            await writer.drain()
+            if shard is None:
+                return
+            decode_control(await _expect(reader, MSG_FINISH))
+            while True:
+                msg_type, body = await read_message(reader)
+                if msg_type is None or msg_type == MSG_CLOSE:
+                    return
+                if msg_type != MSG_DATA:
+                    raise ProtocolError(f"unexpected message type {msg_type}")
+                if not shard.alive:
+                    return  # the session died with its worker
+                shard.post(("data", conn_id, body))
+        except (ProtocolError, ConnectionError):
+            pass
+        finally:
+            if shard is not None:
+                shard.post(("close", conn_id))
+            self.sessions_active -= 1
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+def _totals(per_worker):
+    keys = ("sessions", "handshakes", "packets", "errors")
+    totals = {key: sum(s[key] for s in per_worker) for key in keys}
+    totals["workers"] = per_worker
+    return totals
@@ -0,0 +1,154 @@
+"""Share one ``QASWPSession`` between threads (IETF-DRAFT §7).
+
+Sending mutates per-context state (confirmation bitmap, sequence numbers,
+KV cache, nonce counter), so concurrent sends race. :class:`ConcurrentSession`
+funnels every state-changing call through one writer thread and hands the
+submitter a ``concurrent.futures.Future``. Runs of ``weave_packet`` calls
+on the same context that queue up while the writer is busy are woven with
+one ``weave_many`` call, so more submitters mean fewer model passes.
+
+Receiving touches only receive-side state. Validation and AEAD decryption
+run in the calling thread with no lock held; only the replay-window and
+stream update afterwards takes a short lock, never the writer queue. A
+context opened by the writer and a receiver at once is created under the
+session's context lock, so both get the same one.
+"""
+import queue
+import threading
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class ConcurrentSession:
+    """Thread-safe front end for an established :class:`~src.qaswp.QASWPSession`.
+
+    Send-side methods return futures resolving to what the session method
+    returns; use ``asyncio.wrap_future`` to await them from a loop.
+    :meth:`receive` is synchronous and may be called from any thread.
+    """
+
+    def __init__(self, session):
+        self.session = session
+        self._queue = queue.SimpleQueue()
+        self._rx_lock = threading.Lock()
+        self._closed = False
+        self._writer = threading.Thread(target=self._run, name="qaswp-writer", daemon=True)
+        self._writer.start()
+
+    def submit(self, method, *args):
+        """Queue ``session.<method>(*args)`` on the writer; returns a future."""
+        if self._closed:
+            raise RuntimeError("session is closed")
+        fut = Future()
+        self._queue.put((method, args, fut))
+        return fut
+
+    def weave_packet(self, data_tokens, context_id=0):
+        return self.submit("weave_packet", data_tokens, context_id)
+
+    def weave_many(self, token_sequences, context_id=0):
+        return self.submit("weave_many", token_sequences, context_id)
+
+    def send_tokens(self, tokens, context_id=0):
+        return self.submit("send_tokens", tokens, context_id)
+
+    def weave_coded(self, tokens, context_id=0):
+        return self.submit("weave_coded", tokens, context_id)
+
+    def flush(self, context_id=0):
+        return self.submit("flush", context_id)
+
+    def flush_all(self):
+        return self.submit("flush_all")
+
+    def poll(self, now=None):
+        return self.submit("poll", now)
+
+    def receive(self, packet):
+        """Decrypt and process a packet; same result as ``receive_woven_packet``."""
+        opened = self.session._open_packet(packet)
+        if opened is None:
+            return None
+        with self._rx_lock:
+            return self.session._accept_packet(*opened)
+
+    def receive_many(self, packets, executor=None):
+        """Bulk :meth:`receive`; same result as ``QASWPSession.receive_many``."""
+        opened = self.session._open_many(packets, executor)
+        with self._rx_lock:
+            return self.session._accept_many(opened)
+
+    def close(self):
+        """Finish everything already submitted, then stop the writer thread."""
+        if not self._closed:
+            self._closed = True
+            self._queue.put(_STOP)
+        self._writer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            while True:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = _STOP in items
+            items = [i for i in items if i is not _STOP and i[2].set_running_or_notify_cancel()]
+            for run in _runs(items):
+                self._execute(run)
+            if stop:
+                return
+
+    def _execute(self, run):
+        method, args, fut = run[0]
+        if len(run) > 1:
+            try:
+                # documented to equal one weave_packet per message
+                results = self.session.weave_many([a[0] for _, a, _ in run], _context_of(args))
+            except Exception:
+                # weave_many checks every message before weaving any, so it
+                # changed nothing: rerun one by one and fail only the bad callers
+                for item in run:
+                    self._execute([item])
+                return
+        else:
+            try:
+                results = [getattr(self.session, method)(*args)]
+            except BaseException as exc:
+                fut.set_exception(exc)
+                return
+        for (_, _, f), result in zip(run, results, strict=True):
+            f.set_result(result)
+
+
+def _context_of(args):
+    return args[1] if len(args) > 1 else 0
+
+
+def _runs(items):
+    """Split queued calls into single calls and runs of coalescible weaves."""
+    run = []
+    for item in items:
+        method, args, _ = item
+        if method == "weave_packet" and len(args[0]):
+            if run and _context_of(run[0][1]) == _context_of(args):
+                run.append(item)
+                continue
+            if run:
+                yield run
+            run = [item]
+            continue
+        if run:
+            yield run
+            run = []
+        yield [item]
+    if run:
+        yield run
@@ -0,0 +1,412 @@
+"""asyncio stream transport for QASWP sessions.
+
+Every message on the socket is ``length (u32) | type (u8) | body``. Handshake
+messages carry the ``client_pass_1``/``server_pass_2``/``client_pass_3`` dicts
+as JSON (bytes values are base64-tagged); data messages carry one woven packet
+serialized with :func:`src.wire.pack_packet`. A client holding a resumption
+ticket (``src/resumption.py``) opens with ``MSG_RESUME`` instead of the
+handshake and follows it with data at once; the server answers with
+``MSG_SERVER_HELLO``.
+
+CPU-heavy steps (QKD in ``server_pass_2``, model inference in
+``weave_packet``) run in an executor so a single event loop can serve
+thousands of concurrent sessions.
+"""
+import asyncio
+import base64
+import inspect
+import json
+import struct
+
+from . import wire
+from .qaswp import QASWPSession
+
+MSG_HELLO = 1
+MSG_SERVER_HELLO = 2
+MSG_FINISH = 3
+MSG_DATA = 4
+MSG_CLOSE = 5
+MSG_RESUME = 6
+
+MAX_FRAME = 1 << 20
+
+_PREFIX = struct.Struct(">IB")
+# client_pass_1 fields that server_pass_2 reads
+_HELLO_BYTES = ("ephemeral_pub_key", "nonce", "model_hash")
+
+
+class ProtocolError(ConnectionError):
+    """Raised when the peer sends a malformed or unexpected message."""
+
+
+def encode_control(obj):
+    """JSON-encode a handshake dict, tagging ``bytes`` values as base64."""
+
+    def _default(value):
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return {"$b": base64.b64encode(bytes(value)).decode()}
+        raise TypeError(f"cannot encode {type(value).__name__}")
+
+    return json.dumps(obj, separators=(",", ":"), default=_default).encode()
+
+
+def decode_control(body):
+    """Inverse of :func:`encode_control`."""
+
+    def _hook(obj):
+        if len(obj) == 1 and "$b" in obj:
+            return base64.b64decode(obj["$b"])
+        return obj
+
+    try:
+        return json.loads(bytes(body).decode(), object_hook=_hook)
+    except (UnicodeDecodeError, ValueError) as exc:
+        raise ProtocolError(f"malformed control message: {exc}") from exc
+
+
+async def read_message(reader):
+    """Read one ``(type, body)`` message; returns ``(None, b"")`` on clean EOF."""
+    try:
+        prefix = await reader.readexactly(_PREFIX.size)
+    except asyncio.IncompleteReadError as exc:
+        if exc.partial:
+            raise ProtocolError("truncated message prefix") from exc
+        return None, b""
+    length, msg_type = _PREFIX.unpack(prefix)
+    if length > MAX_FRAME:
+        raise ProtocolError(f"message of {length} bytes exceeds limit")
+    try:
+        body = await reader.readexactly(length)
+    except asyncio.IncompleteReadError as exc:
+        raise ProtocolError("truncated message body") from exc
+    return msg_type, body
+
+
+def write_message(writer, msg_type, body=b""):
+    writer.write(_PREFIX.pack(len(body), msg_type) + body)
+
+
+def valid_hello(hello):
+    """Return True if ``hello`` has the shape of a ``client_pass_1`` dict."""
+    if not isinstance(hello, dict):
+        return False
+    if not all(isinstance(hello.get(k), bytes) for k in _HELLO_BYTES):
+        return False
+    versions = hello.get("schema_versions", [])
+    return isinstance(versions, list) and all(type(v) is int for v in versions)
+
+
+async def _expect(reader, msg_type):
+    got, body = await read_message(reader)
+    if got != msg_type:
+        raise ProtocolError(f"expected message type {msg_type}, got {got}")
+    return body
+
+
+class QASWPServer:
+    """Serve many concurrent QASWP sessions on one event loop.
+
+    Args:
+        host (str): Interface to bind.
+        port (int): TCP port (0 picks a free one; see :attr:`port`).
+        on_packet (callable, optional): ``on_packet(session, decoded)`` called
+            for every decoded data packet; may be a coroutine function.
+        executor (concurrent.futures.Executor, optional): Where handshakes run;
+            defaults to the loop's default executor.
+        session_factory (callable, optional): Builds server-side sessions;
+            defaults to ``QASWPSession(is_client=False)``.
+        ticket_issuer (TicketIssuer, optional): Issue resumption tickets and
+            accept ``MSG_RESUME`` from returning clients.
+    """
+
+    def __init__(
+        self,
+        host="127.0.0.1",
+        port=0,
+        on_packet=None,
+        executor=None,
+        session_factory=None,
+        ticket_issuer=None,
+    ):
+        self.host = host
+        self.port = port
+        self.on_packet = on_packet
+        self.executor = executor
+        self.session_factory = session_factory or (lambda: QASWPSession(is_client=False))
+        self.ticket_issuer = ticket_issuer
+        self.sessions_active = 0
+        self.sessions_total = 0
+        self.packets_received = 0
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def __aenter__(self):
+        return await self.start()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    async def _handle(self, reader, writer):
+        loop = asyncio.get_running_loop()
+        session = self.session_factory()
+        if self.ticket_issuer is not None:
+            session.ticket_issuer = self.ticket_issuer
+        self.sessions_active += 1
+        self.sessions_total += 1
+        try:
+            msg_type, body = await read_message(reader)
+            if msg_type == MSG_RESUME:
+                # no QKD here, so no executor hop; early data follows in the stream
+                resp = session.resume_pass_2(decode_control(body))
+            elif msg_type == MSG_HELLO:
+                hello = decode_control(body)
+                if valid_hello(hello):
+                    resp = await loop.run_in_executor(self.executor, session.server_pass_2, hello)
+                else:
+                    resp = {"status": "error", "message": "malformed client hello"}
+            else:
+                raise ProtocolError(f"expected message type {MSG_HELLO}, got {msg_type}")
+            write_message(writer, MSG_SERVER_HELLO, encode_control(resp))
+            await writer.drain()
+            if resp.get("status") != "ok":
+                return
+            if msg_type == MSG_HELLO:
+                decode_control(await _expect(reader, MSG_FINISH))
+            while True:
+                msg_type, body = await read_message(reader)
+                if msg_type is None or msg_type == MSG_CLOSE:
+                    return
+                if msg_type != MSG_DATA:
+                    raise ProtocolError(f"unexpected message type {msg_type}")
+                try:
+                    packet = wire.unpack_packet(body)
+                except ValueError:
+                    continue
+                decoded = session.receive_woven_packet(packet)
+                if decoded is None:
+                    continue
+                self.packets_received += 1
+                if self.on_packet is not None:
+                    result = self.on_packet(session, decoded)
+                    if inspect.isawaitable(result):
+                        await result
+        except (ProtocolError, ConnectionError):
+            pass
+        finally:
+            self.sessions_active -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+class QASWPClient:
+    """Client side of a QASWP stream connection.
+
+    Use :func:`connect` (or ``async with await QASWPClient.connect(...)``) to
+    open the socket and run the three-pass handshake, or to resume from a
+    ticket with 0-RTT data (see :meth:`resumed`). When the session's
+    batch policy sets ``max_delay``, a background task polls the session so
+    buffered confirmations never wait longer than the deadline.
+    """
+
+    def __init__(self, reader, writer, session, executor=None):
+        self.reader = reader
+        self.writer = writer
+        self.session = session
+        self.executor = executor
+        self.bytes_sent = 0
+        # serializes session access between send/flush and the deadline poller
+        self._lock = asyncio.Lock()
+        self._poller = None
+        self._resume_reply = None
+
+    @classmethod
+    async def connect(cls, host, port, session=None, executor=None, ticket=None):
+        """Open a connection; with ``ticket`` (a previous ``client.ticket``), resume.
+
+        A resuming client returns before the server has answered, so the
+        first sends travel as early data.
+        """
+        reader, writer = await asyncio.open_connection(host, port)
+        client = cls(reader, writer, session or QASWPSession(is_client=True), executor)
+        try:
+            if ticket is not None:
+                client._resume(ticket)
+            else:
+                await client._handshake()
+        except BaseException:
+            writer.close()
+            raise
+        if client.session.batch_policy.max_delay is not None:
+            client._poller = asyncio.create_task(client._poll_deadlines())
+        return client
+
+    async def _handshake(self):
+        loop = asyncio.get_running_loop()
+        hello = await loop.run_in_executor(self.executor, self.session.client_pass_1)
+        write_message(self.writer, MSG_HELLO, encode_control(hello))
+        await self.writer.drain()
+        resp = decode_control(await _expect(self.reader, MSG_SERVER_HELLO))
+        if resp.get("status") != "ok":
+            raise ConnectionError(f"handshake rejected: {resp.get('message')}")
+        finish = self.session.client_pass_3(resp)
+        write_message(self.writer, MSG_FINISH, encode_control(finish))
+        await self.writer.drain()
+
+    def _resume(self, ticket):
+        hello = self.session.resume_pass_1(ticket)
+        write_message(self.writer, MSG_RESUME, encode_control(hello))
+        self._resume_reply = asyncio.create_task(self._read_resume_reply())
+
+    async def _read_resume_reply(self):
+        resp = decode_control(await _expect(self.reader, MSG_SERVER_HELLO))
+        if not self.session.resume_pass_3(resp):
+            raise ConnectionError(f"resumption rejected: {resp.get('message')}")
+        return True
+
+    async def resumed(self):
+        """Wait for the server to accept a resumption.
+
+        Returns True for a resumed connection (False if it ran the full
+        handshake); raises ``ConnectionError`` if the server rejected the
+        ticket, in which case the early data was dropped.
+        """
+        if self._resume_reply is None:
+            return False
+        return await self._resume_reply
+
+    @property
+    def ticket(self):
+        """Latest resumption ticket for :meth:`connect`, or None."""
+        return self.session.ticket
+
+    async def _poll_deadlines(self):
+        interval = self.session.batch_policy.max_delay / 2
+        try:
+            while True:
+                await asyncio.sleep(interval)
+                async with self._lock:
+                    packets = self.session.poll()
+                    for packet in packets:
+                        self._write_packet(packet)
+                    if packets:
+                        await self.writer.drain()
+        except ConnectionError:
+            pass
+
+    def _write_packet(self, packet):
+        if packet and "packets" in packet:
+            for part in packet["packets"]:
+                self._write_packet(part)
+        elif packet and packet.get("flushed"):
+            body = wire.pack_packet(packet)
+            write_message(self.writer, MSG_DATA, body)
+            self.bytes_sent += len(body)
+
+    async def send(self, tokens, context_id=0):
+        """Weave one token sequence; writes a packet only when one is flushed."""
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            packet = await loop.run_in_executor(
+                self.executor, self.session.weave_packet, tokens, context_id
+            )
+            self._write_packet(packet)
+            await self.writer.drain()
+        return packet
+
+    async def send_many(self, token_sequences, context_id=0):
+        """Weave a list of messages with one batched forward pass."""
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            packets = await loop.run_in_executor(
+                self.executor, self.session.weave_many, token_sequences, context_id
+            )
+            for packet in packets:
+                self._write_packet(packet)
+            await self.writer.drain()
+        return packets
+
+    async def send_tokens(self, tokens, context_id=0):
+        """Send tokens on a reconstructable stream (see ``QASWPSession.send_tokens``)."""
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            packets = await loop.run_in_executor(
+                self.executor, self.session.send_tokens, tokens, context_id
+            )
+            for packet in packets:
+                self._write_packet(packet)
+            await self.writer.drain()
+        return packets
+
+    async def send_coded(self, tokens, context_id=0):
+        """Send ``tokens`` as one arithmetic-coded frame."""
+        loop = asyncio.get_running_loop()
+        async with self._lock:
+            packet = await loop.run_in_executor(
+                self.executor, self.session.weave_coded, tokens, context_id
+            )
+            self._write_packet(packet)
+            await self.writer.drain()
+        return packet
+
+    async def flush(self, context_id=None):
+        """Send buffered confirmations for one context, or for all if ``None``."""
+        async with self._lock:
+            if context_id is None:
+                packets = self.session.flush_all()
+            else:
+                packets = [p for p in (self.session.flush(context_id),) if p is not None]
+            for packet in packets:
+                self._write_packet(packet)
+            await self.writer.drain()
+        return packets
+
+    async def close(self):
+        """Flush pending confirmations, say goodbye and close the socket."""
+        if self._poller is not None:
+            self._poller.cancel()
+            try:
+                await self._poller
+            except asyncio.CancelledError:
+                pass
+            self._poller = None
+        try:
+            await self.flush()
+            write_message(self.writer, MSG_CLOSE)
+            await self.writer.drain()
+        except ConnectionError:
+            pass
+        if self._resume_reply is not None:
+            # collect the server's answer (and the fresh ticket it carries)
+            try:
+                await self._resume_reply
+            except ConnectionError:
+                pass
+        self.writer.close()
+        try:
+            await self.writer.wait_closed()
+        except ConnectionError:
+            pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
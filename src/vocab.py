@@ -0,0 +1,15 @@
+"""Token vocabulary shared by every inference backend."""
+
+# A simple vocabulary for demonstration purposes (e.g., HTTP requests)
+VOCAB = {
+    "<pad>": 0,
+    "GET": 1,
+    "POST": 2,
+    "/api/v1/profile": 3,
+    "/api/v1/data": 4,
+    "HTTP/1.1": 5,
+    "Host:": 6,
+    "example.com": 7,
+}
+VOCAB_SIZE = len(VOCAB)
+REV_VOCAB = {v: k for k, v in VOCAB.items()}
@@ -0,0 +1,204 @@
+"""Content-addressed model weight files, loaded with ``mmap``.
+
+Layout (all offsets from the start of the file)::
+
+    | magic "QASWPWT1" (8) | header length (u32 BE) | header JSON | pad |
+    | tensor block (64-byte aligned) | pad | tensor block | ...       |
+
+The header lists every tensor's name, dtype, shape, offset and leaf digest
+(:func:`~src.fingerprint.leaf_digest`), the model config, and the Merkle
+root over the leaves. That root is the file's content hash and equals
+``TinyLLM.get_model_diff_hash()`` of the saved model, so it doubles as the
+model ID advertised in ``client_pass_1``.
+
+Tensors are mapped copy-on-write: processes loading the same file share
+one page-cache copy of the weights, and nothing is read until first use.
+"""
+import json
+import mmap
+import os
+import struct
+
+import numpy as np
+
+from .fingerprint import ModelFingerprint, leaf_digest, state_version
+
+MAGIC = b"QASWPWT1"
+FORMAT_VERSION = 1
+ALIGN = 64
+
+_HEADER_LEN = struct.Struct(">I")
+
+
+def _pad(n):
+    return -n % ALIGN
+
+
+def _model_config(model):
+    layer = model.transformer_encoder.layers[0]
+    return {
+        "vocab_size": model.embedding.num_embeddings,
+        "embed_dim": model.embedding.embedding_dim,
+        "num_heads": layer.self_attn.num_heads,
+        "hidden_dim": layer.linear1.out_features,
+    }
+
+
+def save(model, path):
+    """Write a ``TinyLLM``'s parameters and buffers to ``path`` atomically.
+
+    Returns:
+        bytes: The file's content hash (the model's fingerprint root).
+    """
+    arrays = {
+        name: t.detach().cpu().contiguous().numpy()
+        for name, t in (*model.named_parameters(), *model.named_buffers())
+    }
+    return save_arrays(arrays, path, _model_config(model))
+
+
+def save_arrays(arrays, path, config):
+    """Write ``name -> ndarray`` tensors plus a model ``config`` dict to ``path``."""
+    entries, offset = [], 0
+    for name in sorted(arrays):
+        a = np.ascontiguousarray(arrays[name])
+        offset += _pad(offset)
+        entries.append(
+            {
+                "name": name,
+                "dtype": str(a.dtype),
+                "shape": list(a.shape),
+                "offset": offset,
+                "nbytes": a.nbytes,
+                "digest": leaf_digest(name, str(a.dtype), a.shape, a).hex(),
+            }
+        )
+        offset += a.nbytes
+    fingerprint = ModelFingerprint({e["name"]: bytes.fromhex(e["digest"]) for e in entries})
+    header = {
+        "format": FORMAT_VERSION,
+        "config": config,
+        "root": fingerprint.root.hex(),
+        "tensors": entries,
+    }
+    raw = json.dumps(header, separators=(",", ":"), sort_keys=True).encode()
+    prefix = MAGIC + _HEADER_LEN.pack(len(raw)) + raw
+    data_start = len(prefix) + _pad(len(prefix))
+
+    tmp = f"{path}.tmp{os.getpid()}"
+    with open(tmp, "wb") as fh:
+        fh.write(prefix + bytes(data_start - len(prefix)))
+        for e in entries:
+            fh.seek(data_start + e["offset"])
+            fh.write(np.ascontiguousarray(arrays[e["name"]]).tobytes())
+    os.replace(tmp, path)
+    return fingerprint.root
+
+
+class WeightFile:
+    """An open, memory-mapped weight file.
+
+    Args:
+        path: File to map.
+        verify (bool): Re-hash every tensor against the header digests and
+            the header root. Reads every page once; skip it for trusted files.
+
+    Raises:
+        ValueError: On a bad magic, unsupported version, truncated file or
+            (with ``verify``) any digest mismatch.
+    """
+
+    def __init__(self, path, verify=True):
+        self.path = os.fspath(path)
+        with open(self.path, "rb") as fh:
+            # ACCESS_COPY: shared read-only pages, private on (unexpected) write
+            self._mmap = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_COPY)
+        mm = self._mmap
+        fixed = len(MAGIC) + _HEADER_LEN.size
+        if len(mm) < fixed or mm[: len(MAGIC)] != MAGIC:
+            raise ValueError(f"{self.path}: not a QASWP weight file")
+        (header_len,) = _HEADER_LEN.unpack_from(mm, len(MAGIC))
+        if len(mm) < fixed + header_len:
+            raise ValueError(f"{self.path}: truncated header")
+        header = json.loads(mm[fixed : fixed + header_len])
+        if header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"{self.path}: unsupported format {header.get('format')!r}")
+        self.header = header
+        self.config = header["config"]
+        self.data_start = fixed + header_len + _pad(fixed + header_len)
+        self.tensors = {e["name"]: e for e in header["tensors"]}
+        for e in header["tensors"]:
+            if self.data_start + e["offset"] + e["nbytes"] > len(mm):
+                raise ValueError(f"{self.path}: tensor {e['name']!r} runs past end of file")
+        self.fingerprint = ModelFingerprint(
+            {name: bytes.fromhex(e["digest"]) for name, e in self.tensors.items()}
+        )
+        if self.fingerprint.root.hex() != header["root"]:
+            raise ValueError(f"{self.path}: header root does not match tensor digests")
+        if verify:
+            self.verify()
+
+    @property
+    def content_hash(self):
+        """The Merkle root over all tensors (bytes); also the model ID."""
+        return self.fingerprint.root
+
+    def array(self, name):
+        """Zero-copy NumPy view of one tensor."""
+        e = self.tensors[name]
+        count = int(np.prod(e["shape"], dtype=np.int64))
+        a = np.frombuffer(self._mmap, e["dtype"], count, self.data_start + e["offset"])
+        return a.reshape(e["shape"])
+
+    def arrays(self):
+        return {name: self.array(name) for name in self.tensors}
+
+    def verify(self):
+        """Re-hash every tensor; raises ValueError on the first mismatch."""
+        for name, e in self.tensors.items():
+            a = self.array(name)
+            if leaf_digest(name, e["dtype"], a.shape, a).hex() != e["digest"]:
+                raise ValueError(f"{self.path}: tensor {name!r} does not match its digest")
+
+    def to_torch(self):
+        """Build a frozen ``TinyLLM`` whose parameters live in the mapping."""
+        import torch
+
+        from .neural import TinyLLM
+        from .registry import freeze_model
+
+        state = {}
+        for name, e in self.tensors.items():
+            count = int(np.prod(e["shape"], dtype=np.int64))
+            t = torch.frombuffer(
+                self._mmap,
+                dtype=getattr(torch, e["dtype"]),
+                count=count,
+                offset=self.data_start + e["offset"],
+            )
+            state[name] = t.view(e["shape"])
+        # meta placeholders allocate nothing; assign=True swaps in the mapped tensors
+        model = TinyLLM(**self.config, device="meta")
+        model.load_state_dict(state, assign=True)
+        freeze_model(model)
+        # the header already holds the fingerprint; skip re-hashing the weights
+        model._fingerprint_cache = (state_version(model), self.fingerprint)
+        return model
+
+    def to_numpy(self, quantize=False):
+        """Build a torch-free ``NumpyTinyLLM`` from the mapped arrays."""
+        from .neural_np import NumpyTinyLLM
+
+        weights = self.arrays()
+        weights["__num_heads__"] = np.array(self.config["num_heads"])
+        return NumpyTinyLLM(weights, quantize)
+
+
+def load(path, backend="torch", verify=True):
+    """Load a model from a weight file with the ``torch`` or ``numpy`` backend."""
+    wf = WeightFile(path, verify=verify)
+    if backend == "torch":
+        return wf.to_torch()
+    if backend == "numpy":
+        return wf.to_numpy()
+    raise ValueError(f"unknown backend {backend!r}")
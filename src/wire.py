@@ -0,0 +1,229 @@
+"""Binary frame codec for woven packets (IETF-DRAFT §5.2).
+
+Frame header (8 bytes, big-endian), authenticated as AEAD associated data::
+
+    | Seq (32) | Flags (8) | Context ID (8) | Ciphertext Length (16) |
+
+The encrypted body starts with a one-byte frame kind followed by the
+kind-specific fields. ``schema_version`` 1 is the legacy JSON body and
+``schema_version`` 2 is this binary layout; peers negotiate the highest
+common version during the handshake.
+"""
+import operator
+import struct
+
+import numpy as np
+
+SCHEMA_JSON = 1
+SCHEMA_BINARY = 2
+SUPPORTED_SCHEMAS = (SCHEMA_JSON, SCHEMA_BINARY)
+
+FLAG_CONTEXT_RESET = 0x01
+FLAG_PROOF_ATTACHED = 0x02
+FLAG_ACK_REQUIRED = 0x04
+# low bit of the sender's key epoch (src/aead.py); flips on every key update
+FLAG_KEY_PHASE = 0x08
+# frame belongs to a reconstructable stream (send_tokens / weave_coded)
+FLAG_STREAM = 0x10
+
+KIND_BATCH = 1
+KIND_DELTA = 2
+KIND_CODED = 3
+
+TAG_LEN = 16
+SEQ_MASK = 0xFFFFFFFF
+
+HEADER = struct.Struct(">IBBH")
+HEADER_LEN = HEADER.size
+HEADER_DTYPE = np.dtype([("seq", ">u4"), ("flags", "u1"), ("ctx", "u1"), ("length", ">u2")])
+
+_BATCH = struct.Struct(">BH")
+_DELTA = struct.Struct(">BI")
+_COUNT = struct.Struct(">I")
+_LEN8 = struct.Struct(">B")
+
+
+def check_tokens(tokens):
+    """Validate token IDs for a frame body (a delta carries one as a u32).
+
+    Raises:
+        ValueError: If any token is not an integer in ``0..2**32-1``.
+    """
+    for token in tokens:
+        try:
+            ok = 0 <= operator.index(token) <= 0xFFFFFFFF
+        except TypeError:
+            ok = False
+        if not ok:
+            raise ValueError(f"token ids must be integers in 0..2**32-1, got {token!r}")
+
+
+def negotiate_schema(offered, supported=SUPPORTED_SCHEMAS):
+    """Return the highest schema version present in both lists (JSON if none)."""
+    common = set(offered or ()) & set(supported)
+    return max(common) if common else SCHEMA_JSON
+
+
+def pack_header(seq, flags, ctx, length):
+    """Pack a single frame header."""
+    return HEADER.pack(seq & SEQ_MASK, flags, ctx, length)
+
+
+def unpack_header(header):
+    """Unpack a frame header into ``(seq, flags, ctx, length)``.
+
+    Raises:
+        ValueError: If ``header`` is not exactly ``HEADER_LEN`` bytes.
+    """
+    if len(header) != HEADER_LEN:
+        raise ValueError(f"frame header must be {HEADER_LEN} bytes, got {len(header)}")
+    return HEADER.unpack(header)
+
+
+def encode_body(payload):
+    """Encode a ``batch``/``delta``/``coded`` payload dict into a binary frame body.
+
+    The sequence number travels in the header, so it is not repeated here.
+    """
+    kind = payload["t"]
+    if kind == "batch":
+        count = payload["count"]
+        nbytes = (count + 7) // 8
+        return _BATCH.pack(KIND_BATCH, count) + payload["bits"].to_bytes(nbytes, "big")
+    if kind == "delta":
+        return _DELTA.pack(KIND_DELTA, payload["need"])
+    if kind == "coded":
+        # arithmetic-coded tokens (src/entropy.py): token count + coder bytes
+        return _BATCH.pack(KIND_CODED, payload["count"]) + payload["data"]
+    raise ValueError(f"unknown frame kind: {kind!r}")
+
+
+def decode_body(body, seq):
+    """Decode a binary frame body back into the payload dict shape.
+
+    Raises:
+        ValueError: If the body is truncated or of an unknown kind.
+    """
+    if not body:
+        raise ValueError("empty frame body")
+    kind = body[0]
+    if kind == KIND_BATCH:
+        if len(body) < _BATCH.size:
+            raise ValueError("truncated batch frame")
+        _, count = _BATCH.unpack_from(body)
+        bits_raw = body[_BATCH.size :]
+        if len(bits_raw) != (count + 7) // 8:
+            raise ValueError("batch bitmap length does not match count")
+        return {"t": "batch", "seq": seq, "count": count, "bits": int.from_bytes(bits_raw, "big")}
+    if kind == KIND_DELTA:
+        if len(body) != _DELTA.size:
+            raise ValueError("malformed delta frame")
+        _, need = _DELTA.unpack(body)
+        return {"t": "delta", "seq": seq, "need": need}
+    if kind == KIND_CODED:
+        if len(body) < _BATCH.size:
+            raise ValueError("truncated coded frame")
+        _, count = _BATCH.unpack_from(body)
+        return {"t": "coded", "seq": seq, "count": count, "data": bytes(body[_BATCH.size :])}
+    raise ValueError(f"unknown frame kind: {kind}")
+
+
+def encode_frame_vector(headers, payloads):
+    """Serialize many frames into one buffer.
+
+    Layout: ``count (u32) | count * header | payloads...``. Headers are packed
+    in a single NumPy structured-array write, so the per-frame cost is just
+    the payload concatenation.
+
+    Args:
+        headers: Sequence of ``(seq, flags, ctx)`` tuples, one per frame.
+        payloads: Sequence of ciphertexts, one per frame.
+
+    Returns:
+        bytes: The serialized frame vector.
+    """
+    if len(headers) != len(payloads):
+        raise ValueError("headers and payloads must have the same length")
+    n = len(payloads)
+    table = np.zeros(n, dtype=HEADER_DTYPE)
+    if n:
+        cols = np.asarray(headers, dtype=np.int64).reshape(n, 3)
+        table["seq"] = cols[:, 0] & SEQ_MASK
+        table["flags"] = cols[:, 1]
+        table["ctx"] = cols[:, 2]
+        lengths = np.fromiter((len(p) for p in payloads), dtype=np.int64, count=n)
+        if (lengths > 0xFFFF).any():
+            raise ValueError("frame payload exceeds 16-bit length field")
+        table["length"] = lengths
+    return _COUNT.pack(n) + table.tobytes() + b"".join(payloads)
+
+
+def decode_frame_vector(buf):
+    """Parse a buffer produced by :func:`encode_frame_vector`.
+
+    Returns:
+        tuple: ``(headers, payloads)`` where ``headers`` is a structured array
+        with ``seq``/``flags``/``ctx``/``length`` fields and ``payloads`` is a
+        list of zero-copy ``memoryview`` slices into ``buf``.
+
+    Raises:
+        ValueError: If the buffer is truncated or lengths are inconsistent.
+    """
+    view = memoryview(buf)
+    if len(view) < _COUNT.size:
+        raise ValueError("truncated frame vector")
+    (n,) = _COUNT.unpack_from(view)
+    start = _COUNT.size + n * HEADER_LEN
+    if len(view) < start:
+        raise ValueError("truncated frame vector headers")
+    headers = np.frombuffer(view[_COUNT.size : start], dtype=HEADER_DTYPE)
+    ends = start + np.cumsum(headers["length"], dtype=np.int64)
+    if n and ends[-1] != len(view):
+        raise ValueError("frame vector payload lengths do not match buffer size")
+    if not n and len(view) != start:
+        raise ValueError("trailing bytes after empty frame vector")
+    begins = np.concatenate(([start], ends[:-1])) if n else ends
+    payloads = [view[b:e] for b, e in zip(begins.tolist(), ends.tolist(), strict=True)]
+    return headers, payloads
+
+
+def pack_packet(packet):
+    """Serialize a woven packet dict for a byte-stream transport.
+
+    Layout: ``nonce_len (u8) | nonce | header_len (u8) | header | ciphertext``.
+    """
+    nonce = packet["nonce"]
+    header = packet.get("header") or b""
+    return b"".join(
+        (
+            _LEN8.pack(len(nonce)),
+            nonce,
+            _LEN8.pack(len(header)),
+            header,
+            packet["encrypted_payload"],
+        )
+    )
+
+
+def unpack_packet(buf):
+    """Inverse of :func:`pack_packet`; returns a flushed packet dict.
+
+    Raises:
+        ValueError: If ``buf`` is truncated.
+    """
+    view = memoryview(buf)
+    if len(view) < 1:
+        raise ValueError("truncated packet")
+    nonce_end = 1 + view[0]
+    if len(view) < nonce_end + 1:
+        raise ValueError("truncated packet nonce")
+    header_end = nonce_end + 1 + view[nonce_end]
+    if len(view) < header_end:
+        raise ValueError("truncated packet header")
+    return {
+        "nonce": bytes(view[1:nonce_end]),
+        "header": bytes(view[nonce_end + 1 : header_end]),
+        "encrypted_payload": bytes(view[header_end:]),
+        "wire_len": len(view),
+        "flushed": True,
+    }
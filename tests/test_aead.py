@@ -0,0 +1,58 @@
+from src.aead import CLIENT_PREFIX, ReplayWindow, SessionCipher
+from src.qaswp import VOCAB, QASWPSession
+
+
+def _handshake():
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False)
+    resp = srv.server_pass_2(cli.client_pass_1())
+    assert resp["status"] == "ok"
+    assert cli.client_pass_3(resp)["status"] == "ok"
+    return cli, srv
+
+
+def test_replay_window_sliding_bitmap():
+    w = ReplayWindow(size=8)
+    assert w.accept(5)
+    assert not w.accept(5)
+    assert w.accept(3)  # out of order, still inside the window
+    assert w.accept(20)
+    assert not w.accept(12)  # fell off the left edge
+    assert w.accept(13)
+    assert not w.accept(13)
+
+
+def test_counter_nonces_are_unique_per_direction():
+    key = b"k" * 32
+    cli = SessionCipher(key, is_client=True)
+    srv = SessionCipher(key, is_client=False)
+    nonces = [cli.next_nonce() for _ in range(3)] + [srv.next_nonce() for _ in range(3)]
+    assert len(set(nonces)) == 6
+    assert nonces[0] == CLIENT_PREFIX + bytes(8)
+
+
+def test_session_reuses_cipher_and_rejects_replays():
+    cli, srv = _handshake()
+    cipher = cli._cipher
+    packets = []
+    for _ in range(3):
+        cli.weave_packet([VOCAB["GET"], VOCAB["/api/v1/profile"]])
+        packets.append(cli.flush())
+    assert cli._cipher is cipher
+    assert len({p["nonce"] for p in packets}) == 3
+
+    # Delivery out of order is fine; a second delivery of any packet is not.
+    assert srv.receive_woven_packet(packets[1])["seq"] == 1
+    assert srv.receive_woven_packet(packets[0])["seq"] == 0
+    assert srv.receive_woven_packet(packets[1]) is None
+    assert srv.receive_woven_packet(packets[2])["seq"] == 2
+    assert srv.receive_woven_packet(packets[2]) is None
+
+
+def test_reflected_frames_are_dropped():
+    cli, srv = _handshake()
+    cli.weave_packet([VOCAB["GET"], VOCAB["/api/v1/profile"]])
+    packet = cli.flush()
+    # both directions share the epoch-0 key, so only the prefix tells them apart
+    assert cli.receive_woven_packet(packet) is None
+    assert srv.receive_woven_packet(packet)["seq"] == 0
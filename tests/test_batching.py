@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from src.batching import BatchPolicy
+from src.qaswp import VOCAB, QASWPSession
+from src.transport import QASWPClient, QASWPServer
+
+MSG = [VOCAB["GET"], VOCAB["/api/v1/profile"]]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _handshake(policy=None):
+    cli = QASWPSession(is_client=True, batch_policy=policy)
+    srv = QASWPSession(is_client=False)
+    resp = srv.server_pass_2(cli.client_pass_1())
+    cli.client_pass_3(resp)
+    return cli, srv
+
+
+def test_policy_validation():
+    with pytest.raises(ValueError):
+        BatchPolicy(max_batch=1 << 16)
+    with pytest.raises(ValueError):
+        BatchPolicy(max_delay=0)
+    assert not BatchPolicy().timed
+
+
+def test_batches_of_thousands_roundtrip():
+    cli, srv = _handshake(BatchPolicy(batch_size=5000))
+    packets = [cli.weave_packet(MSG) for _ in range(5000)]
+    assert not any(p["flushed"] for p in packets[:-1])
+    decoded = srv.receive_woven_packet(packets[-1])
+    assert decoded["count"] == 5000
+    assert decoded["bits"] == (1 << 5000) - 1
+    assert packets[-1]["wire_len"] == 625
+
+
+def test_deadline_flushes_on_next_weave_and_on_poll():
+    clock = FakeClock()
+    cli, srv = _handshake(BatchPolicy(max_delay=0.05, clock=clock))
+    assert not cli.weave_packet(MSG)["flushed"]
+    assert cli.poll() == []
+    clock.now = 0.06
+    pkt = cli.weave_packet(MSG)
+    assert srv.receive_woven_packet(pkt)["count"] == 2
+
+    cli.weave_packet(MSG, context_id=3)
+    clock.now = 0.2
+    (pkt,) = cli.poll()
+    assert srv.receive_woven_packet(pkt) == {
+        "t": "batch",
+        "seq": 0,
+        "count": 1,
+        "bits": 1,
+        "ctx": 3,
+    }
+    assert cli.poll() == []
+
+
+def test_adaptive_size_follows_hit_rate_and_send_rate():
+    clock = FakeClock()
+    policy = BatchPolicy(batch_size=16, adaptive=True, max_delay=1.0, max_batch=256, clock=clock)
+    cli, _ = _handshake(policy)
+    ctx = cli.context()
+    sizes = []
+    for _ in range(300):
+        clock.now += 0.001
+        if cli.weave_packet(MSG)["flushed"]:
+            sizes.append(ctx.batch_limit)
+    assert sizes[:3] == [32, 64, 128]
+    assert ctx.batch_limit == 256
+
+    # a slow sender is capped by what can arrive within the deadline
+    for _ in range(40):
+        clock.now += 0.1
+        cli.weave_packet(MSG)
+    assert ctx.batch_limit <= 10
+
+    # poor predictions shrink the batch
+    cli.flush()
+    cli.weave_packet(MSG)
+    ctx.hit_rate, ctx.send_rate = 0.2, 0.0
+    before = ctx.batch_limit
+    cli.flush()
+    assert ctx.batch_limit == max(policy.min_batch, before // 2)
+
+
+def test_deadline_cap_overrides_min_batch():
+    policy = BatchPolicy(adaptive=True, min_batch=32, max_delay=0.1)
+    ctx = QASWPSession(is_client=True).context()
+    ctx.batch_limit, ctx.hit_rate, ctx.send_rate = 64, 1.0, 50.0
+    # five confirmations arrive per deadline, so a batch of 32 would never fill
+    assert policy.next_limit(ctx) == 5
+    ctx.send_rate = 1000.0
+    assert policy.next_limit(ctx) == 100
+
+
+def test_client_poller_enforces_deadline():
+    received = []
+
+    async def main():
+        async with QASWPServer(on_packet=lambda s, d: received.append(d)) as server:
+            session = QASWPSession(is_client=True, batch_policy=BatchPolicy(max_delay=0.02))
+            async with await QASWPClient.connect("127.0.0.1", server.port, session=session) as c:
+                await c.send(MSG)
+                for _ in range(100):
+                    if received:
+                        break
+                    await asyncio.sleep(0.01)
+                assert received and received[0]["count"] == 1
+
+    asyncio.run(main())
@@ -0,0 +1,44 @@
+import copy
+import json
+
+from benchmarks.suite import compare, main, run_suite
+
+
+def _results(**values):
+    better = {"lat": "lower", "tput": "higher"}
+    return {
+        "meta": {},
+        "metrics": {k: {"value": v, "unit": "x", "better": better[k]} for k, v in values.items()},
+    }
+
+
+def test_compare_respects_metric_direction():
+    base = _results(lat=100.0, tput=1000.0)
+    rows = {r[0]: r for r in compare(_results(lat=115.0, tput=1150.0), base, 0.10)}
+    assert rows["lat"][4] and not rows["tput"][4]
+    rows = {r[0]: r for r in compare(_results(lat=85.0, tput=850.0), base, 0.10)}
+    assert not rows["lat"][4] and rows["tput"][4]
+    # metrics only on one side are listed but never fail
+    rows = compare(_results(tput=1000.0), _results(lat=1.0), 0.10)
+    assert [(r[0], r[3], r[4]) for r in rows] == [("lat", None, False), ("tput", None, False)]
+
+
+def test_suite_writes_json_and_gates_on_baseline(tmp_path, capsys):
+    results = run_suite(["bb84", "session_memory"], quick=True)
+    metric = results["metrics"]["bb84.keys_per_s_1024"]
+    assert metric["better"] == "higher" and metric["value"] > 0
+    assert results["metrics"]["session_memory.bytes_per_session"]["value"] > 0
+    # torch KV-cache storage is invisible to tracemalloc and counted separately
+    assert results["metrics"]["session_memory.kv_bytes_per_session"]["value"] > 0
+
+    out = tmp_path / "now.json"
+    assert main(["--only", "bb84", "--quick", "--json", str(out)]) == 0
+    saved = json.loads(out.read_text())
+    assert set(saved["metrics"]) == {m for m in results["metrics"] if m.startswith("bb84.")}
+
+    fast = copy.deepcopy(saved)
+    for m in fast["metrics"].values():
+        m["value"] *= 10  # a baseline ten times faster than anything we can reach
+    (tmp_path / "fast.json").write_text(json.dumps(fast))
+    assert main(["--only", "bb84", "--quick", "--baseline", str(tmp_path / "fast.json")]) == 1
+    assert "REGRESSION" in capsys.readouterr().out
@@ -0,0 +1,50 @@
+import pytest
+
+from src import wire
+from src.qaswp import VOCAB, QASWPSession
+
+
+def _handshake():
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False)
+    resp = srv.server_pass_2(cli.client_pass_1())
+    assert resp["status"] == "ok"
+    assert cli.client_pass_3(resp)["status"] == "ok"
+    return cli, srv
+
+
+def test_interleaved_contexts_keep_independent_state():
+    cli, srv = _handshake()
+    msg = [VOCAB["GET"], VOCAB["/api/v1/profile"]]
+    received = []
+    for i in range(200):
+        pkt = cli.weave_packet(msg, context_id=i % 3)
+        if pkt["flushed"]:
+            received.append(srv.receive_woven_packet(pkt))
+    received.extend(srv.receive_woven_packet(p) for p in cli.flush_all())
+
+    by_ctx = {}
+    for frame in received:
+        by_ctx.setdefault(frame["ctx"], []).append((frame["seq"], frame["count"]))
+    # 67/67/66 messages: one full batch of 64 plus a trailing flush per stream
+    assert by_ctx == {0: [(0, 64), (64, 3)], 1: [(0, 64), (64, 3)], 2: [(0, 64), (64, 2)]}
+    assert [srv.context(c).rx_seq for c in range(3)] == [67, 67, 66]
+    assert cli.context(1).kv_cache is not cli.context(2).kv_cache
+    assert cli.flush_all() == []
+
+
+def test_context_id_is_authenticated():
+    cli, srv = _handshake()
+    cli.weave_packet([VOCAB["POST"]], context_id=7)
+    pkt = cli.flush(7)
+    seq, flags, ctx, length = wire.unpack_header(pkt["header"])
+    assert ctx == 7
+    forged = dict(pkt, header=wire.pack_header(seq, flags, 8, length))
+    assert srv.receive_woven_packet(forged) is None
+    assert srv.receive_woven_packet(pkt)["ctx"] == 7
+
+
+def test_context_id_range_is_checked():
+    cli, _ = _handshake()
+    with pytest.raises(ValueError):
+        cli.weave_packet([VOCAB["GET"]], context_id=256)
@@ -0,0 +1,127 @@
+import random
+
+import pytest
+import torch
+
+from src import wire
+from src.entropy import (
+    FREQ_TOTAL,
+    ArithmeticDecoder,
+    ArithmeticEncoder,
+    TokenCoder,
+    quantize,
+)
+from src.neural import VOCAB, VOCAB_SIZE, TinyLLM
+from src.qaswp import QASWPSession
+
+
+def _handshake():
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    return cli, srv
+
+
+def test_quantize_keeps_every_symbol_possible():
+    cum = quantize([1.0, 0.0, 1e-12, 0.5])
+    freqs = [b - a for a, b in zip(cum[:-1], cum[1:], strict=True)]
+    assert cum[0] == 0 and cum[-1] == FREQ_TOTAL
+    assert min(freqs) >= 1
+    assert freqs[0] > freqs[3] > freqs[1]
+
+
+def test_coder_roundtrip_on_random_tables():
+    rng = random.Random(7)
+    for _ in range(50):
+        n = rng.randint(2, 40)
+        tables, symbols = [], []
+        for _ in range(rng.randint(0, 200)):
+            p = [rng.random() ** rng.choice([1, 8]) for _ in range(n)]
+            tables.append(quantize(p))
+            symbols.append(rng.randrange(n))
+        enc = ArithmeticEncoder()
+        for cum, sym in zip(tables, symbols, strict=True):
+            enc.encode(cum, sym)
+        dec = ArithmeticDecoder(enc.finish())
+        assert [dec.decode(cum) for cum in tables] == symbols
+
+
+def test_confident_model_codes_tokens_in_a_fraction_of_a_bit():
+    torch.manual_seed(0)
+    model = TinyLLM()
+    with torch.no_grad():
+        model.output_layer.bias[VOCAB["HTTP/1.1"]] = 30.0
+    tokens = [VOCAB["HTTP/1.1"]] * 1000
+    data = TokenCoder(model).encode(tokens)
+    assert len(data) * 8 < 0.05 * len(tokens)
+    assert TokenCoder(model).decode(data, len(tokens)) == tokens
+
+    # an unlikely token still round-trips and costs bits, not a frame
+    surprise = TokenCoder(model).encode([VOCAB["GET"]])
+    assert 1 < len(surprise) <= 4
+
+
+def test_coded_frames_over_session():
+    cli, srv = _handshake()
+    rng = random.Random(3)
+    sent, received = [], []
+    for _ in range(5):
+        tokens = [rng.randrange(1, VOCAB_SIZE) for _ in range(rng.randint(1, 40))]
+        sent.extend(tokens)
+        frame = srv.receive_woven_packet(cli.weave_coded(tokens, context_id=2))
+        assert frame["t"] == "coded" and frame["ctx"] == 2
+        received.extend(srv.decode_coded(frame))
+    assert received == sent
+    assert cli.context(2).seq == srv.context(2).rx_seq == len(sent)
+
+
+def test_coded_frame_flushes_pending_batch_first():
+    cli, srv = _handshake()
+    cli.weave_packet([VOCAB["GET"], VOCAB["/api/v1/profile"]])
+    packet = cli.weave_coded([VOCAB["GET"]])
+    batch, coded = (srv.receive_woven_packet(p) for p in packet["packets"])
+    assert (batch["t"], batch["seq"]) == ("batch", 0)
+    assert (coded["t"], coded["seq"]) == ("coded", 1)
+
+
+def test_coded_frames_need_binary_schema():
+    cli = QASWPSession(is_client=True, schema_version=wire.SCHEMA_JSON)
+    srv = QASWPSession(is_client=False)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    with pytest.raises(ValueError):
+        cli.weave_coded([VOCAB["GET"]])
+
+
+def test_cache_logits_do_not_depend_on_chunking():
+    model = TinyLLM()
+    rng = random.Random(11)
+    history = [rng.randrange(1, VOCAB_SIZE) for _ in range(120)]
+    full = model.new_kv_cache()
+    whole = model.next_token_logits_cached(history, full)
+    cache = model.new_kv_cache()
+    n = 0
+    while n < len(history):
+        n += rng.randint(1, 9)
+        stepped = model.next_token_logits_cached(history[:n], cache)
+    assert torch.equal(cache.keys, full.keys) and torch.equal(cache.values, full.values)
+    assert torch.equal(stepped, whole)
+
+
+def test_interleaved_deltas_and_coded_frames_reconstruct():
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False, reconstruct=True)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    rng = random.Random(20)
+    sent = []
+    while len(sent) < 300:
+        tokens = [rng.randrange(1, VOCAB_SIZE) for _ in range(rng.randint(1, 10))]
+        sent.extend(tokens)
+        # send_tokens only pushes deltas into the receiver's cache, coded frames
+        # extend it in one call: both must leave the tables in step
+        packets = cli.send_tokens(tokens) if rng.random() < 0.5 else [cli.weave_coded(tokens)]
+        for packet in packets:
+            for frame in packet.get("packets", [packet]):
+                srv.receive_woven_packet(frame)
+    for packet in cli.flush_all():
+        srv.receive_woven_packet(packet)
+    assert list(srv.stream()) == sent
@@ -0,0 +1,39 @@
+import torch
+
+from src.fingerprint import ModelFingerprint, merkle_root
+from src.neural import TinyLLM
+
+
+def test_fingerprint_is_cached_until_parameters_change():
+    model = TinyLLM()
+    first = model.get_model_fingerprint()
+    assert model.get_model_fingerprint() is first
+    assert model.get_model_diff_hash() == first.root
+
+    with torch.no_grad():
+        model.output_layer.bias.add_(1.0)
+    second = model.get_model_fingerprint()
+    assert second is not first
+    assert second.diff(first) == ["output_layer.bias"]
+
+
+def test_fingerprint_covers_full_tensor_contents():
+    torch.manual_seed(0)
+    a = TinyLLM()
+    b = TinyLLM()
+    b.load_state_dict(a.state_dict())
+    assert a.get_model_diff_hash() == b.get_model_diff_hash()
+    # A change deep inside a tensor that str() would elide must still show up.
+    with torch.no_grad():
+        b.transformer_encoder.layers[0].linear1.weight[40, 20] += 1e-3
+    assert a.get_model_fingerprint().diff(b.get_model_fingerprint()) == [
+        "transformer_encoder.layers.0.linear1.weight"
+    ]
+
+
+def test_merkle_root_shape():
+    leaves = {f"t{i}": bytes([i]) * 32 for i in range(5)}
+    fp = ModelFingerprint(leaves)
+    assert fp.root == merkle_root([leaves[k] for k in sorted(leaves)])
+    assert fp.diff(dict(leaves, t9=b"\0" * 32)) == ["t9"]
+    assert merkle_root([]) != merkle_root([b"\0" * 32])
@@ -0,0 +1,10 @@
+import pytest
+
+from benchmarks.bench_import import load_budget, measure
+
+
+@pytest.mark.parametrize("module,budget", sorted(load_budget().items()))
+def test_cold_import_within_budget(module, budget):
+    ms, loaded = measure(module, runs=3)
+    assert not set(budget["forbid"]) & loaded
+    assert ms <= budget["max_ms"]
@@ -0,0 +1,164 @@
+from src import wire
+from src.aead import KeyUpdatePolicy
+from src.batching import BatchPolicy
+from src.qaswp import VOCAB, QASWPSession
+
+FLOW = [VOCAB["GET"], VOCAB["/api/v1/profile"]]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _pair(policy, **kw):
+    cli = QASWPSession(is_client=True, batch_policy=BatchPolicy(batch_size=1), key_update=policy)
+    srv = QASWPSession(is_client=False, **kw)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    return cli, srv
+
+
+def _frames(cli, n):
+    # one confirmation per batch: every weave is exactly one frame
+    return [cli.weave_packet(FLOW) for _ in range(n)]
+
+
+def _phase(packet):
+    return bool(wire.unpack_header(packet["header"])[1] & wire.FLAG_KEY_PHASE)
+
+
+def test_ratchet_by_packet_count():
+    cli, srv = _pair(KeyUpdatePolicy(max_packets=4))
+    frames = _frames(cli, 20)
+    assert cli._crypto().tx_epoch == 4
+    assert [_phase(f) for f in frames[:9]] == [False] * 4 + [True] * 4 + [False]
+    assert all(srv.receive_woven_packet(f) is not None for f in frames)
+    assert srv._crypto().rx_epoch == 4
+    assert srv.context(0).rx_seq == 20
+
+
+def test_ratchet_by_bytes_and_age():
+    cli, _ = _pair(KeyUpdatePolicy(max_packets=None, max_bytes=10))
+    _frames(cli, 10)  # batch bodies are 4 bytes
+    assert cli._crypto().tx_epoch == 3
+
+    clock = Clock()
+    cli, srv = _pair(KeyUpdatePolicy(max_packets=None, max_age=60, clock=clock))
+    frames = _frames(cli, 2)
+    clock.now += 60
+    frames += _frames(cli, 2)
+    assert cli._crypto().tx_epoch == 1
+    assert [_phase(f) for f in frames] == [False, False, True, True]
+    assert all(srv.receive_woven_packet(f) is not None for f in frames)
+
+
+def test_late_frames_of_previous_epoch_are_accepted():
+    cli, srv = _pair(KeyUpdatePolicy(max_packets=3))
+    frames = _frames(cli, 12)
+    # epochs: 0 0 0 | 1 1 1 | 2 2 2 | 3 3 3; frames 4 and 5 are held back
+    for i in (0, 1, 3, 2, 6, 7, 8):
+        assert srv.receive_woven_packet(frames[i]) is not None
+    assert srv._crypto().rx_epoch == 2
+    assert srv.receive_woven_packet(frames[4]) is not None  # previous epoch
+    assert srv.receive_woven_packet(frames[9]) is not None
+    assert srv._crypto().rx_epoch == 3
+    # two epochs back, the key is gone
+    assert srv.receive_woven_packet(frames[5]) is None
+    assert srv.receive_woven_packet(frames[10]) is not None
+
+
+def test_receiver_recovers_after_losing_a_whole_epoch():
+    def sparse(clock):
+        cli, srv = _pair(KeyUpdatePolicy(max_packets=None, max_age=1.0, clock=clock))
+        epochs = []
+        for _ in range(5):
+            epochs.append(_frames(cli, 2))
+            clock.now += 1.0
+        assert cli._crypto().tx_epoch == 4
+        # every frame of epoch 1 is lost; epoch 2 has the same key phase as 0
+        return srv, epochs[0], epochs[2] + epochs[3] + epochs[4]
+
+    srv, first, after = sparse(Clock())
+    assert all(srv.receive_woven_packet(f) is not None for f in first)
+    assert all(srv.receive_woven_packet(f) is not None for f in after)
+    assert srv._crypto().rx_epoch == 4
+
+    srv, first, after = sparse(Clock())
+    assert len(srv.receive_many(first + after)) == len(first + after)
+    assert srv._crypto().rx_epoch == 4
+
+
+def test_phase_bit_is_authenticated_and_replays_still_fail():
+    cli, srv = _pair(KeyUpdatePolicy(max_packets=2))
+    frames = _frames(cli, 4)
+    flipped = bytearray(frames[3]["header"])
+    flipped[4] ^= wire.FLAG_KEY_PHASE
+    assert srv.receive_woven_packet(dict(frames[3], header=bytes(flipped))) is None
+    for f in frames:
+        assert srv.receive_woven_packet(f) is not None
+    assert all(srv.receive_woven_packet(f) is None for f in frames)
+
+
+def test_sequence_wrap_starts_a_new_epoch():
+    cli, srv = _pair(KeyUpdatePolicy(max_packets=None))
+    start = (1 << 32) - 3
+    cli.context(0).seq = start
+    srv.context(0).rx_seq = start
+    frames = _frames(cli, 6)
+    assert [wire.unpack_header(f["header"])[0] for f in frames] == [
+        (1 << 32) - 3,
+        (1 << 32) - 2,
+        (1 << 32) - 1,
+        0,
+        1,
+        2,
+    ]
+    assert cli._crypto().tx_epoch == 1
+    assert [_phase(f) for f in frames] == [False] * 3 + [True] * 3
+    assert all(srv.receive_woven_packet(f) is not None for f in frames)
+    assert srv.context(0).rx_seq == start + 6
+
+
+def test_legacy_peer_never_ratchets():
+    cli = QASWPSession(is_client=True, key_update=KeyUpdatePolicy(max_packets=1))
+    srv = QASWPSession(is_client=False)
+    hello = cli.client_pass_1()
+    del hello["key_update"]  # a peer that predates key updates
+    resp = srv.server_pass_2(hello)
+    assert resp["key_update"] is False
+    cli.client_pass_3(resp)
+    cli.batch_policy = BatchPolicy(batch_size=1)
+    frames = _frames(cli, 5)
+    assert cli._crypto().tx_epoch == 0
+    assert not any(_phase(f) for f in frames)
+    assert all(srv.receive_woven_packet(f) is not None for f in frames)
+
+
+def test_receive_many_across_epochs():
+    cli, srv = _pair(KeyUpdatePolicy(max_packets=5))
+    frames = _frames(cli, 40)
+    forged = bytearray(frames[12]["header"])
+    forged[4] ^= wire.FLAG_KEY_PHASE
+    backlog = [dict(frames[12], header=bytes(forged))] + frames[::-1]
+    got = srv.receive_many(backlog)
+    assert [r["seq"] for r in got] == list(range(40))
+    assert srv._crypto().rx_epoch == 7
+    more = _frames(cli, 5)
+    assert [r["seq"] for r in srv.receive_many(more)] == list(range(40, 45))
+
+
+def test_json_schema_keeps_the_session_key():
+    cli = QASWPSession(
+        is_client=True,
+        schema_version=wire.SCHEMA_JSON,
+        batch_policy=BatchPolicy(batch_size=1),
+        key_update=KeyUpdatePolicy(max_packets=1),
+    )
+    srv = QASWPSession(is_client=False)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    frames = _frames(cli, 3)
+    assert cli._crypto().tx_epoch == 0
+    assert all(srv.receive_woven_packet(f) is not None for f in frames)
@@ -0,0 +1,66 @@
+import itertools
+import time
+
+import numpy as np
+
+from src.keypool import QKDKeyPool
+from src.qaswp import QASWPSession
+from src.qkd import bb84_keygen
+
+
+def _counting_keygen():
+    counter = itertools.count()
+    return lambda rng: next(counter).to_bytes(4, "big") + rng.bytes(4)
+
+
+def test_bb84_keygen_uses_private_generator():
+    a = bb84_keygen(rng=np.random.default_rng(5), noise_level=0.0)
+    b = bb84_keygen(rng=np.random.default_rng(5), noise_level=0.0)
+    assert a == b
+
+
+def test_pool_refills_to_high_watermark_and_hands_out_keys_once():
+    with QKDKeyPool(low_watermark=2, high_watermark=6, keygen=_counting_keygen()) as pool:
+        assert pool.wait_until_full(timeout=5)
+        keys = [pool.get_key(timeout=5) for _ in range(20)]
+        assert len(set(keys)) == 20
+        assert pool.served + pool.fallbacks == 20
+
+
+def test_dry_pool_falls_back_to_synchronous_keygen():
+    pool = QKDKeyPool(low_watermark=1, high_watermark=4, keygen=_counting_keygen(), autostart=False)
+    assert len(pool) == 0
+    assert len(pool.get_key()) == 8
+    assert pool.fallbacks == 1
+
+
+def test_server_handshake_draws_from_pool():
+    with QKDKeyPool(low_watermark=1, high_watermark=2, seed=1) as pool:
+        assert pool.wait_until_full(timeout=10)
+        cli = QASWPSession(is_client=True)
+        srv = QASWPSession(is_client=False, key_pool=pool)
+        resp = srv.server_pass_2(cli.client_pass_1())
+        assert resp["status"] == "ok"
+        cli.client_pass_3(resp)
+        assert cli.session_key == srv.session_key
+        assert pool.served == 1
+
+
+def test_eavesdropper_fails_the_handshake_instead_of_hanging():
+    pool = QKDKeyPool(
+        low_watermark=1,
+        high_watermark=2,
+        keygen=lambda rng: bb84_keygen(eve_is_present=True, rng=rng),
+        max_failures=3,
+        retry_backoff=(0.01, 0.02),
+    )
+    with pool:
+        cli = QASWPSession(is_client=True)
+        srv = QASWPSession(is_client=False, key_pool=pool)
+        resp = srv.server_pass_2(cli.client_pass_1())
+        assert resp["status"] == "error"
+        assert "Eavesdropper" in resp["message"]
+        # the refill thread backs off between rejected runs
+        time.sleep(0.2)
+        assert pool.failures < 30
+        assert len(pool) == 0
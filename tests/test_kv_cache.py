@@ -0,0 +1,37 @@
+import random
+
+import torch
+
+from src.neural import VOCAB_SIZE, TinyLLM
+
+
+def _full_logits(model, history):
+    model.eval()
+    with torch.no_grad():
+        return model(torch.tensor([history], dtype=torch.long))[0]
+
+
+def test_incremental_matches_full_recompute_on_growing_history():
+    torch.manual_seed(3)
+    model = TinyLLM()
+    cache = model.new_kv_cache()
+    rng = random.Random(11)
+    history = []
+    for _ in range(200):
+        history.extend(rng.randrange(1, VOCAB_SIZE) for _ in range(rng.randint(1, 3)))
+        assert model.predict_next_token_cached(history, cache) == model.predict_next_token(history)
+        with torch.no_grad():
+            assert torch.allclose(
+                model._cached_logits(cache), _full_logits(model, history), atol=1e-5
+            )
+    assert len(cache) == len(history)
+
+
+def test_cache_rebuilds_when_history_diverges():
+    torch.manual_seed(4)
+    model = TinyLLM()
+    cache = model.new_kv_cache()
+    model.predict_next_token_cached([1, 2, 3, 4], cache)
+    for history in ([1, 2, 5], [6], [1, 2, 5, 7, 7]):
+        assert model.predict_next_token_cached(history, cache) == model.predict_next_token(history)
+        assert cache.tokens == history
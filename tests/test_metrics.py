@@ -0,0 +1,118 @@
+import gc
+import re
+
+import numpy as np
+import pytest
+
+from src import metrics
+from src.qaswp import VOCAB, QASWPSession
+from src.qkd import bb84_keygen
+
+FLOW = [VOCAB["GET"], VOCAB["/api/v1/profile"]]
+
+
+@pytest.fixture
+def on():
+    was = metrics.enabled()
+    metrics.enable()
+    metrics.reset()
+    yield
+    metrics.enable(was)
+    metrics.reset()
+
+
+def _pair():
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    return cli, srv
+
+
+def test_disabled_sessions_have_no_metrics():
+    was = metrics.enabled()
+    metrics.enable(False)
+    try:
+        cli, srv = _pair()
+        assert cli.metrics is None and srv.metrics is None
+        assert srv.receive_woven_packet(cli.weave_packet(FLOW)) is None
+    finally:
+        metrics.enable(was)
+
+
+def test_send_counters(on, monkeypatch):
+    monkeypatch.setenv("QASWP_DEMO", "0")
+    cli, _ = _pair()
+    packets = cli.send_tokens([FLOW[0]] * 20 + [7, 3]) + cli.flush_all()
+    m = cli.metrics
+    assert m.hits + m.misses == 22
+    assert m.deltas == m.misses
+    frames = [p for p in packets if p["flushed"]]
+    assert m.batches + m.deltas == len(frames)
+    assert m.wire_bytes == sum(
+        len(p["header"]) + len(p["nonce"]) + len(p["encrypted_payload"]) for p in frames
+    )
+    # every delta costs exactly the reference frame, batches are cheaper
+    assert m.bytes_saved == 22 * metrics.DELTA_FRAME_LEN - m.wire_bytes
+    assert metrics.BATCH_CONFIRMATIONS.count == m.batches
+
+    cli.weave_coded([FLOW[0]] * 10)
+    assert m.coded == 1
+
+
+def test_receive_drops(on):
+    cli, srv = _pair()
+    cli.weave_packet(FLOW)
+    real = cli.flush()
+    cli.weave_packet(FLOW)
+    other = cli.flush()
+    tampered = dict(real, encrypted_payload=real["encrypted_payload"][:-1] + b"\x00")
+    assert srv.receive_woven_packet(tampered) is None
+    assert srv.receive_woven_packet(real) is not None
+    assert srv.receive_woven_packet(real) is None
+    srv.receive_woven_packet({"flushed": False, "wire_len": 0})
+    srv.receive_woven_packet({"nonce": "x", "encrypted_payload": b"p", "flushed": True})
+    srv.receive_woven_packet(dict(other, header=other["header"][:-1] + b"\x01"))
+    got = srv.metrics.as_dict()
+    assert got["received"] == 1
+    assert got["drop_auth"] == 1
+    assert got["drop_replay"] == 1
+    assert got["drop_placeholder"] == 1
+    assert got["drop_malformed"] == 2
+
+
+def test_handshake_and_qber_histograms(on):
+    _pair()
+    assert metrics.HANDSHAKE_SECONDS["client"].count == 1
+    assert metrics.HANDSHAKE_SECONDS["server"].count == 1
+    bb84_keygen(rng=np.random.default_rng(0))
+    assert metrics.QKD_QBER.count == 2  # server_pass_2 ran BB84 too
+
+
+def test_totals_survive_collected_sessions(on):
+    cli, srv = _pair()
+    cli.weave_packet(FLOW)
+    gc.collect()
+    before = metrics.totals()
+    assert before["hits"] + before["misses"] >= 1
+    live = len(metrics._live)
+    del cli, srv
+    gc.collect()
+    assert len(metrics._live) == live - 2
+    assert metrics.totals() == before
+
+
+def test_exposition_format(on):
+    cli, srv = _pair()
+    for _ in range(70):
+        srv.receive_woven_packet(cli.weave_packet(FLOW))
+    text = metrics.exposition()
+    assert text.endswith("\n")
+    sample = re.compile(r'^[a-z_]+(\{[a-z_]+="[^"]*"(,[a-z_]+="[^"]*")*\})? \S+$')
+    for line in text.splitlines():
+        assert line.startswith("# HELP ") or line.startswith("# TYPE ") or sample.match(line), line
+    assert "# TYPE qaswp_handshake_seconds histogram" in text
+    assert text.count("# TYPE qaswp_handshake_seconds ") == 1
+    assert 'qaswp_handshake_seconds_bucket{role="client",le="+Inf"} 1' in text
+    assert "qaswp_sessions_total 2" in text
+    assert 'qaswp_frames_sent_total{kind="batch"} 1' in text
+    assert "qaswp_packets_received_total 1" in text
@@ -0,0 +1,95 @@
+import random
+import subprocess
+import sys
+
+import numpy as np
+import torch
+
+from src.neural import VOCAB, VOCAB_SIZE, TinyLLM
+from src.neural_np import NumpyTinyLLM, quantize_int8, save_weights
+from src.qaswp import QASWPSession
+
+
+def _model(seed=5):
+    torch.manual_seed(seed)
+    return TinyLLM().eval()
+
+
+def _torch_logits(model, src, mask=None):
+    with torch.no_grad():
+        return model(torch.as_tensor(src), src_key_padding_mask=mask).numpy()
+
+
+def test_forward_matches_torch_including_padding():
+    model = _model()
+    np_model = NumpyTinyLLM.from_torch(model)
+    gen = torch.Generator().manual_seed(0)
+    for length in (1, 2, 7, 64):
+        src = torch.randint(0, VOCAB_SIZE, (6, length), generator=gen)
+        np.testing.assert_allclose(
+            np_model.forward(src.numpy()), _torch_logits(model, src), atol=1e-5
+        )
+    rng = random.Random(1)
+    histories = [
+        [rng.randrange(1, VOCAB_SIZE) for _ in range(rng.randint(1, 20))] for _ in range(30)
+    ]
+    assert np_model.predict_next_tokens(histories) == model.predict_next_tokens(histories)
+
+
+def test_cached_prediction_matches_torch_on_growing_history():
+    model = _model(6)
+    np_model = NumpyTinyLLM.from_torch(model)
+    rng = random.Random(2)
+    history, cache, np_cache = [], model.new_kv_cache(), np_model.new_kv_cache()
+    for _ in range(100):
+        history.append(rng.randrange(VOCAB_SIZE))
+        expected = model.next_token_logits_cached(history, cache).numpy()
+        np.testing.assert_allclose(
+            np_model.next_token_logits_cached(history, np_cache), expected, atol=1e-5
+        )
+    # a diverging history rebuilds the counts
+    assert np_model.predict_next_token_cached([VOCAB["GET"]], np_cache) == model.predict_next_token(
+        [VOCAB["GET"]]
+    )
+
+
+def test_fingerprint_and_file_roundtrip(tmp_path):
+    model = _model()
+    path = tmp_path / "tinyllm.npz"
+    save_weights(model, path)
+    loaded = NumpyTinyLLM.load(path)
+    assert loaded.get_model_diff_hash() == NumpyTinyLLM.from_torch(model).get_model_diff_hash()
+    # float rounding differs from torch, so the backend is part of the model ID
+    assert loaded.get_model_diff_hash() != model.get_model_diff_hash()
+    assert loaded.get_model_fingerprint().diff(model.get_model_fingerprint()) == ["__backend__"]
+    quantized = NumpyTinyLLM.load(path, quantize=True)
+    assert quantized.get_model_diff_hash() != model.get_model_diff_hash()
+
+
+def test_int8_quantization_stays_close():
+    w = np.random.default_rng(0).standard_normal((16, 32)).astype(np.float32)
+    q, scale = quantize_int8(w)
+    assert q.dtype == np.int8
+    assert np.abs(q * scale[:, None] - w).max() <= scale.max() / 2 + 1e-6
+
+    model = _model()
+    exact, quantized = NumpyTinyLLM.from_torch(model), NumpyTinyLLM.from_torch(model, quantize=True)
+    src = np.random.default_rng(1).integers(0, VOCAB_SIZE, (64, 10))
+    assert np.abs(exact.forward(src) - quantized.forward(src)).max() < 0.05
+
+
+def test_sessions_run_on_numpy_backend():
+    np_model = NumpyTinyLLM.from_torch(_model())
+    cli = QASWPSession(is_client=True, model=np_model)
+    srv = QASWPSession(is_client=False, model=np_model, reconstruct=True)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    sent = [random.Random(3).randrange(1, VOCAB_SIZE) for _ in range(200)]
+    for packet in cli.send_tokens(sent[:150]) + [cli.weave_coded(sent[150:])]:
+        for part in packet.get("packets", [packet]):
+            srv.receive_woven_packet(part)
+    assert list(srv.stream()) == sent
+
+
+def test_backend_imports_without_torch():
+    code = "import sys; sys.modules['torch'] = None; import src.neural_np"
+    subprocess.run([sys.executable, "-c", code], check=True)
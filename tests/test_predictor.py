@@ -0,0 +1,104 @@
+import random
+
+from src.neural import VOCAB, VOCAB_SIZE
+from src.predictor import NGramPredictor, PredictorChain
+from src.qaswp import QASWPSession
+from src.registry import shared_model
+
+
+class CountingModel:
+    """Wraps the shared model and counts forward passes."""
+
+    def __init__(self):
+        self.inner = shared_model()
+        self.calls = 0
+
+    def __getattr__(self, name):
+        return getattr(self.inner, name)
+
+    def predict_next_token_cached(self, history, cache):
+        self.calls += 1
+        return self.inner.predict_next_token_cached(history, cache)
+
+    def predict_next_tokens(self, histories):
+        self.calls += 1
+        return self.inner.predict_next_tokens(histories)
+
+
+def _tiers():
+    return [NGramPredictor(order=2)]
+
+
+def test_ngram_confidence_and_lru_eviction():
+    ng = NGramPredictor(order=2, capacity=2, min_count=2, min_confidence=0.75)
+    assert ng.predict([1, 2]) is None
+    ng.update([1, 2], 3)
+    assert ng.predict([9, 1, 2]) is None  # one observation is not enough
+    ng.update([1, 2], 3)
+    assert ng.predict([9, 1, 2]) == 3
+    ng.update([1, 2], 4)
+    assert ng.predict([1, 2]) is None  # 2/3 is below the confidence bar
+    ng.update([5, 6], 1)
+    ng.update([1, 2], 3)  # refreshes [1, 2]; [5, 6] is now least recent
+    ng.update([7, 7], 1)
+    assert len(ng) == 2 and ng.evictions == 1
+    assert ng.predict([1, 2]) == 3
+
+
+def test_counts_age_deterministically():
+    ng = NGramPredictor(order=1, min_count=1, min_confidence=0.8, max_count=8)
+    for token in [1] * 7 + [2] * 9:
+        ng.update([0], token)
+    assert ng.predict([0]) == 2
+
+
+def test_repeated_flows_skip_the_model():
+    model = CountingModel()
+    cli = QASWPSession(is_client=True, model=model, predictor_tiers=_tiers)
+    srv = QASWPSession(is_client=False)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    flows = [
+        [VOCAB["GET"], VOCAB["/api/v1/profile"], VOCAB["HTTP/1.1"]],
+        [VOCAB["POST"], VOCAB["/api/v1/data"], VOCAB["HTTP/1.1"]],
+    ]
+    for i in range(1000):
+        cli.weave_packet(flows[i % 2])
+    stats = cli.predictor_stats()["weave"]
+    assert stats["lookups"] == 1000
+    assert stats["fallbacks"] == model.calls <= 4
+    assert stats["hit_rate"] > 0.99
+
+
+def test_weave_many_matches_loop_with_ngram_tier():
+    rng = random.Random(4)
+    msgs = [[rng.randrange(1, 4), rng.randrange(1, VOCAB_SIZE)] for _ in range(300)]
+    a, b = PredictorChain(shared_model(), _tiers()), PredictorChain(shared_model(), _tiers())
+    histories = [m[:-1] for m in msgs]
+    loop = []
+    for h, m in zip(histories, msgs, strict=True):
+        loop.append(a.predict(h, shared_model().new_kv_cache()))
+        a.update(h, m[-1])
+    assert b.predict_many(histories, [m[-1] for m in msgs]) == loop
+    assert a.stats() == b.stats()
+
+
+def test_peers_stay_in_step_on_reconstructed_stream():
+    cli = QASWPSession(is_client=True, predictor_tiers=_tiers)
+    srv = QASWPSession(is_client=False, reconstruct=True, predictor_tiers=_tiers)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    rng = random.Random(9)
+    template = [rng.randrange(1, VOCAB_SIZE) for _ in range(12)]
+    sent = []
+    for _ in range(50):
+        msg = list(template)
+        if rng.random() < 0.3:
+            msg[rng.randrange(len(msg))] = rng.randrange(1, VOCAB_SIZE)
+        sent.extend(msg)
+    packets = cli.send_tokens(sent) + cli.flush_all()
+    for p in packets:
+        srv.receive_woven_packet(p)
+    assert list(srv.stream()) == sent
+    tx, rx = cli.predictor_stats()["stream"], srv.predictor_stats()["rx_stream"]
+    assert tx["hit_rate"] > 0.5
+    # the receiver only predicts confirmed positions, all answered alike
+    assert rx["hits"] <= tx["hits"] and rx["fallbacks"] <= tx["fallbacks"]
@@ -0,0 +1,93 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from src import config, profiling
+from src.qaswp import VOCAB, QASWPSession
+
+FLOW = [VOCAB["GET"], VOCAB["/api/v1/profile"]]
+
+
+@pytest.fixture
+def prof():
+    profiling.reset()
+    yield profiling
+    profiling.disable()
+    profiling.reset()
+
+
+def _pair():
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    return cli, srv
+
+
+def test_profile_every_flag(monkeypatch):
+    for value, every in (("0", 0), ("", 0), ("off", 0), ("1", 1), ("yes", 1), ("16", 16)):
+        monkeypatch.setenv("QASWP_PROFILE", value)
+        assert config.profile_every() == every
+    monkeypatch.delenv("QASWP_PROFILE")
+    assert config.profile_every() == 0
+
+
+def test_disabled_runs_original_methods():
+    assert not profiling.enabled()
+    assert not hasattr(QASWPSession.weave_packet, "__qaswp_original__")
+    assert QASWPSession.weave_packet.__qaswp_traced__
+
+
+def test_stage_breakdown(prof, monkeypatch):
+    monkeypatch.setenv("QASWP_DEMO", "0")
+    prof.enable(every=4)
+    cli, srv = _pair()
+    for token in range(1, 21):
+        srv.receive_woven_packet(cli.weave_packet([FLOW[0], token]))
+    report = prof.report()
+    assert {"client_pass_1", "server_pass_2", "client_pass_3"} <= set(report)
+    weave = report["weave_packet"]
+    assert weave["calls"] == 20 and weave["sampled"] == 5
+    assert weave["mean_seconds"] > 0
+    assert {"model", "aead", "encode", "protocol"} <= set(weave["stages"])
+    assert sum(weave["stages"].values()) == pytest.approx(weave["traced_seconds"], rel=1e-6)
+    assert {"aead", "decode"} <= set(report["receive_woven_packet"]["stages"])
+    assert "kdf" in report["client_pass_3"]["stages"]
+    assert "weave_packet" in prof.table()
+
+    prof.disable()
+    assert not hasattr(QASWPSession.weave_packet, "__qaswp_original__")
+    cli.weave_packet(FLOW)
+    assert prof.report()["weave_packet"]["calls"] == 20
+
+
+def test_collapsed_stacks(prof):
+    prof.enable()
+    cli, _ = _pair()
+    cli.weave_packet(FLOW)
+    lines = prof.collapsed().splitlines()
+    assert lines
+    for line in lines:
+        path, micros = line.rsplit(" ", 1)
+        assert int(micros) > 0
+        assert path.split(";")[0] in prof.report()
+    assert any(
+        line.startswith("weave_packet;src.qaswp.QASWPSession.weave_packet;") for line in lines
+    )
+
+
+def test_env_flag_dumps_at_exit(tmp_path):
+    out = tmp_path / "weave.folded"
+    code = (
+        "from src.qaswp import QASWPSession\n"
+        "c, s = QASWPSession(is_client=True), QASWPSession()\n"
+        "c.client_pass_3(s.server_pass_2(c.client_pass_1()))\n"
+        "c.weave_packet([1, 2])\n"
+    )
+    env = dict(os.environ, QASWP_PROFILE="1", QASWP_PROFILE_OUT=str(out))
+    proc = subprocess.run(
+        [sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True
+    )
+    assert "weave_packet" in proc.stderr
+    assert "weave_packet;" in out.read_text()
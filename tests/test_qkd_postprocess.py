@@ -0,0 +1,65 @@
+import numpy as np
+import pytest
+
+from src import qkd
+from src.qaswp import QASWPSession
+from src.qkd import bb84_distill, binary_entropy, cascade_reconcile, master_key, toeplitz_hash
+
+
+def test_toeplitz_hash_matches_explicit_matrix():
+    rng = np.random.default_rng(2)
+    n, m = 97, 40
+    x = rng.integers(0, 2, n, dtype=np.uint8)
+    seed = rng.integers(0, 2, m + n - 1, dtype=np.uint8)
+    matrix = np.array([[seed[i - j + n - 1] for j in range(n)] for i in range(m)])
+    assert np.array_equal(toeplitz_hash(x, m, seed), (matrix @ x) & 1)
+
+
+def test_cascade_corrects_all_errors_and_accounts_leakage():
+    rng = np.random.default_rng(3)
+    alice = rng.integers(0, 2, 20000, dtype=np.uint8)
+    bob = alice ^ (rng.random(len(alice)) < 0.03).astype(np.uint8)
+    fixed, leaked, passes = cascade_reconcile(alice, bob, 0.03, rng)
+    assert np.array_equal(fixed, alice)
+    assert passes >= 4
+    # leakage must be at least the Shannon bound and not absurdly above it
+    assert len(alice) * binary_entropy(0.03) < leaked < len(alice) * 0.5
+
+
+def test_distill_reports_rate_and_leak():
+    stats = bb84_distill(length=1 << 14, rng=np.random.default_rng(4))
+    assert stats["residual_errors"] == 0
+    assert len(stats["key"]) == -(-stats["final_bits"] // 8)
+    assert stats["final_bits"] == int(
+        stats["reconciled_bits"] * (1 - binary_entropy(stats["qber"])) - stats["leaked_bits"] - 64
+    )
+    assert stats["secret_key_rate"] > 0.25
+
+
+def test_distill_detects_eavesdropper():
+    with pytest.raises(ValueError, match="Eavesdropper detected!"):
+        bb84_distill(length=4096, eve_is_present=True, rng=np.random.default_rng(5))
+
+
+def test_handshake_uses_distilled_master_key(monkeypatch):
+    calls = []
+    distill = qkd.bb84_distill
+    monkeypatch.setattr(qkd, "bb84_distill", lambda *a: calls.append(a) or distill(*a))
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False)
+    resp = srv.server_pass_2(cli.client_pass_1())
+    assert len(resp["qkd_master_key"]) == qkd.MASTER_KEY_LEN
+    assert calls and calls[0][0] == qkd.HANDSHAKE_QUBITS
+    cli.client_pass_3(resp)
+    assert cli.session_key == srv.session_key
+
+
+def test_master_key_legacy_flag(monkeypatch):
+    rng = np.random.default_rng(6)
+    assert len(master_key(rng=rng)) == qkd.MASTER_KEY_LEN
+    monkeypatch.setenv("QASWP_QKD_DISTILL", "0")
+    assert master_key(rng=np.random.default_rng(6), noise_level=0.0) == qkd.bb84_keygen(
+        rng=np.random.default_rng(6), noise_level=0.0
+    )
+    with pytest.raises(ValueError, match="Eavesdropper detected!"):
+        master_key(eve_is_present=True, rng=rng)
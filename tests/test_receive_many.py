@@ -0,0 +1,91 @@
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from src.qaswp import VOCAB, QASWPSession
+from src.threadsafe import ConcurrentSession
+
+
+def _pair(monkeypatch):
+    monkeypatch.setenv("QASWP_DEMO", "0")
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    return cli, srv
+
+
+def _twin(srv):
+    twin = QASWPSession(is_client=False)
+    twin._schema_version = srv._schema_version
+    twin._install_session_key(srv.session_key)
+    return twin
+
+
+def _backlog(cli, n, rng):
+    frames = []
+    for _ in range(n):
+        tokens = [VOCAB["GET"], rng.randrange(1, len(VOCAB))]
+        packet = cli.weave_packet(tokens, context_id=rng.randrange(3))
+        if packet["flushed"]:
+            frames.extend(packet.get("packets", [packet]))
+    return frames + cli.flush_all()
+
+
+def _junk(frames, rng):
+    real = frames[0]
+    return [
+        {"nonce": b"", "encrypted_payload": b"", "flushed": True, "wire_len": 0},
+        {"nonce": b"n" * 12, "encrypted_payload": b"p" * 20, "flushed": False, "wire_len": 5},
+        {"nonce": "not bytes", "encrypted_payload": b"p", "flushed": True},
+        dict(real, encrypted_payload=real["encrypted_payload"][:-1] + b"\x00"),
+        dict(real, header=real["header"][:-1] + b"\x01"),
+        dict(real, header=12345),
+        dict(rng.choice(frames)),  # duplicate
+        dict(rng.choice(frames), nonce=memoryview(rng.choice(frames)["nonce"])),
+    ]
+
+
+def test_receive_many_matches_one_by_one(monkeypatch):
+    rng = random.Random(3)
+    cli, srv = _pair(monkeypatch)
+    frames = _backlog(cli, 400, rng)
+    batch = frames + _junk(frames, rng)
+    rng.shuffle(batch)
+
+    twin = _twin(srv)
+    one_by_one = [d for d in map(twin.receive_woven_packet, batch) if d is not None]
+    bulk = srv.receive_many(batch)
+    assert bulk == sorted(one_by_one, key=lambda d: (d["ctx"], d["seq"]))
+    assert len(bulk) == len(frames)
+    for ctx in range(3):
+        assert srv.context(ctx).rx_seq == twin.context(ctx).rx_seq
+    assert srv.receive_many(batch) == []  # all replays now
+
+
+def test_parallel_decrypt_and_backlog_beyond_replay_window(monkeypatch):
+    rng = random.Random(5)
+    cli, srv = _pair(monkeypatch)
+    frames = _backlog(cli, 3000, rng)
+    assert len(frames) > 1024  # more than the replay window
+    rng.shuffle(frames)
+    with ThreadPoolExecutor(4) as pool:
+        bulk = srv.receive_many(frames, executor=pool)
+    assert len(bulk) == len(frames)
+    assert bulk == sorted(bulk, key=lambda d: (d["ctx"], d["seq"]))
+
+    cli, srv = _pair(monkeypatch)
+    frames = _backlog(cli, 300, rng)
+    shared = ConcurrentSession(srv)
+    assert len(shared.receive_many(frames + frames)) == len(frames)
+    shared.close()
+
+
+def test_empty_and_non_dict_backlogs(monkeypatch):
+    cli, srv = _pair(monkeypatch)
+    frames = _backlog(cli, 20, random.Random(9))
+    with ThreadPoolExecutor(2) as pool:
+        assert srv.receive_many([], executor=pool) == []
+        # placeholders only: nothing left to decrypt
+        assert srv.receive_many([{"wire_len": 0}], executor=pool) == []
+        got = srv.receive_many([None, 7, "frame", [b"x"]] + frames, executor=pool)
+    assert len(got) == len(frames)
+    assert srv.receive_woven_packet(None) is None
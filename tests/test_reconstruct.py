@@ -0,0 +1,137 @@
+import asyncio
+import random
+
+import pytest
+
+from src import metrics
+from src.entropy import TokenCoder
+from src.neural import VOCAB, VOCAB_SIZE
+from src.qaswp import QASWPSession
+from src.reconstruct import StreamDecoder
+from src.registry import shared_model
+from src.transport import QASWPClient, QASWPServer
+from src.wire import SEQ_MASK
+
+
+def _handshake(**srv_kwargs):
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False, **srv_kwargs)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    return cli, srv
+
+
+def _stream(n, hit_rate, seed):
+    """Token stream that follows the model's prediction ``hit_rate`` of the time."""
+    rng = random.Random(seed)
+    coder = TokenCoder(shared_model())
+    for _ in range(n):
+        token = coder.predict() if rng.random() < hit_rate else rng.randrange(1, VOCAB_SIZE)
+        coder.push(token)
+        yield token
+
+
+def test_real_mismatch_path_keeps_the_flushed_batch(monkeypatch):
+    monkeypatch.setenv("QASWP_DEMO", "0")
+    cli, srv = _handshake()
+    model = cli.model
+    history = [VOCAB["GET"]]
+    predicted = model.predict_next_token(history)
+    assert cli.weave_packet(history + [predicted])["flushed"] is False
+    wrong = next(t for t in range(1, VOCAB_SIZE) if t != predicted)
+    packet = cli.weave_packet(history + [wrong])
+    batch, delta = packet["packets"]
+    assert packet["wire_len"] == batch["wire_len"] + delta["wire_len"]
+    assert srv.receive_woven_packet(batch)["t"] == "batch"
+    assert srv.receive_woven_packet(delta) == {"t": "delta", "seq": 1, "need": wrong, "ctx": 0}
+
+
+def test_stream_reconstructed_from_shuffled_frames():
+    cli, srv = _handshake(reconstruct=True)
+    sent = list(_stream(600, 0.8, seed=1))
+    packets = cli.send_tokens(sent[:300], context_id=4)
+    coded = cli.weave_coded(sent[300:340], context_id=4)
+    packets += coded.get("packets", [coded])
+    packets += cli.send_tokens(sent[340:], context_id=4)
+    packets += cli.flush_all()
+    kinds = {
+        srv.receive_woven_packet(p)["t"] for p in random.Random(2).sample(packets, len(packets))
+    }
+    assert kinds == {"batch", "delta", "coded"}
+
+    decoder = srv.stream(4)
+    assert list(decoder) == sent
+    assert decoder.pending == 0 and list(decoder) == []
+
+
+def test_weave_traffic_is_not_reconstructed(monkeypatch):
+    monkeypatch.setenv("QASWP_DEMO", "0")
+    cli, srv = _handshake(reconstruct=True)
+    flow = [VOCAB["GET"], VOCAB["/api/v1/profile"]]
+    packets = [cli.weave_packet(flow) for _ in range(5)]
+    sent = list(_stream(50, 0.8, seed=3))
+    packets += cli.send_tokens(sent) + cli.flush_all()
+    for p in packets[::-1]:
+        for frame in p.get("packets", [p]):
+            srv.receive_woven_packet(frame)
+    assert list(srv.stream()) == sent
+    with pytest.raises(ValueError):
+        cli.weave_packet(flow)
+
+
+def test_decoder_errors_stay_inside_receive():
+    was = metrics.enabled()
+    metrics.enable()
+    try:
+        cli, srv = _handshake(reconstruct=True)
+        srv.stream().max_pending = 1
+        packets = [p for p in cli.send_tokens(_stream(60, 0.5, seed=4)) if p["flushed"]]
+        assert len(packets) > 2
+        for p in packets[:0:-1]:
+            assert srv.receive_woven_packet(p) is not None
+        assert srv.metrics.decode_errors == len(packets) - 2
+    finally:
+        metrics.enable(was)
+
+
+def test_decoder_waits_for_gaps_and_ignores_duplicates():
+    decoder = StreamDecoder(shared_model())
+    assert decoder.feed({"t": "delta", "seq": 1, "need": 2}) == 0
+    assert decoder.pending == 1
+    assert decoder.feed({"t": "delta", "seq": 0, "need": 5}) == 2
+    assert decoder.feed({"t": "delta", "seq": 0, "need": 7}) == 0
+    assert list(decoder) == [5, 2]
+    with pytest.raises(ValueError):
+        decoder.feed({"t": "batch", "seq": 2, "count": 3, "bits": 0b101})
+    decoder.skip({"t": "batch", "seq": 3, "count": 2, "bits": 0b11})
+    decoder.skip({"t": "delta", "seq": 2, "need": 9})
+    assert decoder.next_seq == 5 and list(decoder) == []
+
+
+def test_decoder_unwraps_32_bit_sequence_numbers():
+    decoder = StreamDecoder(shared_model())
+    decoder.next_seq = SEQ_MASK
+    decoder.feed({"t": "delta", "seq": 0, "need": 3})
+    decoder.feed({"t": "delta", "seq": SEQ_MASK, "need": 4})
+    assert list(decoder) == [4, 3]
+    assert decoder.next_seq == SEQ_MASK + 2
+
+
+def test_stream_over_transport():
+    sent = list(_stream(200, 0.9, seed=5))
+    sessions = []
+
+    def factory():
+        sessions.append(QASWPSession(is_client=False, reconstruct=True))
+        return sessions[-1]
+
+    async def main():
+        async with QASWPServer(session_factory=factory) as server:
+            async with await QASWPClient.connect("127.0.0.1", server.port) as conn:
+                await conn.send_tokens(sent)
+            for _ in range(100):
+                if server.sessions_active == 0:
+                    break
+                await asyncio.sleep(0.01)
+
+    asyncio.run(main())
+    assert list(sessions[0].stream()) == sent
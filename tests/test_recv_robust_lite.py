@@ -7,20 +7,21 @@ from src.neural import VOCAB
 from src.qaswp import QASWPSession
 
 
-def _handshake_server() -> QASWPSession:
+def _handshake_pair() -> tuple[QASWPSession, QASWPSession]:
+    client = QASWPSession(is_client=True)
     server = QASWPSession(is_client=False)
-    hello = server.client_pass_1()
+    hello = client.client_pass_1()
     response = server.server_pass_2(hello)
     assert response["status"] == "ok"
-    finish = server.client_pass_3(response)
+    finish = client.client_pass_3(response)
     assert finish["status"] == "ok"
-    return server
+    return client, server
 
 
 @pytest.mark.robust
 def test_receive_woven_packet_lite_random_inputs_100():
     random.seed(1234)
-    server = _handshake_server()
+    client, server = _handshake_pair()
 
     def placeholder_packet() -> dict:
         choice = random.choice(["zero", "unflushed", "missing"])
@@ -54,19 +55,18 @@ def test_receive_woven_packet_lite_random_inputs_100():
             output = server.receive_woven_packet(packet)
         except Exception as exc:
             raise AssertionError(
-                "receive_woven_packet raised on lite input: "
-                f"{type(exc).__name__}: {exc}"
+                "receive_woven_packet raised on lite input: " f"{type(exc).__name__}: {exc}"
             ) from exc
         assert output is None or isinstance(output, dict)
 
     # Ensure a real encrypted batch generated by weave_packet can be received.
     packet = None
     for _ in range(64):
-        candidate = server.weave_packet([VOCAB["GET"]])
+        candidate = client.weave_packet([VOCAB["GET"]])
         if candidate and candidate.get("wire_len", 0):
             packet = candidate
     if not packet or packet.get("wire_len", 0) == 0:
-        packet = server.flush_confirmations()
+        packet = client.flush_confirmations()
     assert packet and packet.get("wire_len", 0) > 0
     result = server.receive_woven_packet(packet)
     assert isinstance(result, dict)
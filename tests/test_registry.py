@@ -0,0 +1,35 @@
+import pytest
+
+from src.neural import TinyLLM
+from src.qaswp import QASWPSession
+from src.registry import ModelRegistry, build_default_model, get_registry, shared_model
+
+
+def test_sessions_share_one_frozen_model():
+    a, b = QASWPSession(is_client=True), QASWPSession()
+    assert a.model is b.model is shared_model()
+    assert not a.model.training
+    assert not any(p.requires_grad for p in a.model.parameters())
+    # per-session context state is not shared
+    assert a.context().kv_cache is not b.context().kv_cache
+
+
+def test_default_model_is_deterministic_across_builds():
+    assert build_default_model().get_model_diff_hash() == shared_model().get_model_diff_hash()
+
+
+def test_registry_lookup_by_id_and_alias():
+    reg = ModelRegistry()
+    model = TinyLLM()
+    model_id = reg.register(model, name="custom")
+    assert reg.get(model_id) is model
+    assert reg.get("custom") is model
+    assert reg.register(TinyLLM(), name="other") != model_id
+    assert len(reg) == 2
+    with pytest.raises(KeyError):
+        reg.get("missing")
+
+
+def test_session_accepts_model_id():
+    model_id = get_registry().register(shared_model())
+    assert QASWPSession(model=model_id).model is shared_model()
@@ -0,0 +1,166 @@
+import asyncio
+
+import pytest
+
+from src.qaswp import VOCAB, QASWPSession
+from src.resumption import StrikeRegister, TicketIssuer
+from src.transport import QASWPClient, QASWPServer
+
+FLOW = [VOCAB["GET"], VOCAB["/api/v1/profile"]]
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _full(issuer):
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False, ticket_issuer=issuer)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    return cli, srv
+
+
+def test_full_handshake_issues_ticket():
+    cli, srv = _full(TicketIssuer(lifetime=60))
+    assert cli.ticket["schema_version"] == srv._schema_version
+    assert cli.ticket["secret"] != cli.session_key
+    # no issuer, no ticket
+    plain, _ = _full(None)
+    assert plain.ticket is None
+
+
+def test_resume_with_early_data(monkeypatch):
+    monkeypatch.setenv("QASWP_DEMO", "0")
+    issuer = TicketIssuer()
+    cli, _ = _full(issuer)
+
+    again = QASWPSession(is_client=True)
+    hello = again.resume_pass_1(cli.ticket)
+    early = again.weave_packet([FLOW[0], 5])  # sent before the server answered
+
+    srv = QASWPSession(is_client=False, ticket_issuer=issuer)
+    resp = srv.resume_pass_2(hello)
+    assert resp["status"] == "ok" and resp["resumed"]
+    assert srv.session_key == again.session_key != cli.session_key
+    assert srv.entanglement_id() == again.entanglement_id()
+    assert srv.receive_woven_packet(early)["need"] == 5
+    assert again.resume_pass_3(resp)
+    assert again.ticket["ticket"] != cli.ticket["ticket"]
+
+    # a resumed session hands out tickets that resume too
+    third = QASWPSession(is_client=True)
+    srv3 = QASWPSession(is_client=False, ticket_issuer=issuer)
+    assert srv3.resume_pass_2(third.resume_pass_1(again.ticket))["status"] == "ok"
+    assert srv3.session_key == third.session_key
+
+
+def test_replayed_resumption_is_rejected():
+    issuer = TicketIssuer()
+    cli, _ = _full(issuer)
+    hello = QASWPSession(is_client=True).resume_pass_1(cli.ticket)
+    assert QASWPSession(ticket_issuer=issuer).resume_pass_2(hello)["status"] == "ok"
+    replay = QASWPSession(ticket_issuer=issuer)
+    assert replay.resume_pass_2(hello)["status"] == "error"
+    assert replay.session_key is None
+    # the same ticket with a fresh client nonce is fine
+    fresh = QASWPSession(is_client=True).resume_pass_1(cli.ticket)
+    assert QASWPSession(ticket_issuer=issuer).resume_pass_2(fresh)["status"] == "ok"
+
+
+def test_rejects_forged_expired_and_foreign_tickets():
+    clock = Clock()
+    issuer = TicketIssuer(lifetime=30, clock=clock)
+    cli, _ = _full(issuer)
+    ticket = cli.ticket["ticket"]
+
+    def attempt(t, srv_issuer=issuer):
+        hello = dict(QASWPSession(is_client=True).resume_pass_1(cli.ticket), ticket=t)
+        return QASWPSession(ticket_issuer=srv_issuer).resume_pass_2(hello)["status"]
+
+    forged = ticket[:-1] + bytes([ticket[-1] ^ 1])
+    assert attempt(forged) == "error"
+    assert attempt(b"short") == "error"
+    assert attempt(ticket, TicketIssuer()) == "error"  # another server's STEK
+    assert attempt(ticket, None) == "error"
+    assert attempt(ticket) == "ok"
+    clock.now += 30
+    assert attempt(ticket) == "error"
+
+
+def test_malformed_resume_hello_is_rejected():
+    srv = QASWPSession(ticket_issuer=TicketIssuer())
+    rejected = {"status": "error", "message": "resumption rejected"}
+    for hello in ([1], None, "ticket", b"x" * 64, {"ticket": [1], "client_nonce": 5}):
+        assert srv.resume_pass_2(hello) == rejected
+    assert srv.session_key is None
+
+
+def test_stek_rotation_keeps_previous_key():
+    issuer = TicketIssuer()
+    old = issuer.issue(b"s" * 32, 2)
+    issuer.rotate()
+    assert issuer.open(old)[3] == b"s" * 32
+    new = issuer.issue(b"t" * 32, 2)
+    issuer.rotate()
+    assert issuer.open(old) is None
+    assert issuer.open(new)[3] == b"t" * 32
+
+
+def test_expired_ticket_is_not_offered():
+    cli, _ = _full(TicketIssuer())
+    with pytest.raises(ValueError):
+        QASWPSession(is_client=True).resume_pass_1(dict(cli.ticket, expires=0))
+
+
+def test_strike_register_expiry_and_capacity():
+    clock = Clock()
+    strikes = StrikeRegister(max_entries=2, clock=clock)
+    assert strikes.add(b"a", clock.now + 10)
+    assert not strikes.add(b"a", clock.now + 10)
+    assert strikes.add(b"b", clock.now + 20)
+    assert not strikes.add(b"c", clock.now + 20)  # full: refuse, never forget
+    clock.now += 10
+    assert strikes.add(b"c", clock.now + 20)
+    assert len(strikes) == 2
+
+
+def test_resume_over_loopback():
+    got = []
+
+    def on_packet(session, decoded):
+        got.append((session.entanglement_id(), decoded.get("count", 1)))
+
+    async def main():
+        issuer = TicketIssuer()
+        async with QASWPServer(on_packet=on_packet, ticket_issuer=issuer) as server:
+            first = await QASWPClient.connect("127.0.0.1", server.port)
+            async with first:
+                await first.send(FLOW)
+            assert not await first.resumed()
+
+            second = await QASWPClient.connect("127.0.0.1", server.port, ticket=first.ticket)
+            async with second:
+                await second.send(FLOW)  # early data
+                assert await second.resumed()
+            assert second.ticket["ticket"] != first.ticket["ticket"]
+
+            bogus = dict(first.ticket, ticket=b"x" * 64)
+            rejected = await QASWPClient.connect("127.0.0.1", server.port, ticket=bogus)
+            await rejected.send(FLOW)
+            with pytest.raises(ConnectionError):
+                await rejected.resumed()
+            await rejected.close()
+
+            for _ in range(100):
+                if server.sessions_active == 0:
+                    break
+                await asyncio.sleep(0.01)
+            return first, second
+
+    first, second = asyncio.run(main())
+    assert (first.session.entanglement_id(), 1) in got
+    assert (second.session.entanglement_id(), 1) in got
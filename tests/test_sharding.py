@@ -0,0 +1,144 @@
+import asyncio
+import os
+
+from src.qaswp import VOCAB, QASWPSession
+from src.sharding import ShardedServer, shard_for
+from src.transport import (
+    MSG_HELLO,
+    MSG_SERVER_HELLO,
+    QASWPClient,
+    decode_control,
+    encode_control,
+    read_message,
+    write_message,
+)
+
+FLOW = [VOCAB["GET"], VOCAB["/api/v1/profile"]]
+
+
+def _failing_callback(session, decoded):
+    raise RuntimeError("callback bug")
+
+
+def _crash_on_three(session, decoded):
+    if decoded.get("count") == 3:
+        os._exit(1)
+
+
+async def _send(port, n):
+    conn = await QASWPClient.connect("127.0.0.1", port)
+    for _ in range(n):
+        await conn.send(FLOW)
+    await conn.close()
+
+
+async def _wait_for(server, key, value):
+    for _ in range(300):
+        stats = await server.stats()
+        if stats[key] >= value:
+            return stats
+        await asyncio.sleep(0.02)
+    return stats
+
+
+def test_shard_for_is_stable_and_in_range():
+    assert shard_for("5a0f3c9e2b7d4411", 4) == shard_for("5a0f3c9e2b7d4411", 4)
+    # blake2b, not hash(): the same in every process regardless of PYTHONHASHSEED
+    assert shard_for("5a0f3c9e2b7d4411", 1 << 16) == 30257
+    assert {shard_for(f"{i:016x}", 3) for i in range(64)} == {0, 1, 2}
+
+
+def test_sessions_pinned_to_workers_and_drained():
+    n_clients, n_msgs = 6, 40
+
+    async def client(port, close=True):
+        conn = await QASWPClient.connect("127.0.0.1", port)
+        for _ in range(n_msgs):
+            await conn.send([VOCAB["GET"], VOCAB["/api/v1/profile"]])
+        if close:
+            await conn.close()
+        else:
+            await conn.flush()
+        return conn
+
+    async def main():
+        server = await ShardedServer(workers=2).start()
+        conns = await asyncio.gather(*(client(server.port) for _ in range(n_clients)))
+        # one connection is still open when the drain starts
+        straggler = await client(server.port, close=False)
+        for _ in range(200):
+            stats = await server.stats()
+            if stats["packets"] == n_clients + 1 and stats["sessions"] == 1:
+                break
+            await asyncio.sleep(0.02)
+        mid = await server.stats()
+        closing = asyncio.create_task(server.close(timeout=5))
+        await asyncio.sleep(0.05)
+        await straggler.close()
+        return conns + [straggler], mid, await closing
+
+    conns, mid, final = asyncio.run(main())
+    # each session lives on shard_for(entanglement_id) and nowhere else
+    owner = shard_for(conns[-1].session.entanglement_id(), 2)
+    assert [w["sessions"] for w in mid["workers"]] == [int(i == owner) for i in range(2)]
+    assert final["handshakes"] == n_clients + 1
+    assert final["packets"] == n_clients + 1
+    assert final["sessions"] == 0
+    expected = [0, 0]
+    for conn in conns:
+        expected[shard_for(conn.session.entanglement_id(), 2)] += 1
+    assert [w["packets"] for w in final["workers"]] == expected
+    assert len({w["pid"] for w in final["workers"]}) == 2
+
+
+def test_failing_callback_does_not_kill_the_worker():
+    async def main():
+        async with ShardedServer(workers=1, on_packet=_failing_callback) as server:
+            for _ in range(3):
+                await _send(server.port, 4)
+            return await _wait_for(server, "errors", 3), server.respawns
+
+    stats, respawns = asyncio.run(main())
+    assert (stats["handshakes"], stats["packets"], stats["errors"]) == (3, 3, 3)
+    assert respawns == 0
+
+
+def test_dead_worker_is_respawned():
+    async def main():
+        async with ShardedServer(workers=1, on_packet=_crash_on_three) as server:
+            first = server._workers[0].process.pid
+            await _send(server.port, 3)  # its worker exits mid-packet
+            for _ in range(300):
+                if not server._workers[0].alive:
+                    break
+                await asyncio.sleep(0.02)
+            await _send(server.port, 5)
+            stats = await _wait_for(server, "packets", 1)
+            return first, stats, server.respawns
+
+    first, stats, respawns = asyncio.run(main())
+    assert respawns == 1
+    assert stats["workers"][0]["pid"] != first
+    assert (stats["handshakes"], stats["packets"]) == (1, 1)
+
+
+def test_malformed_hello_gets_an_error_reply():
+    async def attempt(port, hello):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        write_message(writer, MSG_HELLO, encode_control(hello))
+        await writer.drain()
+        msg_type, body = await read_message(reader)
+        writer.close()
+        return msg_type, decode_control(body)
+
+    async def main():
+        async with ShardedServer(workers=1) as server:
+            good = QASWPSession(is_client=True).client_pass_1()
+            bad = [[1], {}, dict(good, nonce="x"), dict(good, schema_versions=2)]
+            replies = [await attempt(server.port, hello) for hello in bad]
+            assert (await attempt(server.port, good))[1]["status"] == "ok"
+            return replies
+
+    for msg_type, resp in asyncio.run(main()):
+        assert msg_type == MSG_SERVER_HELLO
+        assert resp == {"status": "error", "message": "malformed client hello"}
@@ -0,0 +1,149 @@
+import random
+import threading
+import time
+
+import pytest
+
+from src import qaswp
+from src.qaswp import VOCAB, QASWPSession
+from src.threadsafe import ConcurrentSession
+
+FLOWS = [[VOCAB["GET"], VOCAB["/api/v1/profile"]], [VOCAB["POST"], VOCAB["/api/v1/data"]]]
+
+
+def _pair():
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False)
+    cli.client_pass_3(srv.server_pass_2(cli.client_pass_1()))
+    return cli, srv
+
+
+def _frames(packets):
+    out = []
+    for packet in packets:
+        out.extend(packet.get("packets", [packet]) if packet.get("flushed") else [])
+    return out
+
+
+def _strip(decoded):
+    return {k: v for k, v in decoded.items() if k != "ctx"}
+
+
+def test_queued_weaves_match_sequential_session(monkeypatch):
+    monkeypatch.setenv("QASWP_DEMO", "0")
+    rng = random.Random(7)
+    messages = [rng.choice(FLOWS) + [rng.randrange(1, len(VOCAB))] for _ in range(300)]
+
+    cli, srv = _pair()
+    ref = [srv.receive_woven_packet(f) for f in _frames(map(cli.weave_packet, messages))]
+    ref += [srv.receive_woven_packet(p) for p in cli.flush_all()]
+
+    cli, srv = _pair()
+    calls = []
+    weave_many = cli.weave_many
+    cli.weave_many = lambda seqs, ctx=0: calls.append(len(seqs)) or weave_many(seqs, ctx)
+    with ConcurrentSession(cli) as shared:
+        futures = [shared.weave_packet(m) for m in messages]
+        tail = shared.flush_all()
+    got = [srv.receive_woven_packet(f) for f in _frames(f.result() for f in futures)]
+    got += [srv.receive_woven_packet(p) for p in tail.result()]
+    assert [_strip(d) for d in got] == [_strip(d) for d in ref]
+    assert calls and max(calls) > 1  # weaves queued behind the writer were coalesced
+
+
+def test_threads_share_a_session_and_receive_without_the_writer():
+    cli, srv = _pair()
+    sender, receiver = ConcurrentSession(cli), ConcurrentSession(srv)
+    per_thread = 200
+    futures = []
+
+    def submit(ctx):
+        for i in range(per_thread):
+            futures.append(sender.weave_packet(FLOWS[i % 2], ctx))
+
+    threads = [threading.Thread(target=submit, args=(ctx,)) for ctx in (0, 0, 1, 2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    tail = sender.flush_all().result()
+    sender.close()
+    frames = _frames(f.result() for f in futures) + tail
+
+    # every frame is delivered twice from several threads; each is accepted once
+    accepted = []
+
+    def deliver(chunk):
+        for frame in chunk:
+            decoded = receiver.receive(frame)
+            if decoded is not None:
+                accepted.append(decoded)
+
+    chunks = [frames[i::3] for i in range(3)] + [frames[::-1]]
+    threads = [threading.Thread(target=deliver, args=(c,)) for c in chunks]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    receiver.close()
+
+    assert len(accepted) == len(frames)
+    assert sum(d["count"] for d in accepted) == 4 * per_thread
+    for ctx, senders in ((0, 2), (1, 1), (2, 1)):
+        pos = 0
+        for d in sorted((d for d in accepted if d["ctx"] == ctx), key=lambda d: d["seq"]):
+            assert d["seq"] == pos  # no gaps or overlaps from racing senders
+            pos += d["count"]
+        assert srv.context(ctx).rx_seq == senders * per_thread
+
+
+def test_writer_and_receiver_open_one_context(monkeypatch):
+    created = []
+
+    class SlowContext(qaswp.StreamContext):
+        def __init__(self, *args):
+            time.sleep(0.01)  # widen the window between lookup and insert
+            super().__init__(*args)
+            created.append(self)
+
+    monkeypatch.setattr(qaswp, "StreamContext", SlowContext)
+    cli, srv = _pair()
+    with ConcurrentSession(cli) as shared:
+        barrier = threading.Barrier(4)
+        seen = []
+
+        def open_rx():
+            barrier.wait()
+            seen.append(cli.context(7))
+
+        threads = [threading.Thread(target=open_rx) for _ in range(3)]
+        for t in threads:
+            t.start()
+        barrier.wait()
+        shared.weave_packet(FLOWS[0], 7).result()
+        for t in threads:
+            t.join()
+    assert len(created) == 1
+    assert all(ctx is created[0] for ctx in seen)
+    # the writer's weave landed in that same context
+    assert created[0].seq + created[0].confirm_count == 1
+
+
+def test_bad_message_in_a_merged_run_fails_alone(monkeypatch):
+    monkeypatch.setenv("QASWP_DEMO", "0")
+    cli, srv = _pair()
+    release = threading.Event()
+    cli.hold = release.wait
+    calls = []
+    weave_many = cli.weave_many
+    cli.weave_many = lambda seqs, ctx=0: calls.append(len(seqs)) or weave_many(seqs, ctx)
+    good = [VOCAB["GET"], VOCAB["POST"]]  # a miss: every good message is its own frame
+    with ConcurrentSession(cli) as shared:
+        shared.submit("hold")  # keeps the writer busy while the run queues up
+        futures = [shared.weave_packet(m) for m in (good, good, [VOCAB["GET"], 1.5], good)]
+        release.set()
+    assert calls[0] == 4  # the four weaves were merged first
+    with pytest.raises(ValueError):
+        futures[2].result()
+    frames = _frames(f.result() for i, f in enumerate(futures) if i != 2)
+    assert [srv.receive_woven_packet(f)["seq"] for f in frames] == [0, 1, 2]
@@ -0,0 +1,88 @@
+import asyncio
+
+import pytest
+
+from src import wire
+from src.qaswp import VOCAB, QASWPSession
+from src.transport import (
+    MSG_HELLO,
+    MSG_SERVER_HELLO,
+    ProtocolError,
+    QASWPClient,
+    QASWPServer,
+    decode_control,
+    encode_control,
+    read_message,
+    write_message,
+)
+
+
+def test_control_messages_roundtrip_bytes():
+    msg = {"status": "ok", "key": b"\x00\xff", "nested": [b"a", 1], "flag": True}
+    assert decode_control(encode_control(msg)) == msg
+    with pytest.raises(ProtocolError):
+        decode_control(b"\xff")
+
+
+def test_packet_serialization_roundtrip():
+    packet = {"nonce": b"n" * 12, "header": b"h" * 8, "encrypted_payload": b"ct", "flushed": True}
+    out = wire.unpack_packet(wire.pack_packet(packet))
+    assert out["nonce"] == packet["nonce"]
+    assert out["header"] == packet["header"]
+    assert out["encrypted_payload"] == b"ct"
+    with pytest.raises(ValueError):
+        wire.unpack_packet(b"\x0c" + b"n" * 5)
+
+
+def test_concurrent_clients_over_loopback():
+    n_clients, n_msgs = 16, 100
+    confirmed = {}
+
+    def on_packet(session, decoded):
+        key = session.entanglement_id()
+        confirmed[key] = confirmed.get(key, 0) + decoded.get("count", 1)
+
+    async def client(port):
+        conn = await QASWPClient.connect("127.0.0.1", port)
+        async with conn:
+            for _ in range(n_msgs // 2):
+                await conn.send([VOCAB["GET"], VOCAB["/api/v1/profile"]])
+            await conn.send_many([[VOCAB["POST"], VOCAB["/api/v1/data"]]] * (n_msgs // 2))
+        return conn.session.entanglement_id()
+
+    async def main():
+        async with QASWPServer(on_packet=on_packet) as server:
+            ids = await asyncio.gather(*(client(server.port) for _ in range(n_clients)))
+            for _ in range(100):
+                if server.sessions_active == 0:
+                    break
+                await asyncio.sleep(0.01)
+            return server, ids
+
+    server, ids = asyncio.run(main())
+    assert server.sessions_total == n_clients
+    assert server.sessions_active == 0
+    assert sorted(confirmed) == sorted(ids)
+    assert all(count == n_msgs for count in confirmed.values())
+
+
+def test_malformed_hello_gets_an_error_reply():
+    async def attempt(port, hello):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        write_message(writer, MSG_HELLO, encode_control(hello))
+        await writer.drain()
+        msg_type, body = await read_message(reader)
+        writer.close()
+        return msg_type, decode_control(body)
+
+    async def main():
+        async with QASWPServer() as server:
+            good = QASWPSession(is_client=True).client_pass_1()
+            bad = [[1], {}, dict(good, nonce="x"), dict(good, schema_versions=2)]
+            replies = [await attempt(server.port, hello) for hello in bad]
+            assert (await attempt(server.port, good))[1]["status"] == "ok"
+            return replies
+
+    for msg_type, resp in asyncio.run(main()):
+        assert msg_type == MSG_SERVER_HELLO
+        assert resp == {"status": "error", "message": "malformed client hello"}
@@ -0,0 +1,58 @@
+import random
+
+import pytest
+import torch
+
+from src.neural import VOCAB_SIZE, TinyLLM
+from src.qaswp import VOCAB, QASWPSession
+
+
+def _handshake():
+    cli = QASWPSession(is_client=True)
+    srv = QASWPSession(is_client=False)
+    resp = srv.server_pass_2(cli.client_pass_1())
+    assert resp["status"] == "ok"
+    assert cli.client_pass_3(resp)["status"] == "ok"
+    return cli, srv
+
+
+def test_batched_predictions_match_single_calls():
+    torch.manual_seed(0)
+    model = TinyLLM()
+    rng = random.Random(7)
+    histories = [
+        [rng.randrange(1, VOCAB_SIZE) for _ in range(rng.randint(1, 12))] for _ in range(40)
+    ]
+    assert model.predict_next_tokens(histories) == [model.predict_next_token(h) for h in histories]
+
+
+def test_weave_many_matches_weave_packet_loop():
+    msgs = [[VOCAB["GET"], VOCAB["/api/v1/profile"]], [VOCAB["POST"]]] * 70
+    loop_cli, _ = _handshake()
+    many_cli, srv = _handshake()
+
+    expected = [loop_cli.weave_packet(m) for m in msgs]
+    got = many_cli.weave_many(msgs)
+    assert [(p["flushed"], p["wire_len"]) for p in got] == [
+        (p["flushed"], p["wire_len"]) for p in expected
+    ]
+    many_ctx, loop_ctx = many_cli.context(), loop_cli.context()
+    assert (many_ctx.seq, many_ctx.confirm_count) == (loop_ctx.seq, loop_ctx.confirm_count)
+
+    batches = [srv.receive_woven_packet(p) for p in got if p["flushed"]]
+    assert [b["seq"] for b in batches] == [0, 64]
+    assert many_cli.weave_many([]) == []
+
+
+def test_bad_message_leaves_no_state(monkeypatch):
+    monkeypatch.setenv("QASWP_DEMO", "0")
+    cli, _ = _handshake()
+    good = [VOCAB["GET"], VOCAB["POST"]]  # a miss: each one is its own delta frame
+    ctx = cli.context()
+    for bad in ([VOCAB["GET"], 1.5], [VOCAB["GET"], "POST"], [VOCAB["GET"], -1]):
+        with pytest.raises(ValueError):
+            cli.weave_many([good, good, bad])
+        with pytest.raises(ValueError):
+            cli.weave_packet(bad)
+        assert (ctx.seq, ctx.confirm_count) == (0, 0)
+    assert cli._crypto()._counter == 0  # no nonce was spent
@@ -0,0 +1,104 @@
+import subprocess
+import sys
+import threading
+
+import pytest
+import torch
+
+from src import weights
+from src.neural import TinyLLM
+from src.qaswp import QASWPSession
+from src.registry import ModelRegistry
+
+
+def _model():
+    torch.manual_seed(17)
+    return TinyLLM().eval()
+
+
+def test_file_hash_is_the_model_id(tmp_path):
+    model = _model()
+    path = tmp_path / "model.qw"
+    root = weights.save(model, path)
+    assert root == model.get_model_diff_hash()
+
+    wf = weights.WeightFile(path)
+    assert wf.content_hash == root
+    assert all((wf.data_start + e["offset"]) % weights.ALIGN == 0 for e in wf.tensors.values())
+
+    loaded = wf.to_torch()
+    assert loaded.get_model_diff_hash() == root
+    assert not loaded.training
+    # parameters are views of the mapping, not copies
+    mapped = wf.array("embedding.weight")
+    assert loaded.embedding.weight.data_ptr() == mapped.__array_interface__["data"][0]
+    history = [1, 3, 5, 2]
+    assert loaded.predict_next_token(history) == model.predict_next_token(history)
+    np_model = weights.load(path, backend="numpy")
+    assert np_model.get_model_fingerprint().diff(wf.fingerprint) == ["__backend__"]
+    assert np_model.predict_next_token(history) == model.predict_next_token(history)
+
+
+def test_loading_touches_no_global_init_state(tmp_path):
+    path = tmp_path / "model.qw"
+    weights.save(_model(), path)
+    init_fns = dict(vars(torch.nn.init))
+    loaded = []
+    threads = [threading.Thread(target=lambda: loaded.append(weights.load(path))) for _ in range(4)]
+    for t in threads:
+        t.start()
+    torch.manual_seed(17)
+    built = TinyLLM().eval()  # initialised normally while the loads run
+    for t in threads:
+        t.join()
+    assert dict(vars(torch.nn.init)) == init_fns
+    assert built.get_model_diff_hash() == _model().get_model_diff_hash()
+    for model in loaded:
+        assert all(p.device.type == "cpu" for p in model.parameters())
+        assert model.get_model_diff_hash() == built.get_model_diff_hash()
+
+
+def test_corruption_and_bad_files_are_rejected(tmp_path):
+    path = tmp_path / "model.qw"
+    weights.save(_model(), path)
+    raw = bytearray(path.read_bytes())
+    raw[-3] ^= 0xFF
+    path.write_bytes(bytes(raw))
+    with pytest.raises(ValueError):
+        weights.WeightFile(path)
+    weights.WeightFile(path, verify=False)  # header alone is still consistent
+
+    path.write_bytes(b"not a weight file")
+    with pytest.raises(ValueError):
+        weights.WeightFile(path)
+
+
+def test_registry_loads_file_once_and_sessions_advertise_its_hash(tmp_path):
+    path = tmp_path / "model.qw"
+    root = weights.save(_model(), path)
+    reg = ModelRegistry()
+    model_id = reg.load_file(path, name="edge")
+    assert model_id == root.hex()
+    assert reg.load_file(path) == model_id and len(reg) == 1
+    np_id = reg.load_file(path, backend="numpy")
+    assert np_id != model_id and reg.get(np_id).get_model_diff_hash().hex() == np_id
+    assert reg.load_file(path, backend="numpy") == np_id and len(reg) == 2
+    session = QASWPSession(is_client=True, model=reg.get("edge"))
+    assert session.client_pass_1()["model_hash"] == root
+
+
+def test_default_model_from_environment(tmp_path):
+    path = tmp_path / "model.qw"
+    root = weights.save(_model(), path)
+    code = (
+        "import sys; from src.registry import shared_model; "
+        "sys.stdout.write(shared_model().get_model_diff_hash().hex())"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        env={"QASWP_MODEL_FILE": str(path), "PATH": ""},
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    assert out.stdout == root.hex()
@@ -0,0 +1,69 @@
+import pytest
+
+from src import wire
+from src.qaswp import VOCAB, QASWPSession
+
+
+def _handshake(cli_schema=wire.SCHEMA_BINARY, srv_schema=wire.SCHEMA_BINARY):
+    cli = QASWPSession(is_client=True, schema_version=cli_schema)
+    srv = QASWPSession(is_client=False, schema_version=srv_schema)
+    resp = srv.server_pass_2(cli.client_pass_1())
+    assert resp["status"] == "ok"
+    assert cli.client_pass_3(resp)["status"] == "ok"
+    return cli, srv
+
+
+def test_body_roundtrip():
+    batch = {"t": "batch", "seq": 7, "count": 13, "bits": (1 << 13) - 1}
+    assert wire.decode_body(wire.encode_body(batch), 7) == batch
+    delta = {"t": "delta", "seq": 9, "need": VOCAB["HTTP/1.1"]}
+    assert wire.decode_body(wire.encode_body(delta), 9) == delta
+    with pytest.raises(ValueError):
+        wire.decode_body(wire.encode_body(batch)[:-1], 7)
+
+
+def test_frame_vector_roundtrip():
+    headers = [(1, 0, 0), (2**32 + 5, wire.FLAG_ACK_REQUIRED, 3), (9, 0, 255)]
+    payloads = [b"abc", b"", b"x" * 300]
+    buf = wire.encode_frame_vector(headers, payloads)
+    table, out = wire.decode_frame_vector(buf)
+    assert table["seq"].tolist() == [1, 5, 9]
+    assert table["flags"].tolist() == [0, wire.FLAG_ACK_REQUIRED, 0]
+    assert table["ctx"].tolist() == [0, 3, 255]
+    assert [bytes(p) for p in out] == payloads
+    with pytest.raises(ValueError):
+        wire.decode_frame_vector(buf[:-1])
+
+
+def test_binary_schema_negotiated_and_header_authenticated():
+    cli, srv = _handshake()
+    assert cli._schema_version == srv._schema_version == wire.SCHEMA_BINARY
+    for _ in range(5):
+        cli.weave_packet([VOCAB["GET"], VOCAB["/api/v1/profile"]])
+    pkt = cli.flush()
+    assert len(pkt["header"]) == wire.HEADER_LEN
+    assert srv.receive_woven_packet(pkt) == {
+        "t": "batch",
+        "seq": 0,
+        "count": 5,
+        "bits": 0b11111,
+        "ctx": 0,
+    }
+
+    tampered = dict(pkt, header=wire.pack_header(1, 0, 0, len(pkt["encrypted_payload"])))
+    assert srv.receive_woven_packet(tampered) is None
+
+
+def test_legacy_json_peer_interoperates():
+    cli, srv = _handshake(cli_schema=wire.SCHEMA_JSON)
+    assert cli._schema_version == srv._schema_version == wire.SCHEMA_JSON
+    cli.weave_packet([VOCAB["GET"], VOCAB["/api/v1/profile"]])
+    pkt = cli.flush()
+    assert pkt["header"] == b""
+    assert srv.receive_woven_packet(pkt) == {
+        "t": "batch",
+        "seq": 0,
+        "count": 1,
+        "bits": 1,
+        "ctx": 0,
+    }